@@ -0,0 +1,29 @@
+"""Measure formatting dates in the Hebrew and Hijri calendars, with formats like [$-108040D] and [$-1060000].
+Usage: python benchmarks/bench_calendars.py [count]"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ssf import SSF
+
+FORMATS = {'Hebrew': '[$-108040D]d mmmm yyyy', 'Hijri': '[$-1060000]d mmmm yyyy',
+           'Hijri (ar-SA)': '[$-1060401]dddd d mmmm yyyy', 'B2 (Hijri)': 'B2d/m/yyyy', 'Gregorian': 'd mmmm yyyy'}
+
+
+def run(count=20000):
+    ssf = SSF()
+    values = [1 + (i * 7919) % 2958465 for i in range(count)]     # Spread over the whole date range
+    for name, fmt in FORMATS.items():
+        cf = ssf.compile(fmt)
+        cf.format(values[0])        # Load any tables first
+        start = time.perf_counter()
+        for v in values:
+            cf.format(v)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<16} {fmt:<26} {elapsed/count*1e6:8.1f} us/value')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,47 @@
+"""Measure the cold start of ssf: the time to ``import ssf``, to create the first ``SSF()``, and to
+format the first value.  Each run is a fresh interpreter, so nothing is cached between runs (other
+than the .pyc files).  Usage: python benchmarks/bench_startup.py [runs]"""
+import os
+import statistics
+import subprocess
+import sys
+
+_SCRIPT = r'''
+import time
+t0 = time.perf_counter()
+import ssf
+t1 = time.perf_counter()
+s = ssf.SSF()
+t2 = time.perf_counter()
+s.format('#,##0.00', 1234.5)
+t3 = time.perf_counter()
+s.format('dddd, mmmm d, yyyy', 43831)
+t4 = time.perf_counter()
+print(t1-t0, t2-t1, t3-t2, t4-t3)
+'''
+
+_COLUMNS = ('import ssf', 'SSF()', 'first number', 'first date')
+
+
+def measure(runs=20):
+    """Return {column: median seconds} over ``runs`` fresh interpreters, including a 'total' column"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    subprocess.run([sys.executable, '-c', _SCRIPT], env=env, check=True, capture_output=True)    # Write the .pyc files
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _SCRIPT], env=env, check=True, capture_output=True, text=True).stdout
+        times.append([float(t) for t in out.split()])
+    result = {name: statistics.median(t[i] for t in times) for i, name in enumerate(_COLUMNS)}
+    result['total'] = statistics.median(sum(t) for t in times)
+    return result
+
+
+def run(runs=20):
+    print(f'Median of {runs} runs:')
+    for name, t in measure(runs).items():
+        print(f'  {name:<14} {t*1000:8.1f} ms')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,223 @@
+"""Benchmark suite for the formatter hot paths.  Each case formats a list of values with ``ssf.format()``, and
+the time per value is reported in microseconds (the best and the median of several repeats).  The cold start
+is measured with bench_startup.py.
+
+Usage: python benchmarks/suite.py [--count N] [--repeat R] [--group NAME ...] [--no-startup]
+                                  [--json FILE] [--compare BASELINE.json] [--threshold 1.10]
+
+``--json`` writes the results (along with the ssf and Python versions) to FILE so they can be kept per
+release.  ``--compare`` reports each case against a previously saved FILE, and exits with status 1 if any
+case got slower by more than ``--threshold`` (as a ratio of the best times)."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ssf
+from ssf import SSF
+import bench_calendars
+import bench_startup
+
+_COLORS = dict(color_pre='<font color="#{rgb}">', color_post='</font>')
+
+
+def _numbers(count):
+    """Mixed positive, negative and fractional values of various magnitudes"""
+    return [(i * 7919 % 20011 - 10005) * 10.0 ** (i % 13 - 6) for i in range(count)]
+
+
+def _small(count):
+    return [(i * 37 % 2001 - 1000) / 8 for i in range(count)]
+
+
+def _dates(count):
+    """Timestamps over about 10 years"""
+    return [40000 + (i * 7919 % 3653) + (i * 104729 % 86400) / 86400 for i in range(count)]
+
+
+def _datetimes(count):
+    """Naive datetime objects over about 10 years"""
+    start = datetime(2010, 1, 1)
+    return [start + timedelta(days=i * 7919 % 3653, seconds=i * 104729 % 86400) for i in range(count)]
+
+
+def _repeated(count):
+    """Amounts and dates with many repeats, like most spreadsheet columns"""
+    return [(i * 7919 % 37) * 12.5 if i % 3 else 43831 + i * 104729 % 20 for i in range(count)]
+
+
+def _all_dates(count):
+    """Dates spread over the whole date range"""
+    return [1 + (i * 7919) % 2958465 for i in range(count)]
+
+
+# group: [(name, format, values, SSF options, format() options)]
+CASES = {
+    'general': [
+        ('General', 'General', _numbers, {}, {}),
+        ('General width=8', 'General', _numbers, {}, dict(width=8)),
+        ('General width=11', 'General', _numbers, {}, dict(width=11)),
+        ('General width=20', 'General', _numbers, {}, dict(width=20)),
+        ('0.00', '0.00', _numbers, {}, {}),
+        ('#,##0.00', '#,##0.00', _numbers, {}, {}),
+        ('0%', '0%', _small, {}, {}),
+    ],
+    'currency': [
+        ('Currency', '$#,##0.00;[Red]($#,##0.00)', _numbers, {}, {}),
+        ('Accounting', '_($* #,##0.00_);_($* (#,##0.00);_($* "-"??_);_(@_)', _numbers, {}, {}),
+        ('Euro de-DE', '[$€-407]#,##0.00', _numbers, {}, {}),
+    ],
+    'named': [
+        ('Currency', 'Currency', _numbers, {}, {}),
+        ('Accounting de-DE', 'Accounting', _numbers, {}, dict(locale='de-DE')),
+        ('Short Date', 'Short Date', _dates, {}, {}),
+        ('Currency de-DE uncached', 'Currency', _numbers, dict(format_cache_size=0), dict(locale='de-DE')),
+        ('Accounting uncached', 'Accounting', _numbers, dict(format_cache_size=0), {}),
+    ],
+    'builtin ids': [
+        ('14', 14, _dates, {}, {}),
+        ('"m/d/yyyy"', 'm/d/yyyy', _dates, {}, {}),
+        ('4', 4, _numbers, {}, {}),
+        ('"#,##0.00"', '#,##0.00', _numbers, {}, {}),
+        ('44', 44, _numbers, {}, {}),
+        ('14 uncached', 14, _dates, dict(format_cache_size=0), {}),
+        ('"m/d/yyyy" uncached', 'm/d/yyyy', _dates, dict(format_cache_size=0), {}),
+    ],
+    'result cache': [
+        ('#,##0.00', '#,##0.00', _repeated, {}, {}),
+        ('#,##0.00 cached', '#,##0.00', _repeated, dict(result_cache_size=1024), {}),
+        ('Long date', 'dddd, mmmm d, yyyy', _repeated, {}, {}),
+        ('Long date cached', 'dddd, mmmm d, yyyy', _repeated, dict(result_cache_size=1024), {}),
+        ('Few repeats cached', '#,##0.00', _numbers, dict(result_cache_size=1024), {}),
+    ],
+    'grouping': [(loc, '#,##0.00', _numbers, dict(locale=loc), {}) for loc in ('en-US', 'de-DE', 'hi-IN', 'fr-FR')],
+    'fraction': [
+        ('# ?/?', '# ?/?', _small, {}, {}),
+        ('# ??/??', '# ??/??', _small, {}, {}),
+        ('# ?/8', '# ?/8', _small, {}, {}),
+    ],
+    'scientific': [
+        ('0.00E+00', '0.00E+00', _numbers, {}, {}),
+        ('##0.0E+0', '##0.0E+0', _numbers, {}, {}),
+    ],
+    'date': [
+        ('ISO timestamp', 'yyyy-mm-dd hh:mm:ss', _dates, {}, {}),
+        ('Long date', 'dddd, mmmm d, yyyy', _dates, {}, {}),
+        ('Time AM/PM', 'h:mm:ss AM/PM', _dates, {}, {}),
+        ('Time AM/PM width=14', 'h:mm:ss AM/PM', _dates, {}, dict(width=14)),
+        ('Time .00', 'hh:mm:ss.00', _dates, {}, {}),
+        ('Elapsed', '[h]:mm:ss.00', _dates, {}, {}),
+        ('datetime values', 'yyyy-mm-dd hh:mm:ss', _datetimes, {}, {}),
+        ('date1904', 'yyyy-mm-dd', _dates, dict(date1904=True), {}),
+        ('Thai', '[$-0D07041E]dddd d mmmm yyyy', _dates, {}, {}),
+        ('Chinese lunar', '[$-1E127804]yyyy mm dd', _dates, {}, {}),
+    ] + [(name, fmt, _all_dates, {}, {}) for name, fmt in bench_calendars.FORMATS.items() if name != 'Gregorian'],
+    'numerals': [
+        ('DBNum1', '[DBNum1][$-804]General', _small, {}, {}),
+        ('DBNum2', '[DBNum2][$-804]0', _small, {}, {}),
+        ('DBNum3', '[DBNum3][$-804]#,##0', _small, {}, {}),
+        ('Arabic digits', '[$-2010401]#,##0.00', _numbers, {}, {}),
+        ('Thai digits', '[$-D000409]#,##0.00', _numbers, {}, {}),
+        ('CJK scientific', '[$-1E000000]0.00E+00', _numbers, {}, {}),
+    ],
+    'conditional': [
+        ('Conditions', '[>=100]#,##0;[<=-100]-#,##0;0.00', _small, {}, {}),
+        ('Four sections', '#,##0.00;(#,##0.00);"zero";@', _small, {}, {}),
+    ],
+    'color': [
+        ('Red negatives', '#,##0.00;[Red]-#,##0.00', _numbers, _COLORS, {}),
+        ('Conditions+colors', '[>=100][Red]#,##0;[<=-100][Blue]#,##0;[Color10]0.00', _small, _COLORS, {}),
+    ],
+}
+
+_GET_FORMAT = [dict(type=t) for t in ('General', 'Number', 'Currency', 'Accounting', 'Date', 'Long Date', 'Time',
+        'Percentage', 'Scientific', 'Text')] + [dict(type='Fraction', fraction_denominator=-2),
+        dict(type='Currency', negative_numbers='Redparens', places=0), dict(type='Currency', locale='de-DE')]
+
+
+def _time(func, args, repeat):
+    """Return (best, median) seconds per call of ``func`` over each of ``args``"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for a in args:
+            func(a)
+        times.append((time.perf_counter() - start) / len(args))
+    return min(times), statistics.median(times)
+
+
+def run_cases(groups, count, repeat):
+    """Return {'group/name': {'format':..., 'best_us':..., 'median_us':...}}"""
+    results = {}
+    for group in groups:
+        if group == 'get_format':
+            s = SSF()
+            for kwargs in _GET_FORMAT:
+                s.get_format(**kwargs)
+            best, median = _time(lambda kw: s.get_format(**kw), _GET_FORMAT * max(count // len(_GET_FORMAT), 1), repeat)
+            results['get_format/mixed types'] = dict(format=None, best_us=best * 1e6, median_us=median * 1e6)
+            continue
+        for name, fmt, values, options, kwargs in CASES[group]:
+            s = SSF(**options)
+            values = values(count)
+            s.format(fmt, values[0], **kwargs)        # Load any tables first
+            best, median = _time(lambda v: s.format(fmt, v, **kwargs), values, repeat)
+            results[f'{group}/{name}'] = dict(format=fmt, best_us=best * 1e6, median_us=median * 1e6)
+    return results
+
+
+def main(argv=None):
+    all_groups = list(CASES) + ['get_format']
+    parser = argparse.ArgumentParser(description='Benchmark the ssf formatter hot paths')
+    parser.add_argument('--count', type=int, default=5000, help='values formatted per repeat (default 5000)')
+    parser.add_argument('--repeat', type=int, default=5, help='repeats per case (default 5)')
+    parser.add_argument('--group', action='append', choices=all_groups, help='run only this group (can be repeated)')
+    parser.add_argument('--no-startup', action='store_true', help='skip the cold start measurement')
+    parser.add_argument('--startup-runs', type=int, default=10, help='interpreters started for the cold start (default 10)')
+    parser.add_argument('--json', metavar='FILE', help='write the results to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare against results previously written with --json')
+    parser.add_argument('--threshold', type=float, default=1.10, help='slowdown ratio counted as a regression (default 1.10)')
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.group or all_groups, args.count, args.repeat)
+    startup = None
+    if not args.no_startup and not args.group:
+        startup = {name: t * 1000 for name, t in bench_startup.measure(args.startup_runs).items()}
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    regressions = []
+    for key, r in results.items():
+        line = f'{key:<36} {r["best_us"]:9.2f} us {r["median_us"]:9.2f} us'
+        if key in baseline:
+            ratio = r['best_us'] / baseline[key]['best_us']
+            line += f'  x{ratio:.2f}'
+            if ratio > args.threshold:
+                regressions.append(key)
+                line += '  SLOWER'
+        print(line)
+    if startup:
+        print('startup: ' + ', '.join(f'{name} {t:.1f} ms' for name, t in startup.items()))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(ssf_version=ssf.__version__, python=platform.python_version(),
+                           implementation=platform.python_implementation(), machine=platform.machine(),
+                           time=time.strftime('%Y-%m-%dT%H:%M:%S'), count=args.count, repeat=args.repeat,
+                           results=results, startup_ms=startup), f, indent=1, ensure_ascii=False)
+    if regressions:
+        print(f'{len(regressions)} case(s) slower than x{args.threshold:.2f}: ' + ', '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Add the monetary conventions of every other babel (CLDR) locale to ../ssf/lc_all.tsv.gz, so that ssf never
+has to call locale.setlocale() to find them.  The rows made by create_lc_all.py on Windows are kept as they
+are, and the rows added here have an empty lcid.  Run create_pack.py after this."""
+import gzip
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from babel import Locale
+from babel.core import get_global
+from babel.localedata import locale_identifiers
+from babel.numbers import get_territory_currencies, get_currency_precision
+from ssf.ssf import SSF_LOCALE
+
+LC_ALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ssf', 'lc_all.tsv.gz')
+SPACES = (' ', '\xa0', ' ')
+
+
+def currency_of(locale):
+    """The currency used in the territory of ``locale`` (or its most likely territory), or None"""
+    territory = locale.territory
+    if not territory:
+        likely = get_global('likely_subtags').get(str(locale))
+        territory = likely and Locale.parse(likely).territory
+    if not territory:
+        return None
+    currencies = get_territory_currencies(territory, start_date=date(2020, 1, 1))
+    return currencies[0] if currencies else None
+
+
+def sign_posn(prefix, suffix):
+    """The localeconv() sign position for the negative currency ``prefix`` and ``suffix`` of a pattern"""
+    if '(' in prefix:
+        return 0
+    if '-' in prefix:
+        if '¤' in prefix and prefix.find('¤') < prefix.find('-'):
+            return 4        # Immediately after the currency symbol
+        return 1            # Before the quantity and currency symbol
+    if '-' in suffix and '¤' in suffix and suffix.find('-') < suffix.find('¤'):
+        return 3            # Immediately before the currency symbol
+    return 2                # After the quantity and currency symbol
+
+
+def conventions(locale, currency):
+    """A localeconv() style dict for ``locale`` from its CLDR data"""
+    symbols = locale.number_symbols
+    primary, secondary = locale.decimal_formats[None].grouping
+    grouping = [primary, 0] if primary == secondary else [primary, secondary, 0]
+    pattern = locale.currency_formats['standard']
+    result = dict(int_curr_symbol=currency, currency_symbol=locale.currency_symbols.get(currency, currency),
+            mon_decimal_point=symbols['decimal'], mon_thousands_sep=symbols['group'], mon_grouping=grouping,
+            positive_sign='', negative_sign='-', int_frac_digits=get_currency_precision(currency),
+            frac_digits=get_currency_precision(currency))
+    for p, i in (('p_', 0), ('n_', 1)):
+        prefix = pattern.prefix[i].strip('‎‏')
+        suffix = pattern.suffix[i].strip('‎‏')
+        cs_precedes = '¤' in prefix
+        result[p + 'cs_precedes'] = int(cs_precedes)
+        if cs_precedes:
+            result[p + 'sep_by_space'] = int(prefix[prefix.find('¤')+1:][:1] in SPACES)
+        else:
+            result[p + 'sep_by_space'] = int(suffix[:suffix.find('¤')][-1:] in SPACES)
+    result['n_sign_posn'] = result['p_sign_posn'] = sign_posn(pattern.prefix[1], pattern.suffix[1])
+    result.update(decimal_point=symbols['decimal'], thousands_sep=symbols['group'], grouping=grouping)
+    return result
+
+
+with gzip.open(LC_ALL, 'rt', encoding='utf-8') as f:
+    lines = [line for line in f.read().splitlines() if line and not line.startswith('\t')]
+keys = lines[0].split('\t')
+have = {line.split('\t')[1] for line in lines[1:]}
+added = 0
+for identifier in sorted(locale_identifiers()):
+    name = SSF_LOCALE.normalize_locale(None, identifier)
+    if name in have:
+        continue
+    locale = Locale.parse(identifier)
+    currency = currency_of(locale)
+    if currency is None:
+        print(f"No currency for {identifier}: skipping")
+        continue
+    conv = conventions(locale, currency)
+    lines.append('\t'.join([''] + [name] + [str(conv[key]) for key in keys[2:]]))
+    have.add(name)
+    added += 1
+
+with open(LC_ALL, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+    gz.write(('\n'.join(lines) + '\n').encode('utf-8'))
+print(f'Added {added} locales to {os.path.normpath(LC_ALL)}: {len(lines)-1} in all')
@@ -0,0 +1,13 @@
+"""Build ssf/ssfdata.bin from the data files in the ssf directory.  Run this after changing any of them."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ssf.ssf import _read_data_tables
+from ssf.datapack import build, PACK_FILE
+
+tables = _read_data_tables()
+with open(PACK_FILE, 'wb') as pf:
+    pf.write(build(tables))
+print(f'Wrote {len(tables)} tables to {os.path.normpath(PACK_FILE)}: {os.path.getsize(PACK_FILE):,} bytes')
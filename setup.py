@@ -12,6 +12,8 @@ with open('HISTORY.rst') as history_file:
 
 requirements = ['Babel', 'python-dateutil', 'pytz', 'PyYAML', 'six', 'ummalqura', 'convertdate']
 
+extras_requirements = {'numpy': ['numpy']}
+
 setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest>=3', ]
@@ -32,6 +34,7 @@ setup(
     ],
     description="Spreadsheet Number Format processor - a Python port of SheetJS/ssf.js",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="Apache Software License 2.0",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
@@ -0,0 +1,112 @@
+"""Read (and build) ssfdata.bin, the pack of locale and calendar tables used by ssf.
+
+The pack is made from the text data files in this directory by ``create/create_pack.py``, so the
+tables don't have to be unzipped and parsed at runtime.  It's mapped into memory, and only the parts
+that are used are decoded.  The layout is::
+
+    MAGIC (7 bytes) + VERSION (1 byte)
+    length of the index (4 bytes, big-endian), then the index: JSON {table: [offset, length, keyed]}
+    the tables (all offsets are from here)
+
+Each table is a zlib-compressed JSON value.  For a keyed table (like the day and month names for a
+calendar), that value is an index {key: [offset, length]} of its entries, each of which is also a
+zlib-compressed JSON value, so we only decode the entries (locales) that are actually used.  Identical
+entries are only stored once."""
+import json
+import mmap
+import os
+import zlib
+from collections.abc import Mapping
+
+MAGIC = b'SSFDATA'
+VERSION = 1
+PACK_FILE = os.path.join(os.path.dirname(__file__), 'ssfdata.bin')
+
+
+class PackedMap(Mapping):
+    """A read-only dict for a keyed table in the pack, which decodes each entry the first time it's used
+    (passing it thru ``decode``, if given)"""
+    def __init__(self, pack, index, decode=None):
+        self._pack = pack
+        self._index = index
+        self._decode = decode
+        self._values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            offset, length = self._index[key]       # Raises KeyError if we don't have it
+            value = self._pack._load(offset, length)
+            if self._decode:
+                value = self._decode(value)
+            self._values[key] = value
+            return value
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class DataPack:
+    """The data pack in ``path``.  Raises ValueError if it isn't a pack of the current VERSION."""
+    def __init__(self, path=PACK_FILE):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)+1] != MAGIC + bytes([VERSION]):
+            raise ValueError(f'{path} is not a version {VERSION} ssf data pack')
+        start = len(MAGIC) + 5
+        length = int.from_bytes(self._mm[start-4:start], byteorder='big')
+        self._index = json.loads(self._mm[start:start+length])
+        self._base = start + length
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def _load(self, offset, length):
+        offset += self._base
+        return json.loads(zlib.decompress(self._mm[offset:offset+length]))
+
+    def table(self, name, decode=None):
+        """Returns the table ``name``: a `PackedMap` if it's keyed, else the value itself (in both
+        cases passed thru ``decode`` if given)"""
+        offset, length, keyed = self._index[name]
+        value = self._load(offset, length)
+        if keyed:
+            return PackedMap(self, value, decode)
+        return decode(value) if decode else value
+
+
+def build(tables):
+    """Returns the bytes of a data pack containing ``tables``, a dict of {name: (value, keyed)}.  A keyed
+    value must be a dict with str keys.  All values must be JSON-serializable."""
+    body = bytearray()
+    index = {}
+
+    def add(data):
+        body.extend(data)
+        return len(body) - len(data)
+
+    def pack(value):
+        return zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'), 9)
+
+    for name, (value, keyed) in tables.items():
+        if keyed:
+            entries = {}            # Packed entry to its [offset, length], so we only store it once
+            key_index = {}
+            for key, entry in value.items():
+                data = pack(entry)
+                if data not in entries:
+                    entries[data] = [add(data), len(data)]
+                key_index[key] = entries[data]
+            value = key_index
+        data = pack(value)
+        index[name] = [add(data), len(data), keyed]
+
+    index_data = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    return MAGIC + bytes([VERSION]) + len(index_data).to_bytes(4, byteorder='big') + index_data + bytes(body)
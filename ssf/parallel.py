@@ -0,0 +1,64 @@
+"""Format large columns of values on several cores at once, using a pool of worker processes"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .ssf import SSF
+
+try:
+    import numpy as np
+except ImportError:     # pragma nocover
+    np = None
+
+_worker_ssf = None      # The SSF object in each worker process
+
+
+def _init_worker(kwargs):
+    global _worker_ssf
+    _worker_ssf = SSF(**kwargs)
+
+
+def _format_chunk(fmt, values, width, align, ssf=None):
+    result = (ssf or _worker_ssf).format_array(fmt, values, width=width, align=align)
+    return result if isinstance(result, list) else result.tolist()
+
+
+def _chunks(values, chunk_size):
+    """Split ``values`` into pieces of ``chunk_size``.  NumPy arrays stay arrays, so numeric columns are
+    sent to the workers as a block of memory rather than as an object for each value."""
+    if np is not None and isinstance(values, np.ndarray):
+        values = values.ravel()
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start+chunk_size]
+
+
+def format_columns(columns, formats, workers=None, chunk_size=100000, width=None, align=None, **kwargs):
+    """Format each column of values in ``columns`` with the corresponding format in ``formats`` (or with
+    ``formats`` itself if it's a single format or table index), using a pool of ``workers`` processes
+    (default: one per CPU).  The columns are split into pieces of ``chunk_size`` values, and each piece
+    is formatted with `ssf.format_array()` using the given ``width`` and ``align``.  Each worker creates
+    one `SSF` object, passing it any other ``kwargs`` (like ``locale`` or ``date1904``).  Returns a list
+    with a list of strings for each column, in the same order.  Pass numeric columns as NumPy arrays, which
+    are much cheaper to send to the workers than lists."""
+    if isinstance(formats, (str, int)):
+        formats = [formats] * len(columns)
+    elif len(formats) != len(columns):
+        raise ValueError(f'format_columns needs one format for each column, not {len(formats)} for {len(columns)}')
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    tasks = []          # (column number, fmt, values)
+    for col, (fmt, values) in enumerate(zip(formats, columns)):
+        for chunk in _chunks(values, chunk_size):
+            tasks.append((col, fmt, chunk))
+
+    results = [[] for _ in columns]
+    if workers <= 1 or len(tasks) <= 1:     # Not worth starting the processes
+        ssf = SSF(**kwargs)
+        for col, fmt, chunk in tasks:
+            results[col].extend(_format_chunk(fmt, chunk, width, align, ssf))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(kwargs,)) as executor:
+        futures = [(col, executor.submit(_format_chunk, fmt, chunk, width, align)) for col, fmt, chunk in tasks]
+        for col, future in futures:
+            results[col].extend(future.result())
+    return results
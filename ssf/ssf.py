@@ -4,25 +4,185 @@
 import math
 from datetime import datetime, date, timedelta, timezone
 from datetime import time as tm
-from types import SimpleNamespace
-from dateutil.tz import tzlocal
-from dateutil.parser import parse as date_parse
+from types import SimpleNamespace, MappingProxyType
 import re
 import locale as lcl
-import ast              # Issue #13
 import calendar
-from babel.core import default_locale, Locale, UnknownLocaleError
-from babel.numbers import format_decimal, decimal
-import yaml
+import decimal
 import json
 import os
 import warnings
+import threading
+import sys
 from copy import copy
+from collections import OrderedDict, ChainMap
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 import gzip
-from convertdate import hebrew, islamic
 #from lunarcalendar import Solar, Converter
-import mmap
-from ummalqura.hijri_date import HijriDate
+# The heavier modules (babel, dateutil, yaml, convertdate, ummalqura) are imported where they are first
+# needed, so that "import ssf" and SSF() stay quick for short-lived programs.
+
+# Operations generated by SSF._tokenize_fmt and run by SSF._replay_ops for each value
+(_OP_DATE, _OP_SOFT_DATE, _OP_AMPM, _OP_TEXT, _OP_PCT, _OP_ABS, _OP_LOCALE, _OP_RESTART, _OP_ERROR) = range(9)
+# Whether or not we know the value is a date while tokenizing (it's only a MAYBE after an 'a' literal)
+(_DT_NONE, _DT_SURE, _DT_MAYBE) = range(3)
+
+def date_parse(s):
+    """Parse a date string with dateutil, which is only imported the first time we need it"""
+    from dateutil.parser import parse
+    return parse(s)
+
+class _DateCode:
+    """A value decoded by SSF._parse_date_code(): the day number (D), the time in seconds (T) and the
+    fraction of a second (u), the date (y, m, d), the time (H, M, S), the day of the week (q, with SUN=0),
+    and whether the year has a leap month (L) and its era number (e), for some calendars."""
+    __slots__ = ('D', 'T', 'u', 'y', 'm', 'd', 'H', 'M', 'S', 'q', 'L', 'e')
+
+    def __init__(self, D, T, u, y, m, d, H, M, S, q, L, e):
+        self.D = D
+        self.T = T
+        self.u = u
+        self.y = y
+        self.m = m
+        self.d = d
+        self.H = H
+        self.M = M
+        self.S = S
+        self.q = q
+        self.L = L
+        self.e = e
+
+class _Token:
+    """A piece of a tokenized format: its type (t) and its text (v), which is filled in for each value"""
+    __slots__ = ('t', 'v')
+
+    def __init__(self, t, v):
+        self.t = t
+        self.v = v
+
+    def __repr__(self):
+        return f'_Token({self.t!r}, {self.v!r})'
+
+
+class _LoadedFormats(dict):
+    """The formats loaded into the table of an SSF object, which calls ``on_change()`` when they are changed,
+    so the parsed formats for the prior entries are dropped however the table is written"""
+    __slots__ = ('on_change',)
+
+    def __init__(self, on_change):
+        super().__init__()
+        self.on_change = on_change
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.on_change()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self.on_change()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self.on_change()
+        return result
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.on_change()
+
+    def clear(self):
+        super().clear()
+        self.on_change()
+
+@lru_cache(maxsize=4096)            # Columns of dates and timestamps share days a lot
+def _date_from_days(dt):
+    """Returns (year, month, day, day of the week with SUN=0) for the day number ``dt`` (1 is 1/1/1900, with
+    any date1904 offset already added), using integers only (the "civil from days" algorithm).  Raises
+    OverflowError if the year isn't 1 thru 9999, like the datetime module does.
+
+    Due to a bug in Lotus 1-2-3 which was propagated by Excel and other variants,
+    the year 1900 is recognized as a leap year.  JS has no way of representing that
+    abomination as a `Date`, so the easiest way is to store the data as a tuple.
+
+    February 29, 1900 (date `60`) is recognized as a Wednesday.  Date `0` is treated
+    as January 0, 1900 rather than December 31, 1899.
+    """
+    if dt == 60:
+        return (1900, 2, 29, 3)     # Issue #14
+    elif dt == 0:
+        return (1900, 1, 0, 6)      # Issue #14
+    n = dt - 1 if dt > 60 else dt
+    dow = n % 7                 # 1/1/1900 was a Monday
+    if dt < 60:
+        dow = (dow + 6) % 7     # Fixup day of week for the year 1900 bug, described above
+    z = n + 693900              # Days since 3/1/0000
+    era = z // 146097           # 400-year cycles
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)      # Day of the year, starting with March 1
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    year = yoe + era * 400 + (month <= 2)
+    if not 1 <= year <= 9999:
+        raise OverflowError('date value out of range')
+    return (year, month, day, dow)
+
+class _FormatContext(threading.local):
+    """The state of the ssf.format() call in progress: the locale for numbers (``fmtl``), the locale for
+    dates (``tmpl``), the calendar code from the format, and whether the result is to be pounds.  Each thread
+    gets its own copy, so one SSF object can be shared by many threads."""
+    def __init__(self, curl):
+        self.fmtl = curl
+        self.tmpl = curl
+        self.fmt_calendar_code = None       # Calendar code from the format string (if any)
+        self.pound_sand = False
+
+# babel rounds with the current decimal context, so ssf uses its own for each call instead of changing the
+# thread's context
+_DECIMAL_CONTEXT = decimal.Context(rounding=decimal.ROUND_HALF_UP)
+
+_DATE_1900 = date(1900, 1, 1)       # Day 0 for the day numbers in the calendar tables
+
+def _find_year(years, ymd, year_length):
+    """Find the Gregorian ``ymd`` in ``years``, a table of the day number that each year of a calendar starts
+    on (see `_read_hebrew_years()`), using ``year_length`` (the average) to go right to it.  Returns
+    (year, day of the year starting at 0, days in the year) or None if it's not in the table."""
+    day = (date(*ymd) - _DATE_1900).days
+    starts = years.starts
+    i = min(max(int((day - starts[0]) / year_length), 0), len(starts) - 2)
+    while i > 0 and starts[i] > day:
+        i -= 1
+    while i < len(starts) - 2 and starts[i+1] <= day:
+        i += 1
+    if not starts[i] <= day < starts[i+1]:
+        return None
+    return (years.first_year + i, day - starts[i], starts[i+1] - starts[i])
+
+_HIJRI_MONTH_STARTS = [math.ceil(29.5 * month) for month in range(12)]   # Day of the year each month starts on
+
+def _hebrew_months(year_days):
+    """Returns ([day of the year each month starts on], [month number]) for a Hebrew year of ``year_days`` days.
+    The year starts with Tishrei (7), and the months are numbered like convertdate, with Nisan as 1 and
+    the leap month (Veadar) as 13."""
+    months = [7, 8, 9, 10, 11, 12, 13, 1, 2, 3, 4, 5, 6] if year_days > 355 else [7, 8, 9, 10, 11, 12, 1, 2, 3, 4, 5, 6]
+    lengths = {7: 30, 8: 30 if year_days % 10 == 5 else 29, 9: 29 if year_days % 10 == 3 else 30, 10: 29,
+               11: 30, 12: 30 if year_days > 355 else 29, 13: 29, 1: 30, 2: 29, 3: 30, 4: 29, 5: 30, 6: 29}
+    return [0] + list(accumulate(lengths[month] for month in months[:-1])), months
+
+_HEBREW_MONTHS = {year_days: _hebrew_months(year_days) for year_days in (353, 354, 355, 383, 384, 385)}
 
 class SSF_CALENDAR:         # Issue #6
     """Handle alternative calendars for ssf.  This shouldn't be used directly."""
@@ -58,17 +218,7 @@ class SSF_CALENDAR:         # Issue #6
 
     def to_japanese(self, ymd):       # Year changes to year in era
         if SSF_CALENDAR.era_list is None:
-            era_file = os.path.join(os.path.dirname(__file__), 'eras.tsv')
-            if os.path.isfile(era_file):
-                with open(era_file, 'r', encoding='utf-8') as ef:
-                    eras = ef.read().splitlines()
-                ea = []
-                for e in eras[1:]:    # Skip heading
-                    loc, dt, g, gg, ggg = e.split('\t')
-                    if loc != 'ja-JP':
-                        continue
-                    ea.append(date_parse(dt).date())
-                SSF_CALENDAR.era_list = ea
+            SSF_CALENDAR.era_list = [e.dt for e in SSF_LOCALE.era_map.get('ja-JP', [])]
         ymd2 = self.fixup_special(ymd)      # Issue #14
         dt = date(*ymd2)
         result = self.to_default(ymd)
@@ -85,10 +235,21 @@ class SSF_CALENDAR:         # Issue #6
     def to_korean(self, ymd):         # year changes (2020 -> 4353)
         return SimpleNamespace(year=ymd[0] + 2333, month=ymd[1], day=ymd[2], isleap=calendar.isleap(ymd[0]), era=None)
 
+    hijri_years = None          # Table of when each year starts, for 1900-9999 - see _read_hijri_years()
+
     def to_hijri(self, ymd):          # Everything changes e.g. Mon Jan January 1/6/2020 -> AlEthnien Jamada El Oula Jamada El Oula 5/11/1441
         ymd = self.fixup_special(ymd)      # Issue #14
-        year, month, day = islamic.from_gregorian(*ymd)
-        leap_year = islamic.leap(year)
+        if SSF_CALENDAR.hijri_years is None:
+            SSF_CALENDAR.hijri_years = _load_data('hijri_years', _read_hijri_years, decode=_decode_years)
+        found = _find_year(SSF_CALENDAR.hijri_years, ymd, 354.367)
+        if found:
+            year, days, _ = found
+            month = bisect_right(_HIJRI_MONTH_STARTS, days)
+            day = days - _HIJRI_MONTH_STARTS[month-1] + 1
+        else:
+            from convertdate import islamic
+            year, month, day = islamic.from_gregorian(*ymd)
+        leap_year = (14 + 11 * year) % 30 < 11        # islamic.leap(year)
         return SimpleNamespace(year=year, month=month, day=day, isleap=leap_year, era=None)
 
     def to_thai_buddhist(self, ymd):  # Year changes along with day and month names e.g.  Mon Jan January 1/6/2020 -> จ. ม.ค. มกราคม 1/6/2563
@@ -97,6 +258,8 @@ class SSF_CALENDAR:         # Issue #6
     ecclesiastical_to_civil = {7: 1, 8: 2, 9: 3, 10: 4, 11: 5, 12: 6, 1: 7, 2: 8, 3: 9, 4: 10, 5: 11, 6: 12}
     ecclesiastical_leap_to_civil = {7: 1, 8: 2, 9: 3, 10: 4, 11: 5, 12: 6, 13: 7, 1: 8, 2: 9, 3: 10, 4: 11, 5: 12, 6: 13}
 
+    hebrew_years = None         # Table of when each year starts, for 1900-9999 - see _read_hebrew_years()
+
     def to_jewish(self, ymd):         # Everything changes e.g. Mon Jan January 1/6/2020 -> Yom Sheni Tishrei Tishrei 4/9/5780
                                 # Some years have a leap-month (13 months).  Conversion in convertdate module.
                                 # Months are named Tishrei, Cheshvan, Kislev, Tevet, Shevat, Adar, Nisan, Iyar, Sivan, Tammuz,
@@ -104,8 +267,19 @@ class SSF_CALENDAR:         # Issue #6
                                 # as "AdarII".  Note: convertdate/hebrew uses the traditional month numbers, so
                                 # Nisan is 1.  5782 is a leap year.
         ymd = self.fixup_special(ymd)      # Issue #14
-        year, month, day = hebrew.from_gregorian(*ymd)
-        leap_year = hebrew.leap(year)
+        if SSF_CALENDAR.hebrew_years is None:
+            SSF_CALENDAR.hebrew_years = _load_data('hebrew_years', _read_hebrew_years, decode=_decode_years)
+        found = _find_year(SSF_CALENDAR.hebrew_years, ymd, 365.2468)
+        if found:
+            year, days, year_days = found
+            starts, months = _HEBREW_MONTHS[year_days]
+            m = bisect_right(starts, days) - 1
+            month = months[m]
+            day = days - starts[m] + 1
+        else:
+            from convertdate import hebrew
+            year, month, day = hebrew.from_gregorian(*ymd)
+        leap_year = ((7 * year) + 1) % 19 < 7      # hebrew.leap(year)
         if leap_year:
             month = SSF_CALENDAR.ecclesiastical_leap_to_civil[month]
         else:
@@ -130,6 +304,7 @@ class SSF_CALENDAR:         # Issue #6
         # Where offset_year is year-1899
 
         if SSF_CALENDAR.lunar_bin is None:      # Runs exactly once
+            import mmap
             lunarcal_file = os.path.join(os.path.dirname(__file__), 'lunarcal.bin')
             if os.path.isfile(lunarcal_file):
                 lunar_fd = open(lunarcal_file, 'rb')    # No, we never close it
@@ -190,6 +365,7 @@ class SSF_CALENDAR:         # Issue #6
             return SimpleNamespace(year=(value>>9)+1317, month=(value>>5)&0xF,
                                    day=value&0x1F, isleap=calendar.isleap(ymd[0]), era=None)
 
+        from ummalqura.hijri_date import HijriDate
         result = HijriDate(*ymd, gr=True)
         # Leap year corresponds to the Gregorian calendar and adds a 30th day to the 6th month
         return SimpleNamespace(year=result.year, month=result.month, day=result.day, isleap=calendar.isleap(ymd[0]), era=None)
@@ -249,69 +425,367 @@ class SSF_CALENDAR:         # Issue #6
             else:
                 raise ValueError(f"Calendar {calendar} must be an integer!")
 
-        def unescape(s):
-            """Excel save as tsv escaped all '"' chars - undo that!"""
-            if len(s) < 2:
-                return s
-            if s[0] == '"' and s[-1] == '"':
-                return s[1:-1].replace('""', '"')
-            return s
-
         if calendar not in SSF_CALENDAR.day_month_map:      # We use a lazy algorithm to load the calendars as needed
-            for leap in (('', 0), ('_leap', SSF_CALENDAR._LEAP_MONTH_FLAG)):
-                if leap[0] and calendar not in SSF_CALENDAR._has_leap_month:
-                    continue
-                day_month_file = os.path.join(os.path.dirname(__file__), f'daymonth{calendar:02X}{leap[0]}.tsv.gz')
-                day_month_map = {}
-                if os.path.isfile(day_month_file):
-                    with gzip.open(day_month_file, 'rt', encoding='utf-8') as dmf:
-                        day_month = dmf.read().splitlines()
-                    month_number = []          # field index to month number
-                    for dm in day_month[1:]:    # Skip heading
-                        fields = dm.split('\t')
-                        if fields[1][0] == '*':
-                            continue        # Skip the local time/date rows
-                        dmm = {}
-                        for f, fd in enumerate(fields[2:]):       # Start with Mon/Jan
-                            dddd, ddd, mmmm, mmm, mmmmm, m = unescape(fd).split(',')
-                            if f >= len(month_number) and m.isdigit():  # Use first row to define the month number mapping
-                                month_number.append(int(m))
-                            if month_number[f]-1 not in dmm:
-                                dmm[month_number[f]-1] = SimpleNamespace(dddd=dddd, ddd=ddd, mmmm=mmmm, mmm=mmm, mmmmm=mmmmm)
-                        # If we start with anything but January, then we need to move the days to the proper place
-                        if month_number[0] != 1:
-                            dmt = {}
-                            for i in range(7):
-                                dmt[i] = SimpleNamespace(dddd=dmm[month_number[i]-1].dddd,
-                                                         ddd=dmm[month_number[i]-1].ddd)
-                            for i in range(7):
-                                dmm[i].dddd = dmt[i].dddd
-                                dmm[i].ddd = dmt[i].ddd
-                        day_month_map[fields[1]] = dmm
-                    SSF_CALENDAR.day_month_map[calendar + leap[1]] = day_month_map
+            with _data_lock:
+                for leap in (('', 0), ('_leap', SSF_CALENDAR._LEAP_MONTH_FLAG)):
+                    if leap[0] and calendar not in SSF_CALENDAR._has_leap_month:
+                        continue
+                    name = f'daymonth{calendar:02X}{leap[0]}'
+                    day_month_map = _load_data(name, lambda: _read_day_month(name), keyed=True, decode=_decode_day_month)
+                    if day_month_map is not None:
+                        SSF_CALENDAR.day_month_map[calendar + leap[1]] = day_month_map
 
     def to_local(self, ymd):
         """Convert a tuple containing (year, month, day) to a SimpleNamespace containing (year, month, day, isleap, era)"""
         return self.converter(ymd)
 
+_data_lock = threading.RLock()      # Guards the loading of the data tables
+_pack = None                        # The DataPack, or False if we don't have one
+
+def _data_file(name):
+    return os.path.join(os.path.dirname(__file__), name)
+
+def _load_data(name, reader, keyed=False, decode=None):
+    """Returns the data table ``name`` from the data pack (ssfdata.bin) if it's there, else by calling
+    ``reader`` to read it from its text file (returning None if we have neither).  The value is passed
+    thru ``decode`` (each entry of it if ``keyed``).  A keyed table from the pack only decodes the
+    entries that are used."""
+    global _pack
+    if _pack is None:
+        from .datapack import DataPack
+        try:
+            _pack = DataPack()
+        except (OSError, ValueError):
+            _pack = False
+    if _pack and name in _pack:
+        return _pack.table(name, decode)
+    value = reader()
+    if value is None or decode is None:
+        return value
+    if keyed:
+        return {key: decode(entry) for key, entry in value.items()}
+    return decode(value)
+
+# Each _read_* function reads a data file (or computes a table) in the form we store it in the data pack,
+# returning None if the file is missing.  The matching _decode_* function converts that to the form we use.
+
+def _read_lines(name):
+    path = _data_file(name)
+    if not os.path.isfile(path):
+        return None
+    if name.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return f.read().splitlines()
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def _read_day_month(name):
+    """Reads daymonthXX.tsv.gz as {locale: [[month index, dddd, ddd, mmmm, mmm, mmmmm], ...]}.  The days
+    are in the entries for month index 0 (Monday) thru 6."""
+    day_month = _read_lines(f'{name}.tsv.gz')
+    if day_month is None:
+        return None
+
+    def unescape(s):
+        """Excel save as tsv escaped all '"' chars - undo that!"""
+        if len(s) < 2:
+            return s
+        if s[0] == '"' and s[-1] == '"':
+            return s[1:-1].replace('""', '"')
+        return s
+
+    day_month_map = {}
+    month_number = []          # field index to month number
+    for dm in day_month[1:]:    # Skip heading
+        fields = dm.split('\t')
+        if fields[1][0] == '*':
+            continue        # Skip the local time/date rows
+        dmm = {}
+        for f, fd in enumerate(fields[2:]):       # Start with Mon/Jan
+            dddd, ddd, mmmm, mmm, mmmmm, m = unescape(fd).split(',')
+            if f >= len(month_number) and m.isdigit():  # Use first row to define the month number mapping
+                month_number.append(int(m))
+            if month_number[f]-1 not in dmm:
+                dmm[month_number[f]-1] = [dddd, ddd, mmmm, mmm, mmmmm]
+        # If we start with anything but January, then we need to move the days to the proper place
+        if month_number[0] != 1:
+            dmt = [dmm[month_number[i]-1][:2] for i in range(7)]
+            for i in range(7):
+                dmm[i][:2] = dmt[i]
+        day_month_map[fields[1]] = [[month] + names for month, names in dmm.items()]
+    return day_month_map
+
+def _decode_day_month(entry):
+    return {month: SimpleNamespace(dddd=dddd, ddd=ddd, mmmm=mmmm, mmm=mmm, mmmmm=mmmmm)
+            for month, dddd, ddd, mmmm, mmm, mmmmm in entry}
+
+def _read_hebrew_years():
+    """Computes the Hebrew years that cover 1/1/1900 thru 12/31/9999 with convertdate, as [first year, day number
+    (days since 1/1/1900) that it starts on, [days in each year]].  The last year is only there for its start."""
+    from convertdate import hebrew, gregorian
+    jd_1900 = gregorian.to_jd(1900, 1, 1)
+    first_year = hebrew.from_gregorian(1900, 1, 1)[0]
+    last_year = hebrew.from_gregorian(9999, 12, 31)[0] + 1
+    starts = [int(hebrew.to_jd(year, 7, 1) - jd_1900) for year in range(first_year, last_year+1)]   # 1 Tishrei
+    return [first_year, starts[0], [b - a for a, b in zip(starts, starts[1:])]]
+
+def _read_hijri_years():
+    """Computes the Hijri years that cover 1/1/1900 thru 12/31/9999 with convertdate, like `_read_hebrew_years()`"""
+    from convertdate import islamic, gregorian
+    jd_1900 = gregorian.to_jd(1900, 1, 1)
+    first_year = islamic.from_gregorian(1900, 1, 1)[0]
+    last_year = islamic.from_gregorian(9999, 12, 31)[0] + 1
+    starts = [int(islamic.to_jd(year, 1, 1) - jd_1900) for year in range(first_year, last_year+1)]
+    return [first_year, starts[0], [b - a for a, b in zip(starts, starts[1:])]]
+
+def _decode_years(value):
+    first_year, first_start, year_days = value
+    return SimpleNamespace(first_year=first_year, starts=list(accumulate([first_start] + year_days)))
+
+def _read_currencies():
+    """Reads currencies.json as {country code: currency}"""
+    currency_file = _data_file('currencies.json')
+    if not os.path.isfile(currency_file):
+        return None
+    with open(currency_file, 'r', encoding='utf-8') as cf:
+        currencies = json.load(cf)
+    currency_map = {}
+    for country_name, attr in currencies.items():
+        if 'abbreviation' not in attr:
+            continue        # Skip the 'comment'
+        currency_map[attr['abbreviation']] = attr['currency']    # e.g. US to USD
+    return currency_map
+
+def _read_localize_table():
+    """Reads localize_table.yaml as {locale: [[format number, format], ...]}"""
+    table_file = _data_file('localize_table.yaml')
+    if not os.path.isfile(table_file):
+        return None
+    import yaml
+    with open(table_file, 'r', encoding='utf-8') as tf:
+        table_map = yaml.load(tf, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    return {loc: list(map(list, table.items())) for loc, table in table_map.items()}
+
+def _decode_localize_table(value):
+    return {loc: dict(table) for loc, table in value.items()}
+
+def _read_eras():
+    """Reads eras.tsv as {locale: [[ISO date, g, gg, ggg], ...]}"""
+    eras = _read_lines('eras.tsv')
+    if eras is None:
+        return None
+    era_map = {}
+    ploc = None
+    ea = []
+    for e in eras[1:]:    # Skip heading
+        loc, dt, g, gg, ggg = e.split('\t')
+        if ploc and loc != ploc:
+            era_map[ploc] = ea
+            ea = []
+        ea.append([date_parse(dt).date().isoformat(), g, gg, ggg])
+        ploc = loc
+    era_map[ploc] = ea
+    return era_map
+
+def _decode_eras(value):
+    return {loc: [SimpleNamespace(dt=date(*map(int, dt.split("-"))), g=g, gg=gg, ggg=ggg) for dt, g, gg, ggg in ea]
+            for loc, ea in value.items()}
+
+def _read_am_pm():
+    """Reads ampm.tsv as {locale: [AM, PM]}"""
+    am_pm = _read_lines('ampm.tsv')
+    if am_pm is None:
+        return None
+    am_pm_map = {}
+    for ap in am_pm[1:]:    # Skip heading
+        lcid, loc, am, pm = ap.split('\t')
+        am_pm_map[loc] = [am, pm]
+    return am_pm_map
+
+def _decode_am_pm(value):
+    return {loc: tuple(am_pm) for loc, am_pm in value.items()}
+
+def _read_numbers():
+    """Reads numbers.tsv as [[xx, [str of digits (0-9), 10, 100, 1000, etc]], ...]"""
+    numbers = _read_lines('numbers.tsv')
+    if numbers is None:
+        return None
+    numbers_map = []
+    for n in numbers[1:]:    # Skip heading
+        n_split = n.split('\t')
+        numbers_map.append([int(n_split[0], 16), n_split[2:]])
+    return numbers_map
+
+def _read_dbnum():
+    """Reads dbnum.tsv as {"DBNum,locale": [str of digits (0-9), 10, 100, 1000, etc]}"""
+    dbnum = _read_lines('dbnum.tsv')
+    if dbnum is None:
+        return None
+    dbnum_map = {}
+    for db in dbnum[1:]:    # Skip heading
+        db_split = db.split('\t')
+        key = f'{db_split[0]},{db_split[2]}'
+        dbnum_map[key] = db_split[4:]
+    return dbnum_map
+
+def _read_lcid():
+    """Reads lcid.tsv as [[Language ID, Language tag], ...]"""
+    lcid = _read_lines('lcid.tsv')
+    if lcid is None:
+        return None
+    return [[int(l_id, 16), l_t.strip()] for l_id, l_t in (lc.split('\t') for lc in lcid[1:])]     # Skip heading
+
+def _read_lc_all():     # Issue #13
+    """Reads lc_all.tsv.gz as {locale: {localeconv() item: value}}"""
+    lc_all = _read_lines('lc_all.tsv.gz')
+    if lc_all is None:
+        return None
+    import ast
+    keys = lc_all[0].split('\t')
+    lc_all_map = {}
+    for dm in lc_all[1:]:    # Skip heading
+        fields = dm.split('\t')
+        ln = fields[1]        # Locale name
+        lc_all_map[ln] = {}
+        for i, k in enumerate(keys[2:], start=2):   # Start after the locale
+            value = fields[i]
+            try:    # Convert ints back to int and lists back to list
+                value = ast.literal_eval(value)
+            except Exception:  # If it's a string, then it's already ok
+                pass
+            lc_all_map[ln][k] = value
+    return lc_all_map
+
+def _read_data_tables():
+    """Reads all of the data tables from their text files, returning {name: (value, keyed)}.
+    create/create_pack.py builds the data pack from these."""
+    tables = dict(currencies=(_read_currencies(), False), localize_table=(_read_localize_table(), False),
+            eras=(_read_eras(), False), ampm=(_read_am_pm(), False), numbers=(_read_numbers(), False),
+            dbnum=(_read_dbnum(), False), lcid=(_read_lcid(), False), lc_all=(_read_lc_all(), True),
+            hebrew_years=(_read_hebrew_years(), False), hijri_years=(_read_hijri_years(), False))
+    for cal in range(0x20):
+        for leap in ('', '_leap'):
+            name = f'daymonth{cal:02X}{leap}'
+            tables[name] = (_read_day_month(name), True)
+    return {name: table for name, table in tables.items() if table[0] is not None}
+
+class _lazy_table:
+    """A class attribute of SSF_LOCALE that is loaded the first time it's used.  The ``loader``
+    function sets the real class attribute(s), which replace this object."""
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        owner = owner or type(obj)
+        with _data_lock:
+            if owner.__dict__.get(self.name) is self:
+                self.loader(owner)
+        return getattr(owner, self.name)
+
+def _load_currency_map(cls):
+    cls.currency_map = _load_data('currencies', _read_currencies) or {}
+
+def _load_table_map(cls):
+    cls.table_map = _load_data('localize_table', _read_localize_table, decode=_decode_localize_table) or {}
+
+def _load_era_map(cls):
+    cls.era_map = _load_data('eras', _read_eras, decode=_decode_eras) or {}
+
+def _load_am_pm_map(cls):
+    cls.am_pm_map = _load_data('ampm', _read_am_pm, decode=_decode_am_pm) or {}
+
+def _load_numbers_map(cls):
+    cls.numbers_map = dict(_load_data('numbers', _read_numbers) or [])
+
+def _load_dbnum_map(cls):
+    cls.dbnum_map = _load_data('dbnum', _read_dbnum) or {}
+
+def _load_lcid_map(cls):
+    """Loads lcid_map, lcid_reverse_map, and lcid_max together"""
+    lcid_map = {}           # Map from like 0x409 to 'en-US'
+    lcid_reverse_map = {}
+    lcid = _load_data('lcid', _read_lcid)
+    if lcid is not None:
+        from babel.core import default_locale
+        for i_id, l_t_s in lcid + [[0, default_locale() or 'en-US']]:   # Add a mapping for 0 for 'system default'
+            lcid_map[i_id] = l_t_s
+            lcid_reverse_map[l_t_s] = i_id
+    cls.lcid_map, cls.lcid_reverse_map, cls.lcid_max = lcid_map, lcid_reverse_map, max(lcid_map, default=0)
+
+def _load_lc_all_map(cls):      # Issue #13
+    cls.lc_all_map = _load_data('lc_all', _read_lc_all, keyed=True) or {}
+
 class SSF_LOCALE:
     """Handle locale support for SSF.  This shouldn't be used directly."""
-    lcid_map = None             # Language ID to Language tag, like 0x409 -> en-US
-    dbnum_map = None            # "DBNum,locale" to [str of digits (0-9), 10, 100, 1000, etc]
-    numbers_map = None          # xx to [str of digits (0-9), 10, 100, 1000, etc]
-    am_pm_map = None            # locale to ('AM', 'PM')
+    # Each of these tables is loaded from the data pack the first time it's used
+    lcid_map = _lazy_table(_load_lcid_map)          # Language ID to Language tag, like 0x409 -> en-US
+    dbnum_map = _lazy_table(_load_dbnum_map)        # "DBNum,locale" to [str of digits (0-9), 10, 100, 1000, etc]
+    numbers_map = _lazy_table(_load_numbers_map)    # xx to [str of digits (0-9), 10, 100, 1000, etc]
+    am_pm_map = _lazy_table(_load_am_pm_map)        # locale to ('AM', 'PM')
     # day_month_map = None        # locale to [('Monday', 'Mon', 'January', 'Jan', 'J'), ('Tuesday', ...), ...]
-    era_map = None              # locale to [SimpleNamespace(dt, g, gg, ggg), ...]
-    table_map = None            # locale to dict(N=formatN, M=formatM, ...)
-    currency_map = None         # country code to currency
-    lcid_reverse_map = None
-    lcid_max = 0
+    era_map = _lazy_table(_load_era_map)            # locale to [SimpleNamespace(dt, g, gg, ggg), ...]
+    table_map = _lazy_table(_load_table_map)        # locale to dict(N=formatN, M=formatM, ...)
+    currency_map = _lazy_table(_load_currency_map)  # country code to currency
+    lcid_reverse_map = _lazy_table(_load_lcid_map)
+    lcid_max = _lazy_table(_load_lcid_map)
     MAX_AMPM=6      # Max chars in "Morning" or "Afternoon", else we use "AM/PM"
     GANNEN='元'                 # Issue #9
-    lc_all_map = None           # Issue #10
+    lc_all_map = _lazy_table(_load_lc_all_map)      # Issue #10: locale to {localeconv() item: value}
+    _registry = {}          # SSF_LOCALE.shared() arguments to the frozen SSF_LOCALE, for every SSF object
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, locale=None, locale_support=True, locale_currency=True, decimal_separator=None, thousands_separator=None, calendar_code=None):
+        """Return a frozen SSF_LOCALE made with these arguments, which is shared by every SSF object in the
+        process, so each locale is only looked up once.  Raises the same errors as SSF_LOCALE()."""
+        key = (locale, locale_support, locale_currency, decimal_separator, thousands_separator, calendar_code)
+        try:
+            return cls._registry[key]
+        except KeyError:
+            pass
+        except TypeError:       # Not hashable, so not shared
+            return cls(locale, locale_support, locale_currency, decimal_separator, thousands_separator, calendar_code)
+        result = cls(locale, locale_support, locale_currency, decimal_separator, thousands_separator, calendar_code)
+        result._frozen = True
+        with cls._registry_lock:
+            return cls._registry.setdefault(key, result)
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"SSF_LOCALE {self.locale_name} is shared, so '{name}' can't be changed")
+        object.__setattr__(self, name, value)
+
+    def replace(self, **changes):
+        """Return a copy of this locale with the attributes in ``changes`` replaced.  The copy is frozen
+        if this one is."""
+        result = copy(self)
+        object.__setattr__(result, '_variants', {})
+        for name, value in changes.items():
+            object.__setattr__(result, name, value)
+        return result
+
+    def with_numerals(self, dbnum, numbers_xx):
+        """Return this locale with the [DBNum1-3] numerals ``dbnum`` and the native digits ``numbers_xx``
+        (from [$-xx000000]) instead of its own.  A shared locale is copied on write, and the copy is
+        shared too."""
+        if dbnum == self.dbnum and numbers_xx == self.numbers_xx:
+            return self
+        frozen = self.__dict__.get('_frozen')
+        if frozen:
+            result = self._variants.get((dbnum, numbers_xx))
+            if result is not None:
+                return result
+        result = self.replace(dbnum=dbnum, numbers_xx=numbers_xx)
+        if frozen:
+            with SSF_LOCALE._registry_lock:
+                result = self._variants.setdefault((dbnum, numbers_xx), result)
+        return result
 
     def __init__(self, locale=None, locale_support=True, locale_currency=True, decimal_separator=None, thousands_separator=None, calendar_code=None):
-        decimal.setcontext(decimal.Context(rounding=decimal.ROUND_HALF_UP))
+        self._variants = {}     # (dbnum, numbers_xx) to the copy made by with_numerals()
         self.currency_symbol='$'
         self.mon_decimal_point=decimal_separator or '.'
         self.mon_thousands_sep=thousands_separator or ','
@@ -339,6 +813,7 @@ class SSF_LOCALE:
         self.long_date_format='dddd, mmmm dd, yyyy'
         self.locale = None
         self.locale_name = 'local'
+        self.group_sizes = None     # (primary, secondary) digits per group from babel, used by commaify()
         self.dbnum = None
         self.numbers_xx = None
         self.text_direction = 'ltr'
@@ -355,41 +830,6 @@ class SSF_LOCALE:
             self.months.append([calendar.month_abbr[month][0], calendar.month_abbr[month], calendar.month_name[month]])
         self.months_leap = self.months
         if locale_support:
-            if SSF_LOCALE.currency_map is None:
-                currency_file = os.path.join(os.path.dirname(__file__), 'currencies.json')
-                SSF_LOCALE.currency_map = {}
-                if os.path.isfile(currency_file):
-                    with open(currency_file, 'r', encoding='utf-8') as cf:
-                        currencies = json.load(cf)
-                    for country_name, attr in currencies.items():
-                        if 'abbreviation' not in attr:
-                            continue        # Skip the 'comment'
-                        SSF_LOCALE.currency_map[attr['abbreviation']] = attr['currency']    # e.g. US to USD
-
-            if SSF_LOCALE.table_map is None:
-                table_file = os.path.join(os.path.dirname(__file__), 'localize_table.yaml')
-                SSF_LOCALE.table_map = {}
-                if os.path.isfile(table_file):
-                    with open(table_file, 'r', encoding='utf-8') as tf:
-                        SSF_LOCALE.table_map = yaml.safe_load(tf)
-
-            if SSF_LOCALE.era_map is None:
-                era_file = os.path.join(os.path.dirname(__file__), 'eras.tsv')
-                SSF_LOCALE.era_map = {}
-                if os.path.isfile(era_file):
-                    with open(era_file, 'r', encoding='utf-8') as ef:
-                        eras = ef.read().splitlines()
-                    ploc = None
-                    ea = []
-                    for e in eras[1:]:    # Skip heading
-                        loc, dt, g, gg, ggg = e.split('\t')
-                        if ploc and loc != ploc:
-                            SSF_LOCALE.era_map[ploc] = ea
-                            ea = []
-                        ea.append(SimpleNamespace(dt=date_parse(dt).date(), g=g, gg=gg, ggg=ggg))
-                        ploc = loc
-                    SSF_LOCALE.era_map[ploc] = ea
-
             # Handled by SSF_CALENDAR now
             #if SSF_LOCALE.day_month_map is None:
                 #day_month_file = os.path.join(os.path.dirname(__file__), 'daymonth.tsv')
@@ -405,56 +845,9 @@ class SSF_LOCALE:
                             #dmm.append(SimpleNamespace(dddd=dddd, ddd=ddd, mmmm=mmmm, mmm=mmm, mmmmm=mmmmm))
                         #SSF_LOCALE.day_month_map[fields[1]] = dmm
 
-            if SSF_LOCALE.am_pm_map is None:
-                am_pm_file = os.path.join(os.path.dirname(__file__), 'ampm.tsv')
-                SSF_LOCALE.am_pm_map = {}
-                if os.path.isfile(am_pm_file):
-                    with open(am_pm_file, 'r', encoding='utf-8') as af:
-                        am_pm = af.read().splitlines()
-                    for ap in am_pm[1:]:    # Skip heading
-                        lcid, loc, am, pm = ap.split('\t')
-                        SSF_LOCALE.am_pm_map[loc] = (am, pm)
-
-            if SSF_LOCALE.numbers_map is None:
-                numbers_file = os.path.join(os.path.dirname(__file__), 'numbers.tsv')
-                SSF_LOCALE.numbers_map = {}
-                if os.path.isfile(numbers_file):
-                    with open(numbers_file, 'r', encoding='utf-8') as nf:
-                        numbers = nf.read().splitlines()
-                    for n in numbers[1:]:    # Skip heading
-                        n_split = n.split('\t')
-                        key = int(n_split[0], 16)
-                        SSF_LOCALE.numbers_map[key] = n_split[2:]
-
-            if SSF_LOCALE.dbnum_map is None:
-                dbnum_file = os.path.join(os.path.dirname(__file__), 'dbnum.tsv')
-                SSF_LOCALE.dbnum_map = {}
-                if os.path.isfile(dbnum_file):
-                    with open(dbnum_file, 'r', encoding='utf-8') as df:
-                        dbnum = df.read().splitlines()
-                    for db in dbnum[1:]:    # Skip heading
-                        db_split = db.split('\t')
-                        key = f'{db_split[0]},{db_split[2]}'
-                        SSF_LOCALE.dbnum_map[key] = db_split[4:]
-
+            from babel.core import default_locale, Locale
             def_locale = default_locale() or 'en-US'
 
-            if SSF_LOCALE.lcid_map is None:
-                lcid_file = os.path.join(os.path.dirname(__file__), 'lcid.tsv')
-                SSF_LOCALE.lcid_map = {}      # Map from like 0x409 to 'en-US'
-                SSF_LOCALE.lcid_reverse_map = {}
-                if os.path.isfile(lcid_file):
-                    with open(lcid_file, 'r', encoding='utf-8') as lf:
-                        lcid = lf.read().splitlines()
-                    lcid.append(f'0\t{def_locale}')     # Add a mapping for 0 for 'system default'
-                    for lc in lcid[1:]:     # Skip heading
-                        l_id, l_t = lc.split('\t')
-                        i_id = int(l_id, 16)
-                        l_t_s = l_t.strip()
-                        SSF_LOCALE.lcid_map[i_id] = l_t_s
-                        SSF_LOCALE.lcid_reverse_map[l_t_s] = i_id
-                        SSF_LOCALE.lcid_max = max(SSF_LOCALE.lcid_max, i_id)
-
             if isinstance(locale, str) and locale.lower().endswith('-x-gannen'):     # Issue #9
                 locale = locale[:-9]
                 self.gannen = SSF_LOCALE.GANNEN
@@ -463,53 +856,10 @@ class SSF_LOCALE:
                 locale = self.lcid_map[locale]
 
             sep = '-' if '-' in locale else '_'
-            if locale_currency:
-                if SSF_LOCALE.lc_all_map is None:       # Issue #13
-                    lc_all_file = os.path.join(os.path.dirname(__file__), f'lc_all.tsv.gz')
-                    SSF_LOCALE.lc_all_map = {}
-                    if os.path.isfile(lc_all_file):
-                        with gzip.open(lc_all_file, 'rt', encoding='utf-8') as laf:
-                            lc_all = laf.read().splitlines()
-                        keys = lc_all[0].split('\t')
-                        for dm in lc_all[1:]:    # Skip heading
-                            fields = dm.split('\t')
-                            ln = fields[1]        # Locale name
-                            lc_all_map = {}
-                            for i, k in enumerate(keys[2:], start=2):   # Start after the locale
-                                value = fields[i]
-                                try:    # Convert ints back to int and lists back to list
-                                    value = ast.literal_eval(value)
-                                except Exception:  # If it's a string, then it's already ok
-                                    pass
-                                lc_all_map[k] = value
-                            SSF_LOCALE.lc_all_map[ln] = lc_all_map
+            if locale_currency:     # Locales that aren't in lc_all (see create/create_lc_all_cldr.py) keep the defaults
                 if locale in SSF_LOCALE.lc_all_map:
                     for item, value in SSF_LOCALE.lc_all_map[locale].items():
                         setattr(self, item, value)      # Promote it to self
-                else:           # Note: Most cases are handled by the code above, but try looking it up if we don't otherwise know it
-                    try:
-                        try:        # Issue #10
-                            lcl.setlocale(lcl.LC_MONETARY, locale)
-                        except Exception:       # v0.2.1: Handle unix-based locales by changing '-' to '_' and doing some lookups
-                            locale2 = locale.replace('-', '_')
-                            linux_lang_map = dict(nb="bokmal", ca="catalan", hr="croatian", cs="czech", da="danish", de="deutsch",
-                                nl="dutch", et="estonian", fi="finnish", fr="french", gl="galician", el="greek", he="hebrew", hu="hungarian", 
-                                it="italian", ja="japanese", ko="korean", lt="lithuanian", no="norwegian", nn="nynorsk", pl="polish", pt="portuguese", ro="romanian",
-                                ru="russian", sk="slovak", sl="slovenian", es="spanish", sv="swedish", th="thai", tr="turkish")
-                            linux_lang_map['is'] = 'icelandic'  # 'is' is a keyword
-                            locale2 = linux_lang_map.get(locale2, locale2)
-                            lcl.setlocale(lcl.LC_MONETARY, locale2)
-
-                        conv = lcl.localeconv()     # pragma nocover
-                        """{'int_curr_symbol': 'USD', 'currency_symbol': '$', 'mon_decimal_point': '.', 'mon_thousands_sep': ',', 'mon_grouping': [3, 0], 'positive_sign': '', 'negative_sign': '-', 'int_frac_digits': 2, 'frac_digits': 2, 'p_cs_precedes': 1, 'p_sep_by_space': 0, 'n_cs_precedes': 1, 'n_sep_by_space': 0, 'p_sign_posn': 3, 'n_sign_posn': 0}"""
-                        if conv['currency_symbol'] == 'EUR':    # pragma nocover    # Issue #10
-                            conv['currency_symbol'] = '\u20AC'  # real Euro symbol
-                        for item, value in conv.items():    # pragma nocover
-                            setattr(self, item, value)      # Promote it to self
-                    except Exception:
-                        pass
-                    finally:
-                        lcl.setlocale(lcl.LC_MONETARY, '') # Set it back to default
 
             self.locale_name = locale
             try:
@@ -539,7 +889,7 @@ class SSF_LOCALE:
 
             self.calendar_code = calendar_code
             self.calendar = SSF_CALENDAR(calendar_code)
-            self.b2_calendar = SSF_CALENDAR(SSF_CALENDAR.HIJRI)
+            self._b2_calendar = None        # Only made if we see a 'B2' format
 
             #if SSF_LOCALE.day_month_map and self.locale_name in SSF_LOCALE.day_month_map:
                 #self.days = []
@@ -583,6 +933,7 @@ class SSF_LOCALE:
                         replace('M', 'm')
                 self.long_date_format = re.sub(r'\bd\b', 'dd', self.long_date_format)
                 self.long_date_format = re.sub(r'\by\b', 'yyyy', self.long_date_format)
+                self.group_sizes = SSF_LOCALE._babel_group_sizes(locale)
             #elif SSF_LOCALE.day_month_map and self.locale_name in SSF_LOCALE.day_month_map:
             elif from_map:
                 if decimal_separator is not None:
@@ -592,6 +943,12 @@ class SSF_LOCALE:
             else:
                 raise ValueError(f'Locale {self.locale_name} not found!')
 
+    @property
+    def b2_calendar(self):
+        if self._b2_calendar is None:       # Made even if this locale is frozen
+            object.__setattr__(self, '_b2_calendar', SSF_CALENDAR(SSF_CALENDAR.HIJRI))
+        return self._b2_calendar
+
     def normalize_locale(self, locale):
         """Normalize locale based on examples in the lcid/locale map"""
         if locale is None:
@@ -628,6 +985,18 @@ class SSF_LOCALE:
         return locale
 
 
+    @staticmethod
+    def _babel_group_sizes(locale):
+        """The (primary, secondary) group sizes that babel's format_decimal() uses for ``locale``, like
+        (3, 3) for en-US or (3, 2) for hi-IN, or None if they can't be found"""
+        try:
+            primary, secondary = locale.decimal_formats[None].grouping
+        except Exception:
+            return None
+        if not (0 < primary < 1000 and 0 < secondary < 1000):
+            return None
+        return primary, secondary
+
     #/*jshint +W086 */
     def commaify(self, s):        # Add commas to ints
         if not s:
@@ -637,13 +1006,27 @@ class SSF_LOCALE:
             ln = len(s.lstrip())
             df = ls-ln
             return s[:df] + self.commaify(s[df:])
+        if self.group_sizes is not None and not s.strip('0123456789'):
+            primary, secondary = self.group_sizes       # Group the digits like format_decimal() would
+            ln = len(s)
+            if ln <= primary:
+                return s
+            j = (ln - primary) % secondary or secondary
+            parts = [s[:j]]
+            while j < ln - primary:
+                parts.append(s[j:j+secondary])
+                j += secondary
+            parts.append(s[j:])
+            return self.thousands_sep.join(parts)
         if self.locale is not None:
-            if s[0] == '0':         # Special processing for leading zeros
-                i = int('1'+s)      # Protect them with a leading '1', which we later remove
-                result = format_decimal(i, locale=self.locale)
-                result = re.sub(r'^1(?:' + re.escape(self.locale.number_symbols['group']) + r')?(.*)$', r'\1', result)
-            else:
-                result = format_decimal(int(s), locale=self.locale)
+            from babel.numbers import format_decimal
+            with decimal.localcontext(_DECIMAL_CONTEXT):
+                if s[0] == '0':         # Special processing for leading zeros
+                    i = int('1'+s)      # Protect them with a leading '1', which we later remove
+                    result = format_decimal(i, locale=self.locale)
+                    result = re.sub(r'^1(?:' + re.escape(self.locale.number_symbols['group']) + r')?(.*)$', r'\1', result)
+                else:
+                    result = format_decimal(int(s), locale=self.locale)
             if self.thousands_sep != self.locale.number_symbols['group']:
                 result = result.replace(self.locale.number_symbols['group'], self.thousands_sep)
             return result
@@ -689,6 +1072,16 @@ class SSF:
     parameter specifies what to do on locale (and other) errors.  The default is to warn using the warnings
     module, then ignore the error.  The other choices are 'ignore', which completely ignores the error,
     'pounds', which fills the result with '#' characters, and 'raise', which will raise a ValueError exception.
+
+    The ``format_cache_size`` gives the number of parsed formats that ``ssf.format()`` keeps around, so that
+    formatting many values with the same format doesn't parse it each time.  The least recently used format
+    is dropped when the cache is full.  Set it to 0 to disable the cache.  See `format_cache_info()`.
+
+    The ``result_cache_size``, if not 0, turns on a cache of the strings returned by ``ssf.format()`` for
+    repeated values, which are common in spreadsheet columns.  It gives the number of results kept, and
+    ``result_cache_bytes``, if not None, also limits their total size.  The least recently used result is
+    dropped first.  Values are only cached if they are numbers, bools, strings, dates, times, or None, and
+    their type is part of the key, so ``1``, ``1.0`` and ``True`` are kept apart.  See `result_cache_info()`.
     """
     #var make_ssf = function make_ssf(SSF){
     #SSF.version = '0.11.2';
@@ -696,48 +1089,59 @@ class SSF:
 
     def __init__(self, tzinfo=None, date1904=False, dateNF=None, table=None, color_pre=None, color_post=None,
             locale_support=True, locale=None, default_width=None, decimal_separator=None, thousands_separator=None,
-            errors='warn'):
+            errors='warn', format_cache_size=128, result_cache_size=0, result_cache_bytes=None):
         
         self.color_pre = color_pre
         self.color_post = color_post
-        self.fmt_calendar_code = None       # Calendar code from the format string (if any)
         self._errors = errors.lower().replace('pounds', 'pound') if errors else errors
-        self._pound_sand = False
         self._default_width = default_width
+        self._lock = threading.RLock()      # Guards the table and the format cache
+        error = None
         try:
-            self.curl = SSF_LOCALE(locale_support=locale_support, locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+            self.curl = SSF_LOCALE.shared(locale_support=locale_support, locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
         except Exception as e:
-            self._value_error(e)
-            self.curl = SSF_LOCALE(locale_support=locale_support, locale=None, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+            error = e
+            self.curl = SSF_LOCALE.shared(locale_support=locale_support, locale=None, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+        self._ctx = _FormatContext(self.curl)
+        if error is not None:
+            self._value_error(error)
         self.locale = self.curl.locale_name
-        self.table_fmt = {}
-        self._init_table(self.table_fmt)
+        # Formats loaded with load_entry(), over the table for our locale.  Other locales swap the second map.
+        self.table_fmt = ChainMap(_LoadedFormats(self._table_changed), SSF._locale_table(self.curl.locale_name if locale_support else None))
 
         # We have to maintain 3 separate locales - the one specified in the SSF object creation (self.curl),
         # the one specified in the ssf.format() method (self.fmtl), and possibly one specified in the format
         # itself like [$-804]: (self.tmpl).  The self.fmtl is used for number formatting, while the self.tmpl is
-        # used to get the names of days and months.
+        # used to get the names of days and months.  The last two are kept in self._ctx.
 
-        self.tmpl = self.fmtl = self.curl   # Locale specified by the format
         self._locale_cache = {}
         self.locale_support = locale_support
         if locale_support:
-            self._localize_table_from_locale(self.curl.locale_name)
             s_l = self.curl.locale_name
             s_l += decimal_separator if decimal_separator and decimal_separator != self.curl.decimal_point else ''
             s_l += thousands_separator if thousands_separator and thousands_separator != self.curl.thousands_sep else ''
             self._locale_cache[s_l] = self.curl
             if SSF_LOCALE.lcid_reverse_map and s_l in SSF_LOCALE.lcid_reverse_map:
                 self._locale_cache[str(SSF_LOCALE.lcid_reverse_map[s_l])] = self.curl
-        self._tzinfo = tzinfo
-        if not tzinfo:
-            self._tzinfo = tzlocal()
+        self._tz = tzinfo or None           # The local timezone is looked up when we first need it
+        self._base1904 = self._dnthresh = self._basedate_offset = None
+        self._day_offsets = {}              # (year, month, day) to the timezone offset for the whole day, or None
         self._opts = SimpleNamespace(date1904=date1904, dateNF=dateNF, table=table)
+        self._format_cache = OrderedDict()       # (fmt, locale, separators, dateNF) to CompiledFormat
+        self._format_cache_size = format_cache_size
+        self._format_cache_hits = self._format_cache_misses = self._format_cache_evictions = 0
+        self._get_format_cache = {}         # get_format() arguments and dateNF to (fmtl, format)
+        self._result_cache = OrderedDict()  # (CompiledFormat, width, align, colors, type, value) to the result
+        self._result_cache_size = result_cache_size
+        self._result_cache_bytes = result_cache_bytes
+        self._result_cache_currbytes = 0
+        self._result_cache_hits = self._result_cache_misses = self._result_cache_evictions = 0
+        self._builtin_formats = {}          # (locale, dateNF) to the CompiledFormat of each built-in format id
+        self._styles = []                   # The numFmtId of each cell style from load_styles()
+        self._style_formats = None          # The CompiledFormat of each cell style, made when first needed
         self.gregorian_epoch = datetime(1582, 10, 15, tzinfo=timezone.utc)   # Start of the Gregorian Calendar
         self.basedate = datetime(1899, 12, 31, 0, 0, 0)
         basedate_utc = datetime(1899, 12, 31, 0, 0, 0, tzinfo=timezone.utc)
-        self.dnthresh = self.getTime(self.basedate)
-        self.base1904 = datetime(1900, 3, 1, 0, 0, 0, tzinfo=self._tzinfo)
 
         self.rgb_colors = ['000000', 
                 '000000', 'FFFFFF', 'FF0000', '00FF00', '0000FF', 'FFFF00', 'FF00FF', '00FFFF', '800000', '008000', # 1-10
@@ -754,6 +1158,63 @@ class SSF:
         for n in range(1, len(self.rgb_colors)):
             self.color_map[f'Color{n}'] = n
 
+    @property
+    def _tzinfo(self):
+        if self._tz is None:
+            from dateutil.tz import tzlocal
+            self._tz = tzlocal()
+        return self._tz
+
+    @property
+    def dnthresh(self):
+        if self._dnthresh is None:
+            self._dnthresh = self.getTime(self.basedate)
+        return self._dnthresh
+
+    @property
+    def basedate_offset(self):
+        if self._basedate_offset is None:
+            self._basedate_offset = self.getTimezoneOffset(self.basedate)
+        return self._basedate_offset
+
+    @property
+    def base1904(self):
+        if self._base1904 is None:
+            self._base1904 = datetime(1900, 3, 1, 0, 0, 0, tzinfo=self._tzinfo)
+        return self._base1904
+
+    @property
+    def fmtl(self):
+        return self._ctx.fmtl
+
+    @fmtl.setter
+    def fmtl(self, value):
+        self._ctx.fmtl = value
+
+    @property
+    def tmpl(self):
+        return self._ctx.tmpl
+
+    @tmpl.setter
+    def tmpl(self, value):
+        self._ctx.tmpl = value
+
+    @property
+    def fmt_calendar_code(self):
+        return self._ctx.fmt_calendar_code
+
+    @fmt_calendar_code.setter
+    def fmt_calendar_code(self, value):
+        self._ctx.fmt_calendar_code = value
+
+    @property
+    def _pound_sand(self):
+        return self._ctx.pound_sand
+
+    @_pound_sand.setter
+    def _pound_sand(self, value):
+        self._ctx.pound_sand = value
+
     def _value_error(self, e):
         if self._errors == 'warn':
             warnings.warn(e)
@@ -774,6 +1235,26 @@ class SSF:
         dt_utc = dt.replace(tzinfo=timezone.utc)
         return (dt_utc - self.gregorian_epoch).total_seconds() * 1000 + self.getTimezoneOffset(dt)*60*1000
 
+    def _day_offset(self, dt):
+        """getTimezoneOffset(dt) for ``dt`` in our timezone, remembered for each day that starts and ends with the
+        same offset.  The offset only depends on the date and time in ``dt``, and days with a transition
+        aren't cached."""
+        key = (dt.year, dt.month, dt.day)
+        offset = self._day_offsets.get(key, False)
+        if offset is False:
+            offset = None
+            try:
+                start = dt.replace(hour=0, minute=0, second=0, microsecond=0, fold=0)
+                offset = self.getTimezoneOffset(start)
+                if offset != self.getTimezoneOffset(start + timedelta(days=1)):
+                    offset = None
+            except OverflowError:
+                pass
+            self._day_offsets[key] = offset
+        if offset is None:
+            return self.getTimezoneOffset(dt)
+        return offset
+
     @staticmethod
     def toPrecision(v, p):
         """Emulates JavaScript's flt.toPrecision(p)"""
@@ -783,9 +1264,21 @@ class SSF:
             v = -v
         np = math.floor(math.log10(v))+1 if v != 0 else 0
         pp = p - np
-        rv = SSF.round(v, pp)      # Use our JavaScript-like rounding instead of the "round to even" that python gives
-        result = format(rv, '-.%dg' % p)
-        de = result.split('e')
+        digits = _significant_digits(v, p, pp)
+        if digits is None:
+            rv = SSF.round(v, pp)      # Use our JavaScript-like rounding instead of the "round to even" that python gives
+            de = format(rv, '-.%dg' % p).split('e')
+        else:                       # Lay out the digits like format(rv, '-.%dg' % p) does
+            d, x = digits
+            d = d.rstrip('0')
+            if -4 <= x < p:
+                if x >= 0:
+                    f = d[x+1:]
+                    de = [d[:x+1].ljust(x+1, '0') + ('.' + f if f else '')]
+                else:
+                    de = ['0.' + '0' * (-x-1) + d]
+            else:
+                de = [d[0] + ('.' + d[1:] if len(d) > 1 else ''), ('-' if x < 0 else '+') + '%02d' % abs(x)]
         if '.' in de[0]:
             digits = len(de[0])-1
             de[0] += '0' * (p-digits)
@@ -795,7 +1288,7 @@ class SSF:
                 de[0] += '.' + '0' * (p-digits)
 
         if len(de) == 2:        # We have an exponent
-            de[1] = 'e' + re.sub(r'([+-])0(\d)', r'\1\2', de[1])       # Change e-09 to e-9
+            de[1] = 'e' + (de[1][0] + de[1][2:] if de[1][1] == '0' else de[1])    # Change e-09 to e-9
         else:
             de.append('')
         result = s + de[0] + de[1]      # Sign + mantissa + exponent
@@ -832,10 +1325,10 @@ class SSF:
             av = abs(v)
             if av == 0.0:
                 return '0'
-            if av < 0.0001:     # issues/80
-                return format_decimal(v, format='@@@@@@@@@@@@@@@', locale='en_US')
-            elif av > 1E22:     # issues/80
-                return format_decimal(v, format='@@@@@@@@@@@@@@@', locale='en_US')
+            if av < 0.0001 or av > 1E22:     # issues/80
+                from babel.numbers import format_decimal
+                with decimal.localcontext(_DECIMAL_CONTEXT):
+                    return format_decimal(v, format='@@@@@@@@@@@@@@@', locale='en_US')
             elif int(v) == v:
                 return str(int(v))
             return str(v)
@@ -896,10 +1389,14 @@ class SSF:
     #function pad0r(v,d){if(v>p2_32||v<-p2_32) return pad0r1(v,d); var i = Math.round(v); return pad0r2(i,d); }
     @staticmethod
     def _pad0r(v,d):
-        if(v>SSF._p2_32 or v<-SSF._p2_32):
-            return SSF._pad0r1(v,d)
-        i = SSF.round(v)
-        return SSF._pad0r2(i,d)
+        # Same as pad0r1 and pad0r2 above, with SSF.round done in integers
+        if isinstance(v, int):
+            t = str(v)
+        elif v > 1e22 or v < -1e22:     # Issue #7
+            t = SSF.to_str(v)
+        else:
+            t = str(int(v + 0.5) if v >= 0 else int(v - 0.5))
+        return t.rjust(d, '0')
 
     #function isgeneral(s, i) { i = i || 0; return s.length >= 7 + i && (s.charCodeAt(i)|32) === 103 && (s.charCodeAt(i+1)|32) === 101 && (s.charCodeAt(i+2)|32) === 110 && (s.charCodeAt(i+3)|32) === 101 && (s.charCodeAt(i+4)|32) === 114 && (s.charCodeAt(i+5)|32) === 97 && (s.charCodeAt(i+6)|32) === 108; }
     @staticmethod
@@ -932,7 +1429,8 @@ class SSF:
         #['D', 'Dec', 'December']
     #]
 
-    def _init_table(self, t):
+    @staticmethod
+    def _init_table(t):
         t[0]=  'General'
         t[1]=  '0'
         t[2]=  '0.00'
@@ -971,6 +1469,29 @@ class SSF:
         t[56]= '"上午/下午 "hh"時"mm"分"ss"秒 "'
 
 
+    _locale_tables = {}         # locale name to the read-only table of _init_table() with its table_map entries
+
+    @classmethod
+    def _locale_table(cls, locale_name):
+        """The table of format ids for ``locale_name``: the built-in formats, with any from localize_table.yaml
+        replacing them.  These are made once, shared, and never changed."""
+        try:
+            return cls._locale_tables[locale_name]
+        except KeyError:
+            pass
+        t = {}
+        cls._init_table(t)
+        t.update(SSF_LOCALE.table_map.get(locale_name, {}))
+        table = cls._locale_tables[locale_name] = MappingProxyType(t)
+        return table
+
+    def _table_for(self, locale_name):
+        """Our table of format ids when formatting for ``locale_name``"""
+        table = self.table_fmt
+        if not self.locale_support or locale_name == self.curl.locale_name:
+            return table
+        return ChainMap(table.maps[0], SSF._locale_table(locale_name))
+
     #/* Defaults determined by systematically testing in Excel 2019 */
 
     #/* These formats appear to default to other formats in the table */
@@ -1095,76 +1616,45 @@ class SSF:
         dt = int(v)
         # issues/71 time = math.floor(86400 * (v - dt))
         time = int(86400 * (v - dt))        # issues/71
-        dow=0
-        dout=[]
-        #out=SimpleNamespace(D=dt, T=time, u=86400*(v-dt)-time,y=0,m=0,d=0,H=0,M=0,S=0,q=0)
-        out=SimpleNamespace(D=dt, T=time, u=86400*(v-dt)-time,y=0,m=0,d=0,H=0,M=0,S=0,q=0,L=False,e=None)
-        if abs(out.u) < 1e-6:
-            out.u = 0           # Truncate microseconds due to float rounding
+        D = dt
+        T = time
+        u = 86400*(v-dt)-time
+        if abs(u) < 1e-6:
+            u = 0           # Truncate microseconds due to float rounding
         if opts and opts.date1904:
             dt += 1462
-        if out.u > 0.9999:      # Correct for float rounding
-            out.u = 0;
+        if u > 0.9999:      # Correct for float rounding
+            u = 0
             time += 1
             if time == 86400:
-                out.T = time = 0
+                T = time = 0
                 dt += 1
-                out.D += 1
-        elif out.u < -0.9999:      # Correct for float rounding
-            out.u = 0;
+                D += 1
+        elif u < -0.9999:      # Correct for float rounding
+            u = 0
             time -= 1
             if time <= -86400:
-                out.T = time = 0
+                T = time = 0
                 dt -= 1
-                out.D -= 1
-        """Due to a bug in Lotus 1-2-3 which was propagated by Excel and other variants,
-           the year 1900 is recognized as a leap year.  JS has no way of representing that
-           abomination as a `Date`, so the easiest way is to store the data as a tuple.
-
-           February 29, 1900 (date `60`) is recognized as a Wednesday.  Date `0` is treated
-           as January 0, 1900 rather than December 31, 1899.
-        """
-        if dt == 60:
-            # Issue #14 dout = [1317,10,29] if b2 else [1900,2,29]
-            dout = [1900,2,29]  # Issue #14
-            dow=3
-        elif dt == 0:
-            # Issue #14 dout = [1317,8,29] if b2 else [1900,1,0]
-            dout = [1900,1,0]   # Issue #14
-            dow=6
+                D -= 1
+        y, m, d, dow = _date_from_days(dt)
+        if self.fmt_calendar_code or b2:
+            dout = [y, m, d]
+            L, e = self._fix_calendar(dout, b2)
+            y, m, d = dout
         else:
-            if dt > 60:
-                dt -= 1
-            #/* 1 = Jan 1 1900 in Gregorian */
-            d = date(1900, 1, 1)
-            #d.setDate(d.getDate() + date - 1);
-            d = d + timedelta(days=dt-1)
-            #dout = [d.getFullYear(), d.getMonth()+1,d.getDate()];
-            dout = [d.year, d.month, d.day]
-            #dow = d.getDay();
-            dow = (d.weekday()+1) % 7   # SUN=0, SAT=6
-            if dt < 60:
-                dow = (dow + 6) % 7     # Fixup day of week for the year 1900 bug, described above
-            #if b2:
-                #dow = SSF._fix_hijri(dt, d, dout)
-        out.L, out.e = self._fix_calendar(dout, b2)
-        
-        out.y = dout[0]
-        out.m = dout[1]
-        out.d = dout[2]
+            L, e = False, None
+
         #71 out.S = time % 60
         #71 time = math.floor(time / 60)
         t = int(time / 60)      #71
-        out.S = time - t * 60   #71
+        S = time - t * 60       #71
         time = t                #71
         #71 out.M = time % 60
         #71 time = math.floor(time / 60)
         t = int(time / 60)      #71
-        out.M = time - t * 60   #71
-        time = t                #71
-        out.H = time
-        out.q = dow
-        return out
+        M = time - t * 60       #71
+        return _DateCode(D, T, u, y, m, d, t, M, S, dow, L, e)
 
     #SSF.parse_date_code = parse_date_code;
     #var basedate = new Date(1899, 11, 31, 0, 0, 0);
@@ -1183,14 +1673,62 @@ class SSF:
 
         if v.tzinfo is None:
             v = v.replace(tzinfo=self._tzinfo)
-        epoch = self.getTime(v)
+        offset = self._day_offset(v) if v.tzinfo is self._tzinfo else self.getTimezoneOffset(v)
+        #epoch = self.getTime(v)
+        epoch = (v.replace(tzinfo=timezone.utc) - self.gregorian_epoch).total_seconds() * 1000 + offset*60*1000
         if date1904:
             epoch -= 1461*24*60*60*1000
         elif v >= self.base1904:
             epoch += 24*60*60*1000
 
         #return (epoch - (dnthresh + (v.getTimezoneOffset() - basedate.getTimezoneOffset()) * 60000)) / (24 * 60 * 60 * 1000);
-        return (epoch - (self.dnthresh + (self.getTimezoneOffset(v) - self.getTimezoneOffset(self.basedate)) * 60000)) / (24 * 60 * 60 * 1000)
+        return (epoch - (self.dnthresh + (offset - self.basedate_offset) * 60000)) / (24 * 60 * 60 * 1000)
+
+    def _datenum_local_many(self, values, date1904):
+        """_datenum_local() for each of ``values``, returning a list.  Naive datetimes (the usual case) are
+        converted here without the per-value checks."""
+        tz = self._tzinfo
+        utc = timezone.utc
+        epoch0 = self.gregorian_epoch
+        base1904 = self.base1904
+        dnthresh = self.dnthresh
+        basedate_offset = self.basedate_offset
+        day_offset = self._day_offset
+        result = []
+        for v in values:
+            if type(v) is not datetime or v.tzinfo is not None:
+                result.append(self._to_serial(v, date1904))
+                continue
+            v = v.replace(tzinfo=tz)
+            offset = day_offset(v)
+            epoch = (v.replace(tzinfo=utc) - epoch0).total_seconds() * 1000 + offset*60*1000
+            if date1904:
+                epoch -= 1461*24*60*60*1000
+            elif v >= base1904:
+                epoch += 24*60*60*1000
+            result.append((epoch - (dnthresh + (offset - basedate_offset) * 60000)) / (24 * 60 * 60 * 1000))
+        return result
+
+    def _to_serial(self, v, date1904):
+        """_datenum_local() for any of the values that to_serial_many() takes"""
+        if v is None or v != v:         # NaN or NaT
+            return math.nan
+        if isinstance(v, (int, float)):
+            return float(v)
+        if isinstance(v, datetime):
+            if type(v) is not datetime:     # e.g. a pandas Timestamp
+                v = datetime(v.year, v.month, v.day, v.hour, v.minute, v.second, v.microsecond, v.tzinfo, fold=v.fold)
+        elif not isinstance(v, (date, tm, timedelta)):
+            kind = getattr(getattr(v, 'dtype', None), 'kind', None)
+            if kind == 'M':
+                v = v.astype('datetime64[us]').item()
+                if not isinstance(v, datetime):     # Out of the datetime range
+                    return math.nan
+            elif kind == 'm':
+                v = v.astype('timedelta64[us]').item()
+            else:
+                raise TypeError(f"Can't convert {v!r} to a serial number")
+        return self._datenum_local(v, date1904)
 
     #/* The longest 32-bit integer text is "-4294967296", exactly 11 chars */
     #function general_fmt_int(v) { return v.toString(10); }
@@ -1204,19 +1742,23 @@ class SSF:
     #/* Note: `toPrecision` uses standard form when prec > E and E >= -6 */
     def _general_fmt_num(self, v, width=None):
         #var trailing_zeroes_and_decimal = /(?:\.0*|(\.\d*[1-9])0+)$/;
-        trailing_zeroes_and_decimal = r'(?:\.0*|(\.\d*[1-9])0+)$'
         def strip_decimal(o):
             #return (o.indexOf(".") == -1) ? o : o.replace(trailing_zeroes_and_decimal, "$1");
-            return o if (o.find(".") == -1) else re.sub(trailing_zeroes_and_decimal, r"\1", o)
+            p = o.rfind(".")
+            if p == -1 or o[p+1:].strip('0123456789'):
+                return o
+            f = o[p+1:].rstrip('0')
+            return o[:p] + '.' + f if f else o[:p]
 
         #/* General Exponential always shows 2 digits exp and trims the mantissa */
-        mantissa_zeroes_and_decimal = r'(?:\.0*|(\.\d*[1-9])0+)[Ee]'
-        exp_with_single_digit = r'(E[+-])(\d)$'
         def normalize_exp(o):
-            if o.find("E") == -1:
+            pe = o.find("E")
+            if pe == -1:
                 return o
-            o = re.sub(mantissa_zeroes_and_decimal,r"\1E", o)
-            return re.sub(exp_with_single_digit,r"\g<1>0\2", o)
+            x = o[pe:]
+            if len(x) == 3 and x[1] in '+-' and x[2].isdigit():
+                x = x[:2] + '0' + x[2]
+            return strip_decimal(o[:pe]) + x
 
         #/* exponent >= -9 and <= 9 */
         def small_exp(v):
@@ -1260,7 +1802,9 @@ class SSF:
                 #result = f'{v:.5e}'.replace(".", self.fmtl.decimal_point)
                 result = ('{:.' + str(ep) + 'e}').format(v).replace(".", self.fmtl.decimal_point)
                 # Python returns 1.2e+01 where JavaScript return 1.2e+1 so make this change:
-                result = re.sub(r'(e[+-])0(\d)', r'\1\2', result)
+                pe = result.find('e')
+                if result[pe+2:pe+3] == '0':
+                    result = result[:pe+2] + result[pe+3:]
             return result
 
         #/* exponent >= 11 or <= -10 likely exponential */
@@ -1596,6 +2140,13 @@ class SSF:
         return outstr
 
     def _write_num(self, type, fmt, val):
+        """Write the number ``val`` with the number part ``fmt`` of a format section, using the writer that
+        _compile_num made for ``fmt``"""
+        return _compile_num(fmt)(self, type, val)
+
+    def _interpret_num(self, type, fmt, val):
+        """Write the number ``val`` with ``fmt`` by working out the shape of the format each time.  This
+        handles every format, and is what the writers from _compile_num fall back on for the rarer shapes."""
 
         # issues/50 pct1 = r'%'
 
@@ -1760,10 +2311,12 @@ class SSF:
             return o
 
         def rnd(val, d):
-            dd = 10**d
-            if isinstance(val, int) and d >= 0:
-                return str(val)
-            return SSF.to_str(SSF.round(val * dd)/dd)
+            digits = _fixed_digits(val, d)
+            if digits is None:
+                dd = 10**d
+                return SSF.to_str(SSF.round(val * dd)/dd)
+            f = _tiny_fraction(digits[0], digits[1].rstrip('0'))
+            return digits[0] + '.' + f if f else digits[0]
 
         def dec(val, d):        # pragma nocover: no longer used
             _frac = val - math.floor(val)
@@ -2357,7 +2910,9 @@ class SSF:
             return write_num_int(type, fmt, val)
         return write_num_flt(type, fmt, val)
 
-    def _split_fmt(self, fmt):
+    def _split_fmt(self, fmt, errors=None):
+        """Split ``fmt`` into its sections.  If ``errors`` is a list, then any error messages are appended
+        to it instead of being reported."""
         out = []
         in_str = False
         #for(var i = 0, j = 0; i < fmt.length; ++i) switch((/*cc=*/fmt.charCodeAt(i))) {
@@ -2380,7 +2935,10 @@ class SSF:
         
         out.append(fmt[j:])
         if in_str:
-            self._value_error("Format |" + fmt + "| unterminated string ")
+            if errors is not None:
+                errors.append("Format |" + fmt + "| unterminated string ")
+            else:
+                self._value_error("Format |" + fmt + "| unterminated string ")
         return out
 
     _split = _split_fmt
@@ -2616,381 +3174,393 @@ class SSF:
                 ostr = replace_num(ostr, numbers)
         return ostr
 
-    def _eval_fmt(self, fmt, v, opts, flen, wid, c_start, c_end, align):
-        out = []
+    def _tokenize_fmt(self, fmt, flen, has_wid, fmtl, tmpl, probe=None):
+        """Tokenize a single section ``fmt`` of a format.  Everything that doesn't depend on the value being
+        formatted is done here, and the result is a SimpleNamespace with the ``ops`` that _replay_ops runs
+        for each value.  A few odd formats tokenize differently depending on whether the value is a valid date,
+        and for these ``probe`` is called with the ops so far to find out.  If there is no ``probe``, then None
+        is returned for them."""
+        ops = []
+        calcode = None
+        fmtl0 = fmtl
+        tmpl0 = tmpl
         o = ""
-        i = 0
-        c = ""
-        lst='t'
-        hr='H'
-        dt = None
-        got_g = False
-        is_text = False
-        has_fill = False
-        abstime = False
-        color_start = None
-        color_start_rgb = None
-        dots = 0                # https://github.com/SheetJS/ssf/issues/68
-        #/* Tokenize */
-        while i < len(fmt):
-            #switch((c = fmt.charAt(i))) {
-            c = fmt[i]
-            #case 'G': /* General */
-            if c == 'G':
-                if not SSF._isgeneral(fmt, i): 
-                    self._value_error('unrecognized character ' + c + ' in ' +fmt)
-                out.append(SimpleNamespace(t='G', v='General'))
-                i+=7
-                continue
-            #case '"': /* Literal text */
-            elif c == '"':
-                #for(o="";(cc=fmt.charCodeAt(++i)) !== 34 && i < fmt.length;) o += String.fromCharCode(cc);
-                #out[out.length] = {t:'t', v:o}; ++i; break;
-                j = fmt.find('"', i+1)
-                if j < i:
-                    self._value_error('unterminated string in ' + fmt)
-                    j = len(fmt)
-                out.append(SimpleNamespace(t='t', v=fmt[i+1:j]))
-                i = j+1
-                continue
-            #case '\\': var w = fmt.charAt(++i), t = (w === "(" || w === ")") ? w : 't';
-            elif c == '\\':
-                i += 1
-                w = fmt[i:i+1]
-                if len(w) == 0:
-                    self._value_error('invalid "\\" escape in ' + fmt)
-                t = w if w in ('(', ')') else 't'
-                out.append(SimpleNamespace(t=t, v=w))
-                i += 1
-                continue
-            # The underscore character represents a space of the size of the next character, so eat that one too
-            #case '_': out[out.length] = {t:'t', v:" "}; i+=2; break;
-            elif c == '_':
-                out.append(SimpleNamespace(t='t', v=" "))
-                i += 2
-                if i > len(fmt):
-                    self._value_error('invalid "_" in ' + fmt)
-                continue
-            #case '@': /* Text Placeholder */
-            elif c == '@':
-                if isinstance(v, bool):
-                    out.append(SimpleNamespace(t='T', v=('FALSE','TRUE')[v]))
-                else:
-                    is_text = True
-                    out.append(SimpleNamespace(t='T', v=str(v)))
-                i += 1
-                continue
-            # `B1` and `B2` specify which calendar to use, while `b` is the buddhist year.  It
-            # acts just like `y` except the year is shifted
-            #case 'B': case 'b':
-            elif c in ('B', 'b'):
-                if fmt[i+1:i+2] in ("1", "2"):
-                    if dt is None: 
-                        dt=self._parse_date_code(v, opts, fmt[i+1:i+2] == "2")
-                        if dt is None:
-                            #return ""
-                            return SSF._pounds(wid)
-                    out.append(SimpleNamespace(t='X', v=fmt[i:i+2]))
-                    lst = c
-                    i+=2
+        while True:
+            out = []
+            i = 0
+            c = ""
+            lst='t'
+            hr='H'
+            dt = _DT_NONE
+            got_g = False
+            has_fill = False
+            abstime = False
+            color_start = None
+            color_start_rgb = None
+            dots = 0                # https://github.com/SheetJS/ssf/issues/68
+            restart = False
+            checked_neg = False     # Have we checked for a negative date since the value last changed?
+            #/* Tokenize */
+            while i < len(fmt):
+                #switch((c = fmt.charAt(i))) {
+                c = fmt[i]
+                #case 'G': /* General */
+                if c == 'G':
+                    if not SSF._isgeneral(fmt, i):
+                        ops.append((_OP_ERROR, 'unrecognized character ' + c + ' in ' +fmt))
+                    out.append(_Token('G', 'General'))
+                    i+=7
                     continue
-                #/* falls through */
-            #case 'M': case 'D': case 'Y': case 'H': case 'S': case 'E':
-            if c in ('B', 'M', 'D', 'Y', 'H', 'S', 'E'):
-                c = c.lower();
-                #/* falls through */
-            #case 'm': case 'd': case 'y': case 'h': case 's': case 'e': case 'g':
-            if c in ('b', 'm', 'd', 'y', 'h', 's', 'e', 'g'):
-                if v < 0: 
-                    #return ""
-                    return SSF._pounds(wid)
-                if dt is None:
-                    dt=self._parse_date_code(v, opts) 
-                    if dt is None:
-                        #return ""
-                        return SSF._pounds(wid)
-                if c == 'g':
-                    got_g = True
-                o = c; 
-                i += 1
-                while i < len(fmt) and fmt[i].lower() == c: 
-                    o+=c
+                #case '"': /* Literal text */
+                elif c == '"':
+                    #for(o="";(cc=fmt.charCodeAt(++i)) !== 34 && i < fmt.length;) o += String.fromCharCode(cc);
+                    #out[out.length] = {t:'t', v:o}; ++i; break;
+                    j = fmt.find('"', i+1)
+                    if j < i:
+                        ops.append((_OP_ERROR, 'unterminated string in ' + fmt))
+                        j = len(fmt)
+                    out.append(_Token('t', fmt[i+1:j]))
+                    i = j+1
+                    continue
+                #case '\\': var w = fmt.charAt(++i), t = (w === "(" || w === ")") ? w : 't';
+                elif c == '\\':
                     i += 1
-                if c == 'm' and lst.lower() == 'h': 
-                    c = 'M'
-                if c == 'h': 
-                    c = hr
-                if c == 'y' and got_g:
-                    c = 'e'                 # Change 'y' to 'e' (era) after seeing a 'g'
-                    o = o.replace('y', 'e')
-                out.append(SimpleNamespace(t=c, v=o))
-                lst = c
-                continue
-            #case 'A': case 'a': case '上':
-            elif c in ('A', 'a', '上'): 
-                q=SimpleNamespace(t=c, v=c)
-                if dt is None:
-                    dt=self._parse_date_code(v, opts)
-                # The rule regarding `A/P` and `AM/PM` is that if they show up
-                # in the format then _all_ instances of `h` are considered 12-hour and not 24-hour
-                # format (even in cases like `hh AM/PM hh hh hh`)
-                if fmt[i:i+3].upper() == "A/P": 
-                    if dt is not None:
-                        if dt.H < 12:   # Morning   # https://github.com/SheetJS/ssf/issues/8
-                            q.v = self.tmpl.a.lower() if c == 'a' else self.tmpl.a.upper()  # https://github.com/SheetJS/ssf/issues/54
-                        else:           # Afternoon
-                            q.v = self.tmpl.p.lower() if fmt[i+2] == 'p' else self.tmpl.p.upper()   # https://github.com/SheetJS/ssf/issues/54
-                    q.t = 'T'
-                    hr='h'
-                    i+=3
-                elif fmt[i:i+5].upper() == "AM/PM":
-                    if dt is not None:
-                        q.v = self.tmpl.pm if dt.H >= 12 else self.tmpl.am    # https://github.com/SheetJS/ssf/issues/8
-                    q.t = 'T'
-                    i+=5
-                    hr='h'
-                elif fmt[i:i+5].upper() == "上午/下午": 
-                    if dt is not None:
-                        q.v = "下午" if dt.H >= 12 else "上午"
-                    q.t = 'T'
-                    i+=5
-                    hr='h'
-                else:
-                    q.t = "t"
+                    w = fmt[i:i+1]
+                    if len(w) == 0:
+                        ops.append((_OP_ERROR, 'invalid "\\" escape in ' + fmt))
+                    t = w if w in ('(', ')') else 't'
+                    out.append(_Token(t, w))
                     i += 1
-                if dt is None and q.t == 'T': 
-                    #return ""
-                    return SSF._pounds(wid)
-                out.append(q)
-                lst = c
-                continue
-            #case '[':
-            elif c == '[':
-                #o = c;
-                #while(fmt.charAt(i++) !== ']' && i < fmt.length) o += fmt.charAt(i);
-                #if(o.slice(-1) !== ']') throw 'unterminated "[" block: |' + o + '|';
-                j = fmt.find(']', i+1)
-                if j < 0:
-                    self._value_error('unterminated "[" block: |' + o + '|')
+                    continue
+                # The underscore character represents a space of the size of the next character, so eat that one too
+                #case '_': out[out.length] = {t:'t', v:" "}; i+=2; break;
+                elif c == '_':
+                    out.append(_Token('t', " "))
+                    i += 2
+                    if i > len(fmt):
+                        ops.append((_OP_ERROR, 'invalid "_" in ' + fmt))
+                    continue
+                #case '@': /* Text Placeholder */
+                elif c == '@':
+                    ops.append((_OP_TEXT, len(out)))
+                    out.append(_Token('T', ''))
                     i += 1
                     continue
-                o = fmt[i:j+1]
-                i = j+1
-                if re.match(SSF._abstime, o):
-                    if dt is None: 
-                        dt=self._parse_date_code(v, opts, abstime=True)
-                        abstime = True
-                        if dt is None:
-                            #return ""
-                            return SSF._pounds(wid)
-                        # The pseudo-type `Z` is used to capture absolute time blocks like [hh]
-                        out.append(SimpleNamespace(t='Z', v=o.lower()))
-                        lst = o[1]
-                elif o.find("$") > -1:
-                    if self.locale_support:
-                        m = re.match(r'\[\$([^-]*)\-(?:([0-9A-Fa-f]+)|((?:[A-Za-z][A-Za-z0-9_-]+(?:,[0-9A-Fa-f]+)?)|(?:,[0-9A-Fa-f]+)))\]', o)      # [$USD-409] optional currency string-locale
-                        if m:
-                            if m.group(2):
-                                xxyyzzzz = int(m.group(2), 16)  # https://stackoverflow.com/questions/54134729/what-does-the-130000-in-excel-locale-code-130000-mean
-                                xx = (xxyyzzzz >> 24) & 0x7f
-                                self.fmt_calendar_code = (xxyyzzzz >> 16) & 0x7f
-                                locale_id = xxyyzzzz & 0xffff
-                                if SSF_LOCALE.lcid_map and locale_id in SSF_LOCALE.lcid_map:
-                                    lcid = SSF_LOCALE.lcid_map[locale_id]
-                                    if lcid[0] == '*':      # These do a locale-based substitution of the format
-                                        if 'time' in lcid:
-                                            fmt = fmt[:i] + self.fmtl.time_format
+                # `B1` and `B2` specify which calendar to use, while `b` is the buddhist year.  It
+                # acts just like `y` except the year is shifted
+                #case 'B': case 'b':
+                elif c in ('B', 'b'):
+                    if fmt[i+1:i+2] in ("1", "2"):
+                        if dt != _DT_SURE:
+                            ops.append((_OP_DATE, False, fmt[i+1:i+2] == "2", False))
+                            dt = _DT_SURE
+                            checked_neg = False
+                        out.append(_Token('X', fmt[i:i+2]))
+                        lst = c
+                        i+=2
+                        continue
+                    #/* falls through */
+                #case 'M': case 'D': case 'Y': case 'H': case 'S': case 'E':
+                if c in ('B', 'M', 'D', 'Y', 'H', 'S', 'E'):
+                    c = c.lower();
+                    #/* falls through */
+                #case 'm': case 'd': case 'y': case 'h': case 's': case 'e': case 'g':
+                if c in ('b', 'm', 'd', 'y', 'h', 's', 'e', 'g'):
+                    if dt != _DT_SURE or not checked_neg:
+                        ops.append((_OP_DATE, True, False, False))
+                        dt = _DT_SURE
+                        checked_neg = True
+                    if c == 'g':
+                        got_g = True
+                    o = c;
+                    i += 1
+                    while i < len(fmt) and fmt[i].lower() == c:
+                        o+=c
+                        i += 1
+                    if c == 'm' and lst.lower() == 'h':
+                        c = 'M'
+                    if c == 'h':
+                        c = hr
+                    if c == 'y' and got_g:
+                        c = 'e'                 # Change 'y' to 'e' (era) after seeing a 'g'
+                        o = o.replace('y', 'e')
+                    out.append(_Token(c, o))
+                    lst = c
+                    continue
+                #case 'A': case 'a': case '上':
+                elif c in ('A', 'a', '上'):
+                    q=_Token(c, c)
+                    if dt == _DT_NONE:
+                        dt = _DT_MAYBE
+                    # The rule regarding `A/P` and `AM/PM` is that if they show up
+                    # in the format then _all_ instances of `h` are considered 12-hour and not 24-hour
+                    # format (even in cases like `hh AM/PM hh hh hh`)
+                    if fmt[i:i+3].upper() == "A/P":
+                        # https://github.com/SheetJS/ssf/issues/8, https://github.com/SheetJS/ssf/issues/54
+                        ops.append((_OP_AMPM, len(out), tmpl.a.lower() if c == 'a' else tmpl.a.upper(),
+                                    tmpl.p.lower() if fmt[i+2] == 'p' else tmpl.p.upper()))
+                        q.t = 'T'
+                        hr='h'
+                        i+=3
+                    elif fmt[i:i+5].upper() == "AM/PM":
+                        ops.append((_OP_AMPM, len(out), tmpl.am, tmpl.pm))    # https://github.com/SheetJS/ssf/issues/8
+                        q.t = 'T'
+                        i+=5
+                        hr='h'
+                    elif fmt[i:i+5].upper() == "上午/下午":
+                        ops.append((_OP_AMPM, len(out), "上午", "下午"))
+                        q.t = 'T'
+                        i+=5
+                        hr='h'
+                    else:
+                        if dt != _DT_SURE:
+                            ops.append((_OP_SOFT_DATE,))
+                        q.t = "t"
+                        i += 1
+                    if q.t == 'T':
+                        dt = _DT_SURE       # Else _replay_ops returns pounds
+                    out.append(q)
+                    lst = c
+                    continue
+                #case '[':
+                elif c == '[':
+                    #o = c;
+                    #while(fmt.charAt(i++) !== ']' && i < fmt.length) o += fmt.charAt(i);
+                    #if(o.slice(-1) !== ']') throw 'unterminated "[" block: |' + o + '|';
+                    j = fmt.find(']', i+1)
+                    if j < 0:
+                        ops.append((_OP_ERROR, 'unterminated "[" block: |' + o + '|'))
+                        i += 1
+                        continue
+                    o = fmt[i:j+1]
+                    i = j+1
+                    if re.match(SSF._abstime, o):
+                        if dt == _DT_MAYBE:
+                            if probe is None:
+                                return None
+                            dt = _DT_SURE if probe(ops, fmtl0, tmpl0) else _DT_NONE
+                        if dt == _DT_NONE:
+                            ops.append((_OP_DATE, False, False, True))
+                            dt = _DT_SURE
+                            checked_neg = False
+                            abstime = True
+                            # The pseudo-type `Z` is used to capture absolute time blocks like [hh]
+                            out.append(_Token('Z', o.lower()))
+                            lst = o[1]
+                    elif o.find("$") > -1:
+                        if self.locale_support:
+                            m = re.match(r'\[\$([^-]*)\-(?:([0-9A-Fa-f]+)|((?:[A-Za-z][A-Za-z0-9_-]+(?:,[0-9A-Fa-f]+)?)|(?:,[0-9A-Fa-f]+)))\]', o)      # [$USD-409] optional currency string-locale
+                            if m:
+                                if m.group(2):
+                                    xxyyzzzz = int(m.group(2), 16)  # https://stackoverflow.com/questions/54134729/what-does-the-130000-in-excel-locale-code-130000-mean
+                                    xx = (xxyyzzzz >> 24) & 0x7f
+                                    calcode = (xxyyzzzz >> 16) & 0x7f
+                                    locale_id = xxyyzzzz & 0xffff
+                                    if SSF_LOCALE.lcid_map and locale_id in SSF_LOCALE.lcid_map:
+                                        lcid = SSF_LOCALE.lcid_map[locale_id]
+                                        if lcid[0] == '*':      # These do a locale-based substitution of the format
+                                            if 'time' in lcid:
+                                                fmt = fmt[:i] + fmtl.time_format
+                                            else:
+                                                fmt = fmt[:i] + fmtl.long_date_format
                                         else:
-                                            fmt = fmt[:i] + self.fmtl.long_date_format
+                                            # Locales specified in format codes do NOT override the decimal_point or
+                                            # the thousands_sep:
+                                            tmpl = self._get_locale(locale_id,
+                                                decimal_separator=fmtl.decimal_point,
+                                                thousands_separator=fmtl.thousands_sep,
+                                                calendar_code=calcode)
                                     else:
-                                        # Locales specified in format codes do NOT override the decimal_point or
-                                        # the thousands_sep:
-                                        self.tmpl = self._get_locale(locale_id, 
-                                            decimal_separator=self.fmtl.decimal_point, 
-                                            thousands_separator=self.fmtl.thousands_sep,
-                                            calendar_code=self.fmt_calendar_code)
-                                else:
-                                    self._value_error(f"Cannot handle locale {locale_id:X} in {o}")
-                            else:   # [$-en-US]
-                                locale_split = m.group(3).split(',', 1)         # Issue #8
-                                xx = None
-                                self.fmt_calendar_code = 0
-                                if len(locale_split) == 2:                      # Issue #8
-                                    xxyy = int(locale_split[-1], 16)
-                                    xx = (xxyy >> 8) & 0x7f
-                                    self.fmt_calendar_code = xxyy & 0x7f
-                                if locale_split[0]:                             # Issue #8
-                                    self.tmpl = self._get_locale(locale_split[0],
-                                            decimal_separator=self.fmtl.decimal_point, 
-                                            thousands_separator=self.fmtl.thousands_sep,
-                                            calendar_code=self.fmt_calendar_code)
-
-                            if self.fmtl.dbnum or xx:
-                                self.tmpl = copy(self.tmpl)
-                                self.tmpl.dbnum = self.fmtl.dbnum
-                                self.tmpl.numbers_xx = xx
-                                
-                            #currency_string = m.group(1)
-                            #if currency_string:
-                                #self.fmtl = copy(self.fmtl)
-                                #self.fmtl.currency_symbol = currency_string
-
-
-                    #o = (o.match(/\$([^-\[\]]*)/)||[])[1]||"$";
-                    m = re.search(r'\$([^-\[\]]*)', o)
-                    if m:
-                        o = m.group(1)
-                    else:
-                        o = "$"
-                    if not SSF.fmt_is_date(fmt): 
-                        out.append(SimpleNamespace(t='t',v=o))
-                elif SSF._negcond(re.match(SSF._cfregex2, o)):    # https://github.com/SheetJS/ssf/issues/52
-                    v = abs(v)      # If this specifies absolutely a negative conditional, then eat the sign of the value
-                elif re.match(r'^\[DBNum[123]\]$', o, re.I):
-                    self.fmtl = copy(self.fmtl) # Because we cache it
-                    self.fmtl.dbnum = int(o[6])
-                elif c_start is not None:       # Handle colors if they pass us a c_start
-                    m = re.match(self.color_pat, o, re.I)
-                    if m:
-                        color = m.group(1).replace(' ', '').title()
-                        if color in self.color_map:
-                            rgb = self.rgb_colors[self.color_map[color]]
-                            #out.append(SimpleNamespace(t='t', v=c_start.format(color, rgb=rgb)))
-                            color_start = color
-                            color_start_rgb = rgb
+                                        ops.append((_OP_ERROR, f"Cannot handle locale {locale_id:X} in {o}"))
+                                else:   # [$-en-US]
+                                    locale_split = m.group(3).split(',', 1)         # Issue #8
+                                    xx = None
+                                    calcode = 0
+                                    if len(locale_split) == 2:                      # Issue #8
+                                        xxyy = int(locale_split[-1], 16)
+                                        xx = (xxyy >> 8) & 0x7f
+                                        calcode = xxyy & 0x7f
+                                    if locale_split[0]:                             # Issue #8
+                                        tmpl = self._get_locale(locale_split[0],
+                                                decimal_separator=fmtl.decimal_point,
+                                                thousands_separator=fmtl.thousands_sep,
+                                                calendar_code=calcode)
+
+                                if fmtl.dbnum or xx:
+                                    tmpl = tmpl.with_numerals(fmtl.dbnum, xx)
+                                ops.append((_OP_LOCALE, fmtl, tmpl, calcode))
+
+                                #currency_string = m.group(1)
+                                #if currency_string:
+                                    #self.fmtl = copy(self.fmtl)
+                                    #self.fmtl.currency_symbol = currency_string
+
+
+                        #o = (o.match(/\$([^-\[\]]*)/)||[])[1]||"$";
+                        m = re.search(r'\$([^-\[\]]*)', o)
+                        if m:
+                            o = m.group(1)
+                        else:
+                            o = "$"
+                        if not SSF.fmt_is_date(fmt):
+                            out.append(_Token('t', o))
+                    elif SSF._negcond(re.match(SSF._cfregex2, o)):    # https://github.com/SheetJS/ssf/issues/52
+                        checked_neg = False
+                        ops.append((_OP_ABS,))  # If this specifies absolutely a negative conditional, then eat the sign of the value
+                    elif re.match(r'^\[DBNum[123]\]$', o, re.I):
+                        fmtl = fmtl.with_numerals(int(o[6]), fmtl.numbers_xx)    # Because it's shared
+                        ops.append((_OP_LOCALE, fmtl, tmpl, calcode))
+                    else:       # Colors are kept in the section, and only shown if we have a color_pre
+                        m = re.match(self.color_pat, o, re.I)
+                        if m:
+                            color = m.group(1).replace(' ', '').title()
+                            if color in self.color_map:
+                                rgb = self.rgb_colors[self.color_map[color]]
+                                #out.append(_Token('t', c_start.format(color, rgb=rgb)))
+                                color_start = color
+                                color_start_rgb = rgb
 
-                continue
-            #/* Numbers */
-            # Number blocks (following the general pattern `[0#?][0#?.,E+-%]*`) are grouped
-            # together.  Literal hyphens are swallowed as well.  Since `.000` is a valid
-            # term (for tenths/hundredths/thousandths of a second), it must be handled separately
-            #case '.':
-            elif c == '.':
-                if dt is not None:      # Handle ss.000 in date formats
+                    continue
+                #/* Numbers */
+                # Number blocks (following the general pattern `[0#?][0#?.,E+-%]*`) are grouped
+                # together.  Literal hyphens are swallowed as well.  Since `.000` is a valid
+                # term (for tenths/hundredths/thousandths of a second), it must be handled separately
+                #case '.':
+                elif c == '.':
+                    if dt == _DT_MAYBE:
+                        if probe is None:
+                            return None
+                        dt = _DT_SURE if probe(ops, fmtl0, tmpl0) else _DT_NONE
+                    if dt == _DT_SURE:      # Handle ss.000 in date formats
+                        o = c
+                        i += 1
+                        while i < len(fmt):
+                            c = fmt[i]
+                            if c == '0':
+                                o += c
+                                i += 1
+                            else:
+                                break
+                        out.append(_Token('s', o))
+                        continue
+                    else:                   # issues/68
+                        dots += 1
+                        if dots >= 2:
+                            restart = True
+                            break
+                    #/* falls through */
+                #case '0': case '#':
+                # issues/74 if c in ('.', '0', '#'):
+                if c in ('.', '0', '#', '?'):   # issues/74
                     o = c
+                    #while(++i < fmt.length && "0#?.,E+-%".indexOf(c=fmt.charAt(i)) > -1) o += c;
                     i += 1
+                    got_E = False       # Issue #11
                     while i < len(fmt):
                         c = fmt[i]
-                        if c == '0':
+                        # issues/50 if "0#?.,E+-%".find(c) > -1:
+                        if "0#?.,E+-/".find(c) > -1:        # issues/50, issues/74
+                            # Issue #11: Only grab a plus or minus after an E, else it's not part of the number format
+                            if c == 'E':
+                                got_E = True
+                            if c in ('+', '-') and not got_E:
+                                break
                             o += c
                             i += 1
+                            if c == '.':            # issues/68
+                                dots += 1
+                                if dots >= 2:
+                                    restart = True
+                                    break
+
                         else:
                             break
-                    out.append(SimpleNamespace(t='s', v=o))
-                    continue
-                else:                   # issues/68
-                    dots += 1
-                    if dots >= 2:
-                        return self._eval_fmt(self._escape_dots(fmt), v, opts, flen, wid, c_start, c_end, align)
-                #/* falls through */
-            #case '0': case '#':
-            # issues/74 if c in ('.', '0', '#'):
-            if c in ('.', '0', '#', '?'):   # issues/74
-                o = c
-                #while(++i < fmt.length && "0#?.,E+-%".indexOf(c=fmt.charAt(i)) > -1) o += c;
-                i += 1
-                got_E = False       # Issue #11
-                while i < len(fmt):
-                    c = fmt[i]
-                    # issues/50 if "0#?.,E+-%".find(c) > -1:
-                    if "0#?.,E+-/".find(c) > -1:        # issues/50, issues/74
-                        # Issue #11: Only grab a plus or minus after an E, else it's not part of the number format
-                        if c == 'E':
-                            got_E = True
-                        if c in ('+', '-') and not got_E:
-                            break
-                        o += c
-                        i += 1
-                        if c == '.':            # issues/68
-                            dots += 1
-                            if dots >= 2:
-                                return self._eval_fmt(self._escape_dots(fmt), v, opts, flen, wid, c_start, c_end, align)
-
-                    else:
+                    if restart:
                         break
-                out.append(SimpleNamespace(t='n', v=o))
-                continue
-            elif c == '/':          # issues/60: Handle stuff in between the '?'s and the '/' for fractions
-                out.append(SimpleNamespace(t='/', v='/'))
-                i += 1
-            elif c == '%':      # issues/50
-                if isinstance(v, int) or isinstance(v, float):
-                    v *= 100
-                out.append(SimpleNamespace(t='t', v=c))
-                i += 1
-            ## The fraction question mark characters present their own challenges.  For example, the
-            ## number 123.456 under format `|??| /  |???| |???| foo` is `|15432| /  |125| |   | foo`:
-            ##case '?':
-            #elif c == '?':
-                #o = c
-                ##while(fmt.charAt(++i) === c) o+=c;
-                #i += 1
-                #while fmt[i:i+1] == c:
-                    #o += c
+                    out.append(_Token('n', o))
+                    continue
+                elif c == '/':          # issues/60: Handle stuff in between the '?'s and the '/' for fractions
+                    out.append(_Token('/', '/'))
+                    i += 1
+                elif c == '%':      # issues/50
+                    ops.append((_OP_PCT,))
+                    checked_neg = False
+                    out.append(_Token('t', c))
+                    i += 1
+                ## The fraction question mark characters present their own challenges.  For example, the
+                ## number 123.456 under format `|??| /  |???| |???| foo` is `|15432| /  |125| |   | foo`:
+                ##case '?':
+                #elif c == '?':
+                    #o = c
+                    ##while(fmt.charAt(++i) === c) o+=c;
                     #i += 1
-                #out.append(SimpleNamespace(t=c, v=o))
-                #lst = c
-                #continue
-
-            # OLD: Due to how the CSV generation works, asterisk characters are discarded.  TODO:
-            # communicate this somehow, possibly with an option
-            # NEW: Handle "*" for repeated chars if wid is given
-            #case '*': ++i; if(fmt.charAt(i) == ' ' || fmt.charAt(i) == '*') ++i; break; // **
-            elif c == '*':
-                i += 1
-                w = fmt[i:i+1]
-                if len(w) == 0:
-                    self._value_error('invalid "*" in ' + fmt)
-                if wid == None:
-                    if w in (' ', '*'):
+                    #while fmt[i:i+1] == c:
+                        #o += c
+                        #i += 1
+                    #out.append(_Token(c, o))
+                    #lst = c
+                    #continue
+
+                # OLD: Due to how the CSV generation works, asterisk characters are discarded.  TODO:
+                # communicate this somehow, possibly with an option
+                # NEW: Handle "*" for repeated chars if wid is given
+                #case '*': ++i; if(fmt.charAt(i) == ' ' || fmt.charAt(i) == '*') ++i; break; // **
+                elif c == '*':
+                    i += 1
+                    w = fmt[i:i+1]
+                    if len(w) == 0:
+                        ops.append((_OP_ERROR, 'invalid "*" in ' + fmt))
+                    if not has_wid:
+                        if w in (' ', '*'):
+                            i += 1
+                    else:       # Repeat to fill wid
+                        out.append(_Token('*', w))
+                        has_fill = True
                         i += 1
-                else:       # Repeat to fill wid
-                    out.append(SimpleNamespace(t='*', v=w))
-                    has_fill = True
+                    continue
+                # The open and close parens `()` also has special meaning (for negative numbers)
+                #case '(': case ')': out[out.length] = {t:(flen===1?'t':c), v:c}; ++i; break;
+                elif c in ('(', ')'):
+                    out.append(_Token('t' if flen == 1 else c, c))
                     i += 1
-                continue
-            # The open and close parens `()` also has special meaning (for negative numbers)
-            #case '(': case ')': out[out.length] = {t:(flen===1?'t':c), v:c}; ++i; break;
-            elif c in ('(', ')'):
-                out.append(SimpleNamespace(t='t' if flen == 1 else c, v=c))
-                i += 1
-                continue
-            # The nonzero digits show up in fraction denominators
-            #case '1': case '2': case '3': case '4': case '5': case '6': case '7': case '8': case '9':
-            elif c in ('1', '2', '3', '4', '5', '6', '7', '8', '9'):
-                #o = c; while(i < fmt.length && "0123456789".indexOf(fmt.charAt(++i)) > -1) o+=fmt.charAt(i);
-                j = i+1
-                while fmt[j:j+1].isdigit():
-                    j += 1
-                o = fmt[i:j]
-                out.append(SimpleNamespace(t='D', v=o))
-                i = j
-                continue
-            # The default magic characters are listed in subsubsections 18.8.30-31 of ECMA376
-            #case ' ': out[out.length] = {t:c, v:c}; ++i; break;
-            elif c == ' ':
-                out.append(SimpleNamespace(t=c, v=c))
-                i += 1
-                continue
-            #case '$': out[out.length] = {t:'t', v:'$'}; ++i; break;
-            elif c == '$':
-                out.append(SimpleNamespace(t='t', v='$'))
-                i += 1
-                continue
-            #default:
-            else:
-                # Issue #12 if ",$-+/():!^&'~{}<>=€acfijklopqrtuvwxzP".find(c) == -1:
-                    # Issue #12 self._value_error(f'unrecognized character {c} ({ord(c)}) in {fmt}')
-                out.append(SimpleNamespace(t='t', v=c))
-                i += 1
-                continue
+                    continue
+                # The nonzero digits show up in fraction denominators
+                #case '1': case '2': case '3': case '4': case '5': case '6': case '7': case '8': case '9':
+                elif c in ('1', '2', '3', '4', '5', '6', '7', '8', '9'):
+                    #o = c; while(i < fmt.length && "0123456789".indexOf(fmt.charAt(++i)) > -1) o+=fmt.charAt(i);
+                    j = i+1
+                    while fmt[j:j+1].isdigit():
+                        j += 1
+                    o = fmt[i:j]
+                    out.append(_Token('D', o))
+                    i = j
+                    continue
+                # The default magic characters are listed in subsubsections 18.8.30-31 of ECMA376
+                #case ' ': out[out.length] = {t:c, v:c}; ++i; break;
+                elif c == ' ':
+                    out.append(_Token(c, c))
+                    i += 1
+                    continue
+                #case '$': out[out.length] = {t:'t', v:'$'}; ++i; break;
+                elif c == '$':
+                    out.append(_Token('t', '$'))
+                    i += 1
+                    continue
+                #default:
+                else:
+                    # Issue #12 if ",$-+/():!^&'~{}<>=€acfijklopqrtuvwxzP".find(c) == -1:
+                        # Issue #12 self._value_error(f'unrecognized character {c} ({ord(c)}) in {fmt}')
+                    out.append(_Token('t', c))
+                    i += 1
+                    continue
 
-        lalign = align.lower() if align else ''
-        if wid and lalign != 'center':
-            if (lalign == 'left' or (is_text and lalign != 'right')) and not has_fill: # Left justify text
-                out.append(SimpleNamespace(t='*', v=' '))
-            elif not isinstance(v, bool) or lalign == 'right': # Right justify if wid is specified and not text
-                out = [SimpleNamespace(t='*', v=' ')] + out
+            if restart:
+                # The tokens from this pass get tossed, so forget where they were
+                ops = [op[:1] + (None,) + op[2:] if op[0] in (_OP_TEXT, _OP_AMPM) else op for op in ops]
+                ops.append((_OP_RESTART,))
+                fmt = self._escape_dots(fmt)
+                continue
+            break
 
         #/* Scan for date/time parts */
         """In order to identify cases like `MMSS`, where the fact that this is a minute
@@ -3019,7 +3589,7 @@ class SSF:
                 ssm = re.search(r'\.0+$', out[i].v)
                 if ssm:
                     ss0=max(ss0,len(ssm.group(0))-1)
-                if bt < 3: 
+                if bt < 3:
                     bt = 3
             #/* falls through */
             #case 'd': case 'y': case 'M': case 'e': lst=out[i].t; break;
@@ -3041,7 +3611,170 @@ class SSF:
             elif oit == 'Z':
                 bt = 1
                 continue
-        
+
+        return SimpleNamespace(ops=ops, tokens=out, fmtl=fmtl0, tmpl=tmpl0, bt=bt, ss0=ss0, b2=b2,
+                abstime=abstime, has_fill=has_fill, color_start=color_start, color_start_rgb=color_start_rgb)
+
+    def _replay_ops(self, ops, fmtl, tmpl, v, opts, tokens=None, probe=False):
+        """Run the ``ops`` from _tokenize_fmt on the value ``v``, filling in a copy of the ``tokens``.  Returns
+        a tuple of (out, v, dt, is_text), or None if the result should be pounds.  Errors in the format are
+        not reported if we are just being used to ``probe`` the value."""
+        out = [_Token(tok.t, tok.v) for tok in tokens] if tokens else []
+        self.fmtl = fmtl
+        self.tmpl = tmpl
+        self.fmt_calendar_code = None
+        dt = None
+        is_text = False
+        for op in ops:
+            code = op[0]
+            if code == _OP_DATE:        # (code, check_neg, b2, abstime)
+                if op[1] and v < 0:
+                    #return ""
+                    return None
+                if dt is None:
+                    dt=self._parse_date_code(v, opts, op[2], op[3])
+                    if dt is None:
+                        #return ""
+                        return None
+            elif code == _OP_AMPM:      # (code, index, am, pm)
+                if dt is None:
+                    dt=self._parse_date_code(v, opts)
+                    if dt is None:
+                        #return ""
+                        return None
+                if op[1] is not None and tokens:
+                    out[op[1]].v = op[3] if dt.H >= 12 else op[2]
+            elif code == _OP_SOFT_DATE:
+                if dt is None:
+                    dt=self._parse_date_code(v, opts)
+            elif code == _OP_TEXT:      # (code, index)
+                if isinstance(v, bool):
+                    tv = ('FALSE','TRUE')[v]
+                else:
+                    is_text = True
+                    tv = str(v)
+                if op[1] is not None and tokens:
+                    out[op[1]].v = tv
+            elif code == _OP_PCT:
+                if isinstance(v, int) or isinstance(v, float):
+                    v *= 100
+            elif code == _OP_ABS:
+                v = abs(v)
+            elif code == _OP_LOCALE:    # (code, fmtl, tmpl, calendar_code)
+                self.fmtl = op[1]
+                self.tmpl = op[2]
+                self.fmt_calendar_code = op[3]
+            elif code == _OP_RESTART:
+                dt = None
+                is_text = False
+            elif code == _OP_ERROR:     # (code, message)
+                if not probe:
+                    self._value_error(op[1])
+        return (out, v, dt, is_text)
+
+    def _eval_fmt(self, fmt, v, opts, flen, wid, c_start, c_end, align):
+        def probe(ops, fmtl, tmpl):
+            """Is the value a valid date at this point in the format?"""
+            r = self._replay_ops(ops, fmtl, tmpl, v, opts, probe=True)
+            return r is not None and r[2] is not None
+
+        section = self._tokenize_fmt(fmt, flen, wid is not None, self.fmtl, self.tmpl, probe)
+        return self._eval_section(section, v, opts, flen, wid, c_start, c_end, align)
+
+    _eval = _eval_fmt;
+
+    _TIME_TABLE_SIZE = 100000       # Most entries kept in the time-of-day table of a section
+    _LAST_DAY = 2958465             # 12/31/9999, the last day that _parse_date_code() can handle
+    _LAST_DAY_1904 = _LAST_DAY - 1462
+
+    @staticmethod
+    def _is_time_of_day(section):
+        """Returns True if the ``section`` from _tokenize_fmt only shows the time of day (like ``h:mm AM/PM``
+        or ``hh:mm:ss.00``), so the result only depends on the time rounded to the precision shown"""
+        if section.ss0 > 3 or section.abstime or section.b2 or section.color_start:
+            return False
+        have_date = False
+        for op in section.ops:
+            if op[0] == _OP_DATE and not op[2] and not op[3]:
+                have_date = True
+            elif op[0] != _OP_AMPM:
+                return False
+        if not have_date:
+            return False
+        for tok in section.tokens:
+            if tok.t in ('h', 'H', 'M') and len(tok.v) > 2:
+                return False
+            if tok.t == 's' and tok.v not in ('s', 'ss', '.0', '.00', '.000'):
+                return False
+            if tok.t not in ('h', 'H', 'M', 's', 't', ' ', '/', 'T'):
+                return False
+        return True
+
+    def _eval_time_of_day(self, section, v, opts, flen):
+        """Format the number ``v`` (from 0 up to, but not on, _LAST_DAY or _LAST_DAY_1904 with date1904, so
+        rounding up to the next second can't go past the last date) with a ``section`` where _is_time_of_day()
+        is True, like _eval_section() does with no width.  The results are kept in ``section.times`` by the time of day,
+        in units of the smallest fraction of a second shown after the same rounding _eval_section() does, and
+        by AM or PM before that rounding."""
+        D = int(v)
+        time = int(86400 * (v - D))
+        u = 86400 * (v - D) - time
+        if abs(u) < 1e-6 or u > 0.9999:
+            if u > 0.9999:
+                time += 1
+                if time == 86400:
+                    time = 0
+                    D += 1
+            u = 0
+        pm = time >= 43200      # AM/PM is decided before the rounding below
+        ss0 = section.ss0
+        tt = 10 ** ss0
+        if section.bt != 0:
+            u = SSF.round(u, ss0)
+            if u >= 1:          # Rounded up to the next second: start over like _eval_section() does
+                v2 = (D * 86400 + time + u) / 86400.0
+                D = int(v2)
+                time = int(86400 * (v2 - D))
+                u = 86400 * (v2 - D) - time
+                if abs(u) < 1e-6 or u > 0.9999:
+                    if u > 0.9999:
+                        time = (time + 1) % 86400
+                    u = 0
+            S = time % 60
+            j = 0 if u == 0 else SSF.round(tt * (S + u)) - S * tt
+            if j < 0 or j >= tt:
+                return self._eval_section(section, v, opts, flen, None, None, None, None)
+        else:
+            j = 0
+        key = (time * tt + j) * 2 + pm
+        times = section.times
+        try:
+            return times[key]
+        except KeyError:
+            result = self._eval_section(section, v, opts, flen, None, None, None, None)
+            if not self._pound_sand and len(times) < SSF._TIME_TABLE_SIZE:
+                times[key] = result
+            return result
+
+    def _eval_section(self, section, v, opts, flen, wid, c_start, c_end, align):
+        """Format the value ``v`` using a ``section`` of a format, as returned by _tokenize_fmt"""
+        r = self._replay_ops(section.ops, section.fmtl, section.tmpl, v, opts, section.tokens)
+        if r is None:
+            return SSF._pounds(wid)
+        out, v, dt, is_text = r
+        bt = section.bt
+        ss0 = section.ss0
+        has_fill = section.has_fill
+        color_start = section.color_start
+        color_start_rgb = section.color_start_rgb
+
+        lalign = align.lower() if align else ''
+        if wid and lalign != 'center':
+            if (lalign == 'left' or (is_text and lalign != 'right')) and not has_fill: # Left justify text
+                out.append(_Token('*', ' '))
+            elif not isinstance(v, bool) or lalign == 'right': # Right justify if wid is specified and not text
+                out.insert(0, _Token('*', ' '))
+
         # WRONG: /* time rounding depends on presence of minute / second / usec fields */
         # Time rounding depends on the length of the usec field
         #switch(bt) {
@@ -3049,12 +3782,11 @@ class SSF:
         #case 1:
         if bt != 0:
             dt.u = SSF.round(dt.u, ss0)
-            if dt.u >= 1 or dt.u <= -1:  
+            if dt.u >= 1 or dt.u <= -1:
                 v = (((dt.D*24+dt.H)*60+dt.M)*60+dt.S+dt.u) / 86400.0
-                dt=self._parse_date_code(v, opts, b2, abstime)
+                dt=self._parse_date_code(v, opts, section.b2, section.abstime)
                 if dt is None:
                     return SSF._pounds(wid)
-
         #/* replace fields */
         # Since number groups in a string should be treated as part of the same whole,
         # group them together to construct the real number string
@@ -3109,7 +3841,7 @@ class SSF:
                     if out[jj].t in ('n', 'D', '/'): # Found another number piece, specific denominator, or slash
                         if '/' in out[jj].v:        # issues/74
                             if out[jj].t == 'n':
-                                out = out[:jj] + [SimpleNamespace(t=':',v='')] + out[jj:] # Insert marker
+                                out.insert(jj, _Token(':', ''))    # Insert marker
                                 jj += 1
                                 nstr += ':'             # Separate int part from fraction for later
                                 has_fraction = True
@@ -3117,7 +3849,7 @@ class SSF:
                                 for kk in reversed(range(jj)):
                                     if out[kk].t == 'n':
                                         lv = len(out[kk].v)
-                                        out = out[:kk] + [SimpleNamespace(t=':',v='')] + out[kk:] # Insert marker
+                                        out.insert(kk, _Token(':', ''))    # Insert marker
                                         jj += 1
                                         nstr = nstr[:-lv] + ':' + nstr[-lv:]
                                         has_fraction = True
@@ -3306,7 +4038,7 @@ class SSF:
             # Handles the case from test_valid where the format is " Excellent" and excel
             # gives a result of '- Excellent' for negative numbers.  Doesn't do this if
             # an explicit second format for negative numbers is given.
-            out = [SimpleNamespace(t='t', v = self.fmtl.minus_sign)] + out
+            out.insert(0, _Token('t', self.fmtl.minus_sign))
 
         # Fill the width with the right-most "*" element, or the "*" element we added at the front to right-justify the output
         width = 0
@@ -3320,7 +4052,8 @@ class SSF:
             if ((isinstance(v, bool) and not lalign) or lalign == 'center') and not has_fill:      # Bools are centered unless we have a fill specified
                 lpad = math.ceil(delta/2)
                 rpad = delta - lpad
-                out = [SimpleNamespace(t='t', v=' ' * lpad)] + out + [SimpleNamespace(t='t', v=' ' * rpad)]
+                out.insert(0, _Token('t', ' ' * lpad))
+                out.append(_Token('t', ' ' * rpad))
             else:
                 for o in reversed(out):
                     if o is not None and o.t == '*':
@@ -3339,7 +4072,7 @@ class SSF:
 
         # Handle colors last as to not mess up the actual value
 
-        if color_start:
+        if color_start and c_start is not None:
             try:
                 if c_start:
                     retval = c_start.format(color_start, rgb=color_start_rgb) + retval
@@ -3349,8 +4082,6 @@ class SSF:
                 pass        # Silently ignore bad color start/end formats, etc
 
         return retval;
-
-    _eval = _eval_fmt;
     #cfregex = re.compile(r'\[[=<>]')
     _cfregex2 = re.compile(r'\[(=|>[=]?|<[>=]?)(-?\d+(?:\.\d*)?)\]')
 
@@ -3420,17 +4151,19 @@ class SSF:
                 return True
         return False
 
-    def _choose_fmt(self, f, v):
-        fmt = self._split_fmt(f)
+    def _split_sections(self, f):
+        """Split the format ``f`` into the sections used by _choose_fmt.  Any errors found are
+        reported by _choose_fmt each time it's called."""
+        errors = []
+        fmt = self._split_fmt(f, errors)
         l = len(fmt)
         lat = fmt[-1].find("@")
         if l<4 and lat>-1: 
             l -= 1
         if len(fmt) > 4: 
-            self._value_error("cannot find right format for |" + "|".join(fmt) + "|")
+            errors.append("cannot find right format for |" + "|".join(fmt) + "|")
         #if(typeof v !== "number") return [4, fmt.length === 4 || lat>-1?fmt[fmt.length-1]:"@"];
-        if isinstance(v, bool) or not isinstance(v, (int, float)):      # isinstance(True, int) is True!!
-            return [4, fmt[-1] if len(fmt) == 4 or lat>-1 else "@"]
+        text = fmt[-1] if len(fmt) == 4 or lat>-1 else "@"
         #switch(fmt.length) {
         lf = len(fmt)
         #case 1: fmt = lat>-1 ? ["General", "General", "General", fmt[0]] : [fmt[0], fmt[0], fmt[0], "@"]; break;
@@ -3443,10 +4176,25 @@ class SSF:
         elif lf == 3:
             fmt = [fmt[0], fmt[1], fmt[0], fmt[2]] if lat>-1 else [fmt[0], fmt[1], fmt[2], "@"]
         #case 4: break;
-        
-        ff = fmt[0] if v > 0 else fmt[1] if v < 0 else fmt[2]
         m1 = re.search(SSF._cfregex2, fmt[0])
         m2 = re.search(SSF._cfregex2, fmt[1])
+        return SimpleNamespace(fmt=fmt, l=l, lf=lf, text=text, m1=m1, m2=m2, errors=errors)
+
+    def _choose_fmt(self, f, v, sections=None):
+        """Choose the section of format ``f`` to use for the value ``v``, returning [flen, section].  If
+        ``sections`` is given, it's the result of _split_sections(f)."""
+        if sections is None:
+            sections = self._split_sections(f)
+        for e in sections.errors:
+            self._value_error(e)
+        if isinstance(v, bool) or not isinstance(v, (int, float)):      # isinstance(True, int) is True!!
+            return [4, sections.text]
+        fmt = sections.fmt
+        l = sections.l
+        lf = sections.lf
+        m1 = sections.m1
+        m2 = sections.m2
+        ff = fmt[0] if v > 0 else fmt[1] if v < 0 else fmt[2]
         if not m1 and not m2:               # issues/70
             return [l, ff]
         if v > 0 and not m1:                # issues/70: If the first format is not conditional
@@ -3500,6 +4248,7 @@ class SSF:
                     locale = SSF_LOCALE.lcid_reverse_map[locale]
                 else:
                     try:
+                        from babel.core import Locale
                         sep = '-' if '-' in locale else '_'
                         _ = Locale.parse(locale, sep=sep)    # raises babel.core.UnknownLocaleError if not recognized
                         nxt = SSF_LOCALE.lcid_max + 1
@@ -3513,25 +4262,12 @@ class SSF:
             return f'[$-{locale:X}]'
         return ''
 
-    def _localize_table_from_locale(self, locale_name, prior_locale_names=None):
-        """Add extra values to the table of integers to formats based on the locale"""
-        if prior_locale_names is not None:
-            for prior_locale_name in prior_locale_names:
-                for key in SSF_LOCALE.table_map.get(prior_locale_name, {}):
-                    self.table_fmt.pop(key, None)
-
-        for key in SSF_LOCALE.table_map.get(locale_name, {}):
-            self.table_fmt[key] = SSF_LOCALE.table_map[locale_name][key]
-
-
-    def _get_locale(self, locale, decimal_separator=None, thousands_separator=None, update_table=False, calendar_code=None):
-        #print(f'_get_locale({locale}, "{decimal_separator}", "{thousands_separator}", {update_table}, {calendar_code})')
+    def _get_locale(self, locale, decimal_separator=None, thousands_separator=None, calendar_code=None):
+        #print(f'_get_locale({locale}, "{decimal_separator}", "{thousands_separator}", {calendar_code})')
         if not self.locale_support:
             return self.curl
 
         if locale is None:
-            if update_table:
-                self._localize_table_from_locale(None, prior_locale_names=[self.curl.locale_name, self.fmtl.locale_name])
             locale = self.curl.locale_name
 
         if isinstance(locale, SSF_LOCALE):
@@ -3549,18 +4285,19 @@ class SSF:
             return self._locale_cache[s_l]
 
         try:
-            result = SSF_LOCALE(locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator, calendar_code=calendar_code)
+            result = SSF_LOCALE.shared(locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator, calendar_code=calendar_code)
         except Exception as e:
             self._value_error(e)
-            result = SSF_LOCALE(locale_support=self.locale_support, locale=None, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
-        if update_table:
-            self._localize_table_from_locale(result.locale_name, prior_locale_names=[self.curl.locale_name, self.fmtl.locale_name])
+            result = SSF_LOCALE.shared(locale_support=self.locale_support, locale=None, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
         self._locale_cache[s_l] = result
         if SSF_LOCALE.lcid_reverse_map and s_l in SSF_LOCALE.lcid_reverse_map:
             self._locale_cache[str(SSF_LOCALE.lcid_reverse_map[s_l])] = result
 
         return result
 
+    _NEG_SIGN_POSN = {'-': 1, '<<-': 1, '>>-': 2, '<-': 3, '>-': 4, 'paren': 0, 'parens': 0,
+            '()': 0, 'redparens': 0, 'redparen': 0, 'red()': 0, '(': 0, 'red(': 0}     # negative_numbers to sign_posn
+
     def _get_currency_format(self, places, negative_numbers, use_thousands_separator=False, accounting=False):
         """Internal routine to compute an appropriate format for formatting currency.  ``places`` specifies the
         number of places after the decimal - if None, then the default is used.  ``negative_numbers`` specifies
@@ -3599,9 +4336,7 @@ class SSF:
                     negative_numbers = '-'
                 if negative_numbers is not None:
                     nnl = negative_numbers.lower()
-                    neg_map = {'-': 1, '<<-': 1, '>>-': 2, '<-': 3, '>-': 4, 'paren': 0, 'parens': 0, 
-                            '()': 0, 'redparens': 0, 'redparen': 0, 'red()': 0, '(': 0, 'red(': 0}
-                    sign_posn = neg_map.get(nnl, sign_posn)
+                    sign_posn = SSF._NEG_SIGN_POSN.get(nnl, sign_posn)
             ndx = (sign_posn << 2) + (cs_precedes << 1) + sep_by_space  # 0..19
             cs = '[$' + self.fmtl.currency_symbol + ']'
             prefix_map = {0:'(', 1:'(', 2:'('+cs, 3:'('+cs+' ',
@@ -3684,6 +4419,8 @@ class SSF:
         r = re.sub(r'^([^;]+);-\1;\1;@$', r'\1', r)         # Simplify result if all the same
         return r
 
+    _GET_FORMAT_CACHE_SIZE = 1024      # The get_format() cache is emptied when it gets this big
+
     def get_format(self, type='General', places=None, use_thousands_separator=None, 
             negative_numbers=None, fraction_denominator=-1, positive_sign_exponent=True, locale=None):
         """Get an appropriate format for the ``locale`` either specified here or the locale of
@@ -3714,9 +4451,28 @@ class SSF:
         For Scientific formats, ``positive_sign_exponent`` determines if a positive
         sign is displayed for positive exponents.  The default is True."""
 
+        key = (type, places, use_thousands_separator, negative_numbers, fraction_denominator, positive_sign_exponent,
+               locale, self._opts.dateNF)
+        cache = self._get_format_cache
+        try:
+            self.fmtl, result = cache[key]
+            return result
+        except KeyError:
+            pass
+        result = self._make_format(type, places, use_thousands_separator, negative_numbers, fraction_denominator,
+                                   positive_sign_exponent, locale)
+        if fraction_denominator != 0:       # That one reports an error each time
+            if len(cache) >= SSF._GET_FORMAT_CACHE_SIZE:
+                cache.clear()
+            cache[key] = (self.fmtl, result)
+        return result
+
+    def _make_format(self, type, places, use_thousands_separator, negative_numbers, fraction_denominator,
+            positive_sign_exponent, locale):
+        """The body of get_format(), without the cache"""
         self.fmtl = self.curl       # Locale
         if self.locale_support and locale is not None:
-            self.fmtl = SSF_LOCALE(locale=locale)
+            self.fmtl = SSF_LOCALE.shared(locale=locale)
         type = type.title()
         if fraction_denominator != -1:
             type = 'Fraction'
@@ -3784,6 +4540,58 @@ class SSF:
     _formats = {'Number', 'Currency', 'Accounting', 'Date', 'Short Date', 'Long Date', 'Time',
             'Percentage', 'Fraction', 'Scientific', 'Text'}
 
+    def compile(self, fmt, locale=None, decimal_separator=None, thousands_separator=None):
+        """Parse the spreadsheet format in ``fmt`` once, returning a `CompiledFormat` whose ``format(v, width, align)``
+        method formats values exactly like ``ssf.format(fmt, v, width, align, locale, decimal_separator,
+        thousands_separator)``, but without re-parsing the format each time.  Use this when formatting many values
+        with the same format.  The arguments are the same as for `ssf.format()`."""
+        o = self._opts
+        with self._lock:
+            ps = self._pound_sand
+            self._pound_sand = False
+            try:
+                self.fmtl = self._get_locale(locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+                self.tmpl = self.fmtl   # This one can be overridden by a [$-zzzz] specification and affects date formatting only
+
+                sfmt = ""
+                fmt = self.autocorrect_format(fmt)       # Issue #3
+
+                #switch(typeof fmt) {
+                #case "string":
+                if isinstance(fmt, str):
+                    if (fmt == "m/d/yy" or fmt == "m/d/yyyy") and o.dateNF: 
+                        sfmt = o.dateNF
+                    elif fmt.title() in SSF._formats:
+                        sfmt = self.get_format(fmt, locale=locale)
+                    else: 
+                        sfmt = fmt
+                #case "number":
+                elif isinstance(fmt, int):
+                    sfmt = None
+                    table_fmt = self._table_for(self.fmtl.locale_name)
+                    if fmt == 14 and o.dateNF: 
+                        sfmt = o.dateNF
+                    else:
+                        try:
+                            sfmt = (o.table or table_fmt)[fmt]
+                        except (KeyError, IndexError):
+                            pass
+                    if sfmt is None:
+                        try:
+                            sfmt = (o.table and o.table[SSF._default_map[fmt]]) or table_fmt[SSF._default_map[fmt]]
+                        except (KeyError, IndexError):
+                            pass
+                    if sfmt is None:
+                        try:
+                            sfmt = SSF._default_str[fmt]
+                        except (KeyError, IndexError):
+                            sfmt = "General"
+
+                sections = self._split_sections(sfmt)
+                return CompiledFormat(self, sfmt, sections, locale, self.fmtl, self.tmpl, self._pound_sand)
+            finally:
+                self._pound_sand = ps
+
     def format(self, fmt, v, width=None, align=None, locale=None, decimal_separator=None, thousands_separator=None):
         """Format a value ``v`` according to the spreadsheet format in ``fmt`` with field ``width`` with alignment
         ``align``.  If ``width`` is not specified, then the `default_width` from the `ssf` object is used.  
@@ -3797,84 +4605,140 @@ class SSF:
         the `ssf` object are used even if a ``locale`` is specified here.  Note that any locale specified in
         the format itself does not change these separator values, to be consistent with spreadsheet implementations.
         """
-        o = self._opts
-        c_start = self.color_pre
-        c_end = self.color_post
-        if width is None:
-            width = self._default_width
-        #self.tmpl = self.fmtl = self.curl       # Locale
-        if self._pound_sand and locale is None:     # We have a bad locale and errors='pounds'
-            if width is not None:
-                return '#' * width
-            return '##########'
-
-        self.fmtl = self._get_locale(locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator, update_table=True)
-        self.tmpl = self.fmtl   # This one can be overridden by a [$-zzzz] specification and affects date formatting only
-
-        sfmt = ""
-        fmt = self.autocorrect_format(fmt)       # Issue #3
-
-        #switch(typeof fmt) {
-        #case "string":
-        if isinstance(fmt, str):
-            if (fmt == "m/d/yy" or fmt == "m/d/yyyy") and o.dateNF: 
-                sfmt = o.dateNF
-            elif fmt.title() in SSF._formats:
-                sfmt = self.get_format(fmt, locale=locale)
-            else: 
-                sfmt = fmt
-        #case "number":
-        elif isinstance(fmt, int):
-            sfmt = None
-            if fmt == 14 and o.dateNF: 
-                sfmt = o.dateNF
-            else:
-                try:
-                    sfmt = (o.table or self.table_fmt)[fmt]
-                except (KeyError, IndexError):
-                    pass
-            if sfmt is None:
-                try:
-                    sfmt = (o.table and o.table[SSF._default_map[fmt]]) or self.table_fmt[SSF._default_map[fmt]]
-                except (KeyError, IndexError):
-                    pass
-            if sfmt is None:
-                try:
-                    sfmt = SSF._default_str[fmt]
-                except (KeyError, IndexError):
-                    sfmt = "General"
-        
-        try:
-            #issues/48 if self.isgeneral(sfmt,0): 
-                #issues/48 return self._general_fmt(v, o, width, align=align)
-            ov = v      # issues/48
-            if SSF.fmt_is_date(sfmt) and isinstance(v, str):
+        if type(fmt) is int and 0 <= fmt <= SSF._BUILTIN_MAX and decimal_separator is None and thousands_separator is None:
+            cf = self._builtin_format(fmt, locale)
+        else:
+            key = (fmt, locale, decimal_separator, thousands_separator, self._opts.dateNF)
+            cache = self._format_cache
+            with self._lock:
                 try:
-                    v = date_parse(v)
-                except Exception:
-                    pass
-            if isinstance(v, date) or isinstance(v, tm) or isinstance(v, timedelta): 
-                v = self._datenum_local(v, o.date1904)
-            f = self._choose_fmt(sfmt, v)
-            if self._isgeneral(f[1]): 
-                #issues/48 return self._general_fmt(v, o, width, '@' in sfmt, align)
-                return self._general_fmt(ov, o, width, '@' in sfmt, align)   # issues/48
-            #center = False
-            #if isinstance(v, bool):
-                #if v:
-                    #v = "TRUE" 
-                #else:
-                    #v = "FALSE"
-                #center = True
-            if v == '' or v is None:
-                return SSF._fill(' ', width)
-            return self._eval_fmt(f[1], v, o, f[0], width, c_start, c_end, align)
-        finally:
-            if self._pound_sand:     # We have a bad format/value and errors='pounds'
-                self._pound_sand = False
-                if width is not None:
-                    return '#' * width
-                return '##########'
+                    cf = cache[key]
+                    cache.move_to_end(key)
+                    self._format_cache_hits += 1
+                except KeyError:
+                    self._format_cache_misses += 1
+                    cf = self.compile(fmt, locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+                    if self._format_cache_size and not cf._pounds:    # Errors with the locale only show up the first time
+                        cache[key] = cf
+                        if len(cache) > self._format_cache_size:
+                            cache.popitem(last=False)
+                            self._format_cache_evictions += 1
+                except TypeError:       # Not hashable
+                    cf = self.compile(fmt, locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+        if self._result_cache_size and type(v) in SSF._RESULT_CACHE_TYPES:
+            return self._cached_result(cf, v, width, align)
+        return cf.format(v, width=width, align=align)
+
+    _RESULT_CACHE_TYPES = {int, float, bool, str, type(None), datetime, date, tm, timedelta}
+
+    def _cached_result(self, cf, v, width, align):
+        """Returns ``cf.format(v, width, align)`` from the result cache, adding it if it's not there"""
+        key = (cf, width, align, self.color_pre, self.color_post, type(v), v)
+        if type(v) is datetime or type(v) is tm:    # Equal aware values can show different times in their timezones
+            key += (v.tzinfo, v.fold)
+        cache = self._result_cache
+        with self._lock:
+            try:
+                result = cache[key]
+                cache.move_to_end(key)
+                self._result_cache_hits += 1
+                return result
+            except KeyError:
+                self._result_cache_misses += 1
+        result = cf.format(v, width=width, align=align)
+        with self._lock:
+            if key not in cache:
+                cache[key] = result
+                self._result_cache_currbytes += sys.getsizeof(result)
+                maxbytes = self._result_cache_bytes
+                while len(cache) > self._result_cache_size or (maxbytes is not None and self._result_cache_currbytes > maxbytes):
+                    self._result_cache_currbytes -= sys.getsizeof(cache.popitem(last=False)[1])
+                    self._result_cache_evictions += 1
+        return result
+
+    def format_array(self, fmt, values, width=None, align=None, locale=None, decimal_separator=None, thousands_separator=None):
+        """Format each of the ``values`` according to the spreadsheet format in ``fmt``.  The ``values`` can
+        be a NumPy array (of serial numbers, datetime64, or any other values) or any sequence.  Returns an object
+        array of strings with the same shape, or a list of strings if NumPy is not installed.  The results are the
+        same as calling `ssf.format()` on each value with the same arguments, but if NumPy is installed, common
+        number and date formats are applied to numeric arrays in bulk, which is much faster."""
+        if type(fmt) is int and 0 <= fmt <= SSF._BUILTIN_MAX and decimal_separator is None and thousands_separator is None:
+            cf = self._builtin_format(fmt, locale)
+        else:
+            cf = self.compile(fmt, locale=locale, decimal_separator=decimal_separator, thousands_separator=thousands_separator)
+        return cf.format_array(values, width=width, align=align)
+
+    _BUILTIN_MAX = 81           # Format ids 0 thru 81 are built in (see _init_table, _default_map and _default_str)
+
+    def _builtin_format(self, fmt, locale):
+        """The `CompiledFormat` for the format id ``fmt`` (0 thru _BUILTIN_MAX) and ``locale``, which is compiled
+        the first time it's used and kept until the table or our locale changes"""
+        formats = self._builtin_formats.get((locale, self._opts.dateNF))
+        if formats is not None:
+            cf = formats[fmt]
+            if cf is not None:
+                return cf
+        with self._lock:
+            formats = self._builtin_formats.setdefault((locale, self._opts.dateNF), [None] * (SSF._BUILTIN_MAX + 1))
+            cf = self.compile(fmt, locale=locale)
+            if not cf._pounds:          # Errors with the locale only show up the first time
+                formats[fmt] = cf
+        return cf
+
+    def to_serial_many(self, values, date1904=None):
+        """Convert each of ``values`` to a spreadsheet serial number, the same way `ssf.format()` does before
+        it formats a date or time.  The ``values`` can be datetimes (including pandas Timestamps), dates, times,
+        timedeltas, NumPy datetime64 or timedelta64 values, or a NumPy array of any of these.  Naive datetimes are
+        in our timezone, and dates before March 1, 1900 allow for the 1900 leap year bug.  Numbers are returned
+        as floats, and None or NaT gives nan.  If ``date1904`` is not None, it replaces the ``date1904`` given
+        when this SSF was made.  Returns a NumPy float array with the same shape if ``values`` is a NumPy array,
+        else a list."""
+        if date1904 is None:
+            date1904 = self._opts.date1904
+        dtype = getattr(values, 'dtype', None)
+        if dtype is None:
+            return self._datenum_local_many(values, date1904)
+        import numpy as np
+        arr = np.asarray(values)
+        if arr.dtype.kind == 'M':
+            items = [v if isinstance(v, datetime) else None for v in arr.astype('datetime64[us]').ravel().tolist()]
+        elif arr.dtype.kind == 'm':
+            items = arr.astype('timedelta64[us]').ravel().tolist()
+        else:
+            items = arr.ravel().tolist()
+        return np.array(self._datenum_local_many(items, date1904), dtype=np.float64).reshape(arr.shape)
+
+    def format_cache_info(self):
+        """Returns a SimpleNamespace with the ``hits``, ``misses``, and ``evictions`` of the cache of parsed
+        formats used by `ssf.format()`, along with its ``maxsize`` and current size (``currsize``)."""
+        return SimpleNamespace(hits=self._format_cache_hits, misses=self._format_cache_misses,
+                evictions=self._format_cache_evictions, maxsize=self._format_cache_size,
+                currsize=len(self._format_cache))
+
+    def _clear_result_cache(self):
+        with self._lock:
+            self._result_cache.clear()
+            self._result_cache_currbytes = 0
+
+    def result_cache_info(self):
+        """Returns the statistics of the result cache (see `SSF`) as an object with ``hits``, ``misses``,
+        ``evictions``, ``hit_ratio``, ``maxsize``, ``currsize``, ``maxbytes``, and ``currbytes``"""
+        with self._lock:
+            lookups = self._result_cache_hits + self._result_cache_misses
+            return SimpleNamespace(hits=self._result_cache_hits, misses=self._result_cache_misses,
+                    evictions=self._result_cache_evictions, hit_ratio=self._result_cache_hits / lookups if lookups else 0.0,
+                    maxsize=self._result_cache_size, currsize=len(self._result_cache),
+                    maxbytes=self._result_cache_bytes, currbytes=self._result_cache_currbytes)
+
+    def clear_format_cache(self):
+        """Empty the cache of parsed formats used by `ssf.format()` (and the parsed built-in format ids) and
+        the result cache, and reset their statistics"""
+        with self._lock:
+            self._format_cache.clear()
+            self._builtin_formats.clear()
+            self._clear_result_cache()
+            self._result_cache_hits = self._result_cache_misses = self._result_cache_evictions = 0
+            self._format_cache_hits = self._format_cache_misses = self._format_cache_evictions = 0
 
     def get_day_names(self):
         """Returns a 7-tuple containing 2-tuples of the abbreviation and full-day name,
@@ -3904,7 +4768,7 @@ class SSF:
                 if not isinstance(e, str):
                     self._value_error(f'set_day_names needs a tuple of strings for each of the 7 entries')
                     return
-        self.curl.days = tup[6:] + tup[:6]
+        self._replace_curl(days=tup[6:] + tup[:6])
 
     def get_month_names(self):
         """Returns a 13-tuple containing 3-tuples of the single-letter abbreviation,
@@ -3935,38 +4799,66 @@ class SSF:
                 if not isinstance(e, str):
                     self._value_error(f'set_month_names needs a tuple of strings for each of the 13 entries, except the first')
                     return
-        self.curl.months = tup[1:]
+        self._replace_curl(months=tup[1:])
+
+    def _replace_curl(self, **changes):
+        """Change our locale, which is copied first because other SSF objects share it"""
+        with self._lock:
+            old = self.curl
+            self.curl = old.replace(**changes)
+            for key, value in self._locale_cache.items():
+                if value is old:
+                    self._locale_cache[key] = self.curl
+            if self._ctx.fmtl is old:
+                self._ctx.fmtl = self.curl
+            if self._ctx.tmpl is old:
+                self._ctx.tmpl = self.curl
+            self._format_cache.clear()      # These have the prior locale
+            self._get_format_cache.clear()
+            self._builtin_formats.clear()
+            self._clear_result_cache()
+            self._style_formats = None
 
     def load_entry(self, fmt, idx=None):
         """Loads a single format entry specified by ``fmt`` into the mapping table.  If
         ``idx`` is specified, then that is used as the table index, else the first free
         entry is used.  The index used is returned."""
-        #if(typeof idx != 'number') {
-            #idx = +idx || -1;
-        if not isinstance(idx, int):
-            try:
-                idx = int(idx)
-            except Exception:
-                idx = -1
-
-            for i in range(0x0188):
-                if i not in self.table_fmt:   
-                    if idx < 0:  
+        with self._lock:
+            #if(typeof idx != 'number') {
+                #idx = +idx || -1;
+            if not isinstance(idx, int):
+                try:
+                    idx = int(idx)
+                except Exception:
+                    idx = -1
+
+                for i in range(0x0188):
+                    if i not in self.table_fmt:   
+                        if idx < 0:  
+                            idx = i
+                            continue
+                    if self.table_fmt.get(i) == fmt: 
                         idx = i
-                        continue
-                if self.table_fmt.get(i) == fmt: 
-                    idx = i
-                    break
-            if idx < 0: 
-                idx = 0x187
+                        break
+                if idx < 0: 
+                    idx = 0x187
         
-        self.table_fmt[idx] = fmt
+            self.table_fmt[idx] = fmt       # Calls _table_changed()
         return idx
 
+    def _table_changed(self):
+        """Called when the formats loaded into our table are changed, by `load_entry()` or through `get_table()`"""
+        with self._lock:
+            self._format_cache.clear()      # We may have cached the prior format for an index
+            self._builtin_formats.clear()
+            self._clear_result_cache()
+            self._style_formats = None
+
     load = load_entry
     #_table = table_fmt
     def get_table(self):
-        """Returns the mapping table (a dict) from ints to format strings"""
+        """Returns the mapping table from ints to format strings.  Entries set in it (or with `load_entry()`)
+        override the built-in formats for every locale."""
         return self.table_fmt
 
     def load_table(self, tbl):
@@ -3974,6 +4866,40 @@ class SSF:
         for i,v in tbl.items():
             self.load_entry(v, i)
 
+    def load_styles(self, source):
+        """Load the number formats and cell styles of an xlsx workbook, where ``source`` is the path of the xlsx
+        file or of its xl/styles.xml, or a binary file object of either.  The custom number formats are loaded
+        into the table like `load_table()`, and the format of each cell style is compiled for `format_by_style()`.
+        Returns the number of cell styles."""
+        from .styles import read_styles
+        num_fmts, cell_xfs = read_styles(source)
+        with self._lock:
+            self.load_table(num_fmts)
+            self._styles = cell_xfs
+            self._compile_styles()
+        return len(cell_xfs)
+
+    def _compile_styles(self):
+        """Compile the format of each cell style, sharing them between styles with the same numFmtId"""
+        with self._lock:
+            compiled = {}
+            for idx in self._styles:
+                if idx not in compiled:
+                    compiled[idx] = self._builtin_format(idx, None) if 0 <= idx <= SSF._BUILTIN_MAX else self.compile(idx)
+            self._style_formats = [compiled[idx] for idx in self._styles]
+            return self._style_formats
+
+    def format_by_style(self, style_id, v, width=None, align=None):
+        """Format a value ``v`` with the number format of the cell style ``style_id`` (the ``s`` attribute of an
+        xlsx cell) loaded by `load_styles()`, with field ``width`` and alignment ``align``.  Each style's format
+        is looked up and parsed just once.  A cell style that wasn't loaded uses the General format."""
+        formats = self._style_formats
+        if formats is None:
+            formats = self._compile_styles()
+        if 0 <= style_id < len(formats):
+            return formats[style_id].format(v, width=width, align=align)
+        return self.format(0, v, width=width, align=align)
+
     def autocorrect_format(self, fmt):
         """Run some automatic corrections on the given format, and return the corrected format"""
         if fmt is None:
@@ -4086,6 +5012,426 @@ class SSF:
                     return restore_escapes(fmt2)
         return fmt
 
+# SSF._interpret_num works out the shape of a number format (all zeros, a fraction with a fixed denominator,
+# digits around a decimal point, ...) with a cascade of regular expressions for every value it writes.
+# _compile_num makes that choice once for each format, and returns a writer(ssf, type, val) that only does
+# the work for that shape.  The rarer shapes (exponents, phone numbers, fractions without a fixed
+# denominator, ...) are still written by SSF._interpret_num.
+
+_num_zeros = re.compile(r'^00+$')
+_num_hashq = re.compile(r'^[#?]+$')
+_num_frac1 = re.compile(r'(?P<num>[#0?]+)\/(?P<den>\d+)')       # issues/74
+_num_hash_zeros = re.compile(r'^#+0+$')
+_num_dec1 = re.compile(r'^(?P<before>[#0?,]*)(?P<point>\.)(?P<after>[#0?]*)$')
+_num_dec0 = re.compile(r'^(?P<before>[#0?,]*)(?P<point>)(?P<after>)$')
+_num_whole_frac = re.compile(r'\b(\d+)[/]\1\b')     # e.g. 1/1 or 12/12
+_num_zero_frac = re.compile(r'\b0\/')               # e.g. 0/1 or 0/12
+_num_exp_eng = re.compile(r'^(?P<mantbd>[#?0]+[#?0])(?P<mantad>[.][#?0]*)?E(?P<exps>[-+])(?P<exp>[#?0]+)$')
+_num_exp_pad00 = re.compile(r'E[+-]00$')            # issues/73
+
+def _hashq(st):
+    """Fill an empty value like the format ``st``: '0' stays '0', '?' becomes ' ', and '#' is dropped"""
+    return st.replace('#', '').replace('?', ' ')
+
+# The digit engine.  Rounding is done the same way as SSF.round (half away from zero, after scaling by a
+# power of 10 in floating point), but the digits come from the rounded integer instead of dividing back
+# down to a float and converting that with str() or format().  Numbers of up to 15 significant digits
+# survive the trip through a float, so the digits are the same as the round trip gives.  Larger results
+# return None, and the callers use the float path for them as before.
+
+_EXACT_DIGITS = 10**15
+
+def _fixed_digits(aval, places):
+    """Round the non-negative number ``aval`` to ``places`` decimals like SSF.round does, returning
+    (integer digits, fraction digits) with exactly ``places`` fraction digits, or None if there would
+    be more than 15 significant digits"""
+    if isinstance(aval, int):
+        return str(aval), '0' * places
+    n = int(aval * 10**places + 0.5)
+    if n >= _EXACT_DIGITS:
+        return None
+    if not places:
+        return str(n), ''
+    s = str(n).rjust(places + 1, '0')
+    return s[:-places], s[-places:]
+
+def _tiny_fraction(i, f):
+    """to_str() shows values under 0.0001 with 15 significant digits (issues/80), so pad the fraction digits
+    ``f`` (without trailing zeros) of a rounded value with integer digits ``i`` the same way"""
+    if i == '0' and f[:4] == '0000' and f:
+        return f.ljust(len(f) - len(f.lstrip('0')) + 15, '0')
+    return f
+
+def _significant_digits(v, p, pp):
+    """Round the positive number ``v`` to ``p`` significant digits like SSF.toPrecision does, where ``pp``
+    is the number of decimal places that needs.  Returns (digits, exponent of the first digit) with at
+    most ``p`` digits, or None if that can't be done exactly"""
+    if p > 15 or v == 0:
+        return None
+    if isinstance(v, int) and pp >= 0:
+        d = str(v)
+        return d, len(d) - 1
+    n = int(v * 10**pp + 0.5)
+    d = str(n)
+    if n == 0 or len(d) > p:
+        return None
+    return d, len(d) - 1 - pp
+
+@lru_cache(maxsize=1024)
+def _compile_num(fmt):
+    """Return a writer(ssf, type, val) giving the same result as ``ssf._interpret_num(type, fmt, val)``"""
+    def interpret(ssf, type, val):
+        return ssf._interpret_num(type, fmt, val)
+
+    pcolon = fmt.find(':')      # issues/74: A separator we inserted between the int part and the fraction
+    if pcolon > 0:
+        return _num_fraction_writer(fmt[:pcolon], fmt[pcolon+1:])
+    nfmt = fmt[pcolon+1:]
+    if ':' in nfmt:
+        return interpret
+    write_int = _num_int_writer(nfmt) or interpret
+    write_flt = _num_flt_writer(nfmt, interpret) or interpret
+
+    def write(ssf, type, val):
+        if isinstance(val, bool):
+            return ('FALSE','TRUE')[val]
+        if type[0] == '(':
+            return interpret(ssf, type, val)
+        if int(val) == val and -2147483648 <= val <= 2147483647:
+            return write_int(ssf, type, val)
+        return write_flt(ssf, type, val)
+    return write
+
+def _num_fraction_writer(ifmt, ffmt):
+    """Writer for a fraction with an int part, where ``ifmt`` is the format of the int part and ``ffmt``
+    is the format of the fraction"""
+    blank = _hashq(re.sub(r'[/\d]', '?', ffmt))
+    ifmt0 = ifmt if ifmt[-1] == '0' else ifmt[:-1] + '0'      # issues/66: Force a zero output int part
+
+    def write(ssf, type, val):
+        if isinstance(val, bool):
+            return ('FALSE','TRUE')[val]
+        int_part = int(val)
+        frac_part = abs(val - int_part)
+        if frac_part != 0:
+            frac = ssf._write_num(type, ffmt, frac_part)
+            if _num_whole_frac.search(frac):
+                int_part = SSF.round(val)
+            elif not _num_zero_frac.search(frac):
+                return ssf._write_num(type, ifmt, int_part) + ':' + frac
+        return ssf._write_num(type, ifmt0 if int_part == 0 else ifmt, int_part) + ':' + blank
+    return write
+
+def _num_shape(fmt):
+    """The shape of a number format, as checked by SSF._interpret_num, and the match object if any"""
+    if fmt[-1] == ',':
+        return 'commas', None
+    if 'E' in fmt:
+        return (None if _num_exp_eng.match(fmt) else 'exp'), None
+    if fmt[0] == '$':
+        return None, None
+    if _num_zeros.match(fmt):
+        return 'zeros', None
+    if _num_hashq.match(fmt):
+        return 'hashq', None
+    r = _num_frac1.search(fmt)
+    if r:
+        return 'frac', r
+    if _num_hash_zeros.match(fmt):
+        return 'hash_zeros', None
+    r = _num_dec1.match(fmt) or _num_dec0.match(fmt)
+    if r:
+        return 'dec', r
+    return None, None
+
+def _num_commas(fmt, is_int):
+    """Writer for formats ending in commas, which divide the value by 1000 for each comma"""
+    idx = len(fmt) - 1
+    while idx > 0 and fmt[idx-1] == ',':
+        idx -= 1
+    den = 10**(3*(len(fmt)-idx))
+    sfmt = fmt[:idx]
+
+    def write(ssf, type, val):
+        if (is_int or isinstance(val, int)) and val % den == 0:
+            return ssf._write_num(type, sfmt, val // den)
+        return ssf._write_num(type, sfmt, val / den)
+    return write
+
+def _num_frac(r, is_int):
+    """Writer for a fraction with a fixed denominator, where ``r`` is the match of _num_frac1"""
+    den = int(r.group('den'))
+    ln = len(r.group('num'))
+    blank = ' ' * (ln + 1 + len(r.group('den')))
+    sden = '/' + SSF._pad0(den, len(r.group('den')))
+
+    def write(ssf, type, val):
+        sign = (ssf.fmtl.minus_sign if is_int else '-') if val < 0 else ''
+        rr = SSF.round(abs(val) * den)
+        return sign + (blank if rr == 0 else SSF.to_str(rr).rjust(ln) + sden)
+    return write
+
+def _num_exp(fmt, is_int):
+    """Writer for exponents with a plain mantissa, like write_num_exp and write_num_exp2.  The digits come
+    from format(), which rounds correctly."""
+    pdot = fmt.find('.')                # issues/79
+    pe = fmt.find('E')
+    spec = '.%de' % (pe - pdot - 1 if pdot >= 0 else 0)
+    strip0 = not _num_exp_pad00.search(fmt)
+    no_plus = 'E-' in fmt
+    heads = [_hashq(fmt[:k]) for k in range(len(fmt)+1)]
+
+    def write(ssf, type, val):
+        o = format(val, spec)
+        pexp = o.find('e')
+        if strip0 and pexp >= 0 and o[pexp+2] == '0':      # Python gives 1.2e+01 where JavaScript gives 1.2e+1
+            o = o[:pexp+2] + o[pexp+3:]
+        if no_plus:
+            o = o.replace('e+', 'e')
+        if pdot < 0:
+            o = o.replace('.', '')
+            e = pe - o.find('e')
+        else:
+            if '.' not in o:
+                o = o.replace('e', '.e')
+            e = pdot - o.find('.')
+        if e > 0:
+            o = heads[e] + o
+        fmtl = ssf.fmtl
+        if is_int:
+            o = o.replace('e', 'E').replace('.', fmtl.decimal_point)
+            return o.replace('E', fmtl.exponential).replace('+', fmtl.plus_sign).replace('-', fmtl.minus_sign)
+        o = o.replace('e', 'E').replace('E', fmtl.exponential).replace('+', fmtl.plus_sign)
+        return o.replace('-', fmtl.minus_sign).replace('.', fmtl.decimal_point)
+    return write
+
+def _num_int_writer(fmt):
+    """Writer for values in the int range, like write_num_int in SSF._interpret_num, or None if that's needed"""
+    if not fmt:
+        return lambda ssf, type, val: ''
+    shape, r = _num_shape(fmt)
+    if shape == 'commas':
+        return _num_commas(fmt, True)
+    if shape == 'exp':
+        return _num_exp(fmt, True)
+    if shape == 'frac':
+        return _num_frac(r, True)
+    n = len(fmt)
+    heads = [_hashq(fmt[:k]) for k in range(n+1)]
+    if shape in ('zeros', 'hash_zeros'):
+        width = n - fmt.find('0')
+        def write(ssf, type, val):
+            o = SSF.to_str(abs(val)).rjust(width, '0')
+            return ssf.fmtl.minus_sign + o if val < 0 else o
+    elif shape == 'hashq':
+        def write(ssf, type, val):
+            o = SSF.to_str(abs(val)) if val != 0 else ''
+            o = o if len(o) > n else heads[n-len(o)] + o
+            return ssf.fmtl.minus_sign + o if val < 0 else o
+    elif shape == 'dec':
+        comma = ',' in r.group('before')
+        if comma:
+            fmt = fmt.replace(',', '')
+            n = len(fmt)
+            heads = [_hashq(fmt[:k]) for k in range(n+1)]
+        if r.group('point'):
+            pdot = fmt.find('.')
+            tail = '.' + _hashq(r.group('after'))
+            def write(ssf, type, val):
+                fmtl = ssf.fmtl
+                dp = fmtl.decimal_point
+                o = SSF.to_str(abs(val))
+                if pdot > len(o):           # https://github.com/SheetJS/ssf/issues/65
+                    o = heads[pdot-len(o)] + o
+                if comma:
+                    o = fmtl.commaify(o) + dp + tail[1:]
+                else:
+                    o = (o + tail).replace('.', dp)
+                if '0' + dp not in fmt and o.startswith('0' + dp):
+                    o = o[1:]
+                return fmtl.minus_sign + o if val < 0 else o
+        else:
+            has_zero = '0' in fmt
+            def write(ssf, type, val):
+                o = SSF.to_str(abs(val))
+                if n > len(o):              # https://github.com/SheetJS/ssf/issues/65
+                    o = heads[n-len(o)] + o
+                if comma:
+                    o = ssf.fmtl.commaify(o)
+                if not has_zero and o[:1] == '0':
+                    o = o[1:]
+                return ssf.fmtl.minus_sign + o if val < 0 else o
+    else:
+        return None
+    return write
+
+def _num_flt_writer(fmt, interpret):
+    """Writer for other values, like write_num_flt in SSF._interpret_num, or None if that's needed.  Values
+    with too many digits for the digit engine are passed on to ``interpret``."""
+    if not fmt:
+        return None
+    shape, r = _num_shape(fmt)
+    if shape == 'commas':
+        return _num_commas(fmt, False)
+    if shape == 'exp':
+        return _num_exp(fmt, False)
+    if shape == 'frac':
+        return _num_frac(r, False)
+    n = len(fmt)
+    heads = [_hashq(fmt[:k]) for k in range(n+1)]
+    if shape in ('zeros', 'hash_zeros'):
+        width = n - fmt.find('0')
+        def write(ssf, type, val):
+            return ('-' if val < 0 else '') + SSF._pad0r(abs(val), width)
+    elif shape == 'hashq':
+        def write(ssf, type, val):
+            o = SSF._pad0r(abs(val), 0)
+            if o == '0':
+                o = ''
+            return ('-' if val < 0 else '') + (o if len(o) > n else heads[n-len(o)] + o)
+    elif shape == 'dec':
+        comma = ',' in r.group('before')
+        if comma:
+            fmt = fmt.replace(',', '')
+            n = len(fmt)
+            heads = [_hashq(fmt[:k]) for k in range(n+1)]
+        after = r.group('after')
+        places = len(after)
+        if r.group('point'):
+            tails = [_hashq(after[k:]) for k in range(places+1)]
+            pdot = fmt.find('.')
+            keep_zero = '0.' in fmt
+            def write(ssf, type, val):
+                digits = _fixed_digits(abs(val), places)
+                if digits is None:
+                    return interpret(ssf, type, val)
+                i, f = digits
+                f = _tiny_fraction(i, f.rstrip('0'))
+                sign = '-' if val < 0 and (f or i != '0') else ''
+                if not keep_zero and i == '0':
+                    i = ''
+                e = pdot - len(i)
+                if e > 0:                   # https://github.com/SheetJS/ssf/issues/65
+                    i = heads[e] + i
+                fmtl = ssf.fmtl
+                return sign + (fmtl.commaify(i) if comma else i) + fmtl.decimal_point + f + tails[min(len(f), places)]
+        else:
+            has_zero = '0' in fmt
+            def write(ssf, type, val):
+                digits = _fixed_digits(abs(val), 0)
+                if digits is None:
+                    return interpret(ssf, type, val)
+                o = digits[0]
+                sign = '-' if val < 0 and o != '0' else ''
+                if not has_zero and o[:1] == '0':
+                    o = o[1:]
+                e = n - len(o)
+                if e > 0:                   # https://github.com/SheetJS/ssf/issues/65
+                    o = heads[e] + o
+                if comma:
+                    o = ssf.fmtl.commaify(o)
+                return sign + o
+    else:
+        return None
+    return write
+
+class CompiledFormat:
+    """A spreadsheet format that has been parsed by `ssf.compile()`.  Call ``format(v)`` to format values
+    with it.  This shouldn't be created directly."""
+
+    def __init__(self, ssf, sfmt, sections, locale, fmtl, tmpl, pounds):
+        self._ssf = ssf
+        self._sfmt = sfmt
+        self._sections = sections
+        self._locale = locale
+        self._fmtl = fmtl
+        self._tmpl = tmpl
+        self._pounds = pounds                   # Errors found while compiling, with errors='pounds'
+        self._is_date = SSF.fmt_is_date(sfmt)
+        self._text_fmt = '@' in sfmt
+        self._tokenized = {}                    # (section, flen, has_wid) to the result of _tokenize_fmt
+        self._plans = {}                        # (section, flen, has_wid, colors) to the plan used by format_array
+
+    @property
+    def fmt(self):
+        """The format string used, after any table lookups and auto-corrections"""
+        return self._sfmt
+
+    @property
+    def is_date(self):
+        """True if this is a date format"""
+        return self._is_date
+
+    def __repr__(self):
+        return f'CompiledFormat({self._sfmt!r})'
+
+    def format(self, v, width=None, align=None):
+        """Format a value ``v`` with field ``width`` and alignment ``align``.  See `ssf.format()` for the details."""
+        ssf = self._ssf
+        o = ssf._opts
+        c_start = ssf.color_pre
+        c_end = ssf.color_post
+        if width is None:
+            width = ssf._default_width
+        if ssf._pound_sand and self._locale is None:     # We have a bad locale and errors='pounds'
+            return SSF._pounds(width)
+
+        ssf.fmtl = self._fmtl
+        ssf.tmpl = self._tmpl
+        ssf.fmt_calendar_code = None
+        if self._pounds:
+            ssf._pound_sand = True
+        try:
+            #issues/48 if self.isgeneral(sfmt,0): 
+                #issues/48 return self._general_fmt(v, o, width, align=align)
+            ov = v      # issues/48
+            if self._is_date and isinstance(v, str):
+                try:
+                    v = date_parse(v)
+                except Exception:
+                    pass
+            if isinstance(v, date) or isinstance(v, tm) or isinstance(v, timedelta): 
+                v = ssf._datenum_local(v, o.date1904)
+            f = ssf._choose_fmt(self._sfmt, v, self._sections)
+            if ssf._isgeneral(f[1]): 
+                #issues/48 return self._general_fmt(v, o, width, '@' in sfmt, align)
+                return ssf._general_fmt(ov, o, width, self._text_fmt, align)   # issues/48
+            if v == '' or v is None:
+                return SSF._fill(' ', width)
+            section = self._section(f[1], f[0], width is not None)
+            if section is None:         # Depends on the value, so we have to tokenize it each time
+                return ssf._eval_fmt(f[1], v, o, f[0], width, c_start, c_end, align)
+            if section.times is not None and type(v) in (int, float) and \
+                    0 <= v < (SSF._LAST_DAY_1904 if o.date1904 else SSF._LAST_DAY):
+                return ssf._eval_time_of_day(section, v, o, f[0])
+            return ssf._eval_section(section, v, o, f[0], width, c_start, c_end, align)
+        finally:
+            if ssf._pound_sand:     # We have a bad format/value and errors='pounds'
+                ssf._pound_sand = False
+                return SSF._pounds(width)
+
+    def format_array(self, values, width=None, align=None):
+        """Format each of the ``values``, which can be a NumPy array or any sequence, with field ``width`` and
+        alignment ``align``.  Returns an object array of strings with the same shape as ``values``, or a list
+        of strings if NumPy is not installed.  See `ssf.format_array()` for the details."""
+        from .vectorize import format_array
+        return format_array(self, values, width=width, align=align)
+
+    def _section(self, fmt, flen, has_wid):
+        """Returns the tokenized section ``fmt`` of our format, or None if it has to be tokenized for each value"""
+        key = (fmt, flen, has_wid)
+        try:
+            return self._tokenized[key]
+        except KeyError:
+            ssf = self._ssf
+            ssf.fmtl = self._fmtl
+            ssf.tmpl = self._tmpl
+            section = ssf._tokenize_fmt(fmt, flen, has_wid, self._fmtl, self._tmpl)
+            if section is not None:     # Results by time of day for time-only formats, see _eval_time_of_day
+                section.times = {} if not has_wid and SSF._is_time_of_day(section) else None
+            self._tokenized[key] = section
+            return section
+
 #SSF.init_table = init_table;
 #SSF.format = format;
 
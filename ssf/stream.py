@@ -0,0 +1,67 @@
+"""Format the rows of large CSV or TSV exports as a stream, a chunk of rows at a time, so that any number
+of rows can be formatted in constant memory"""
+import csv
+from itertools import islice
+from .ssf import SSF
+
+
+def _compile_columns(ssf, column_formats):
+    """A `CompiledFormat` for each column, or None for the columns that are passed through unchanged"""
+    return [None if fmt is None else ssf.compile(fmt) for fmt in column_formats]
+
+
+def _format_chunk(compiled, chunk, width, align):
+    """Format a list of rows, returning the formatted rows as lists of strings"""
+    ncols = len(compiled)
+    if all(len(row) == ncols for row in chunk):
+        columns = list(zip(*chunk))
+    else:       # Ragged rows: missing cells are formatted as None, and the rows keep their own lengths
+        columns = list(zip(*(tuple(row[:ncols]) + (None,) * (ncols - len(row)) for row in chunk)))
+    for col, cf in enumerate(compiled):
+        if cf is not None:
+            result = cf.format_array(columns[col], width=width, align=align)
+            columns[col] = result if isinstance(result, list) else result.tolist()
+    rows = [list(row) for row in zip(*columns)] if columns else [[] for _ in chunk]
+    for out, row in zip(rows, chunk):
+        if len(row) != ncols:
+            out[len(row):] = list(row[ncols:])
+    return rows
+
+
+def format_rows(rows, column_formats, ssf=None, chunk_size=10000, width=None, align=None, **kwargs):
+    """Generate each of the ``rows`` (an iterable of sequences, like a ``csv.reader``) as a list of strings,
+    with each value formatted by the corresponding format in ``column_formats``.  A format of None passes
+    that column through unchanged, as do any values beyond the last format.  Each format is compiled once,
+    and the rows are read and formatted ``chunk_size`` rows at a time with `ssf.format_array()`, so the
+    memory used doesn't grow with the number of rows.  Uses ``ssf`` (an `SSF` object), or else an `SSF`
+    created with any other ``kwargs`` (like ``locale`` or ``date1904``).
+
+    Note that a ``csv.reader`` returns every value as a string, which is formatted as text.  Use
+    ``csv.reader(f, quoting=csv.QUOTE_NONNUMERIC)`` to read the unquoted values as numbers."""
+    if ssf is None:
+        ssf = SSF(**kwargs)
+    compiled = _compile_columns(ssf, column_formats)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from _format_chunk(compiled, chunk, width, align)
+
+
+def write_rows(out, rows, column_formats, ssf=None, chunk_size=10000, width=None, align=None, dialect='excel',
+               **kwargs):
+    """Format the ``rows`` like `format_rows()`, and write them as they're formatted to the text stream ``out``
+    with a ``csv.writer`` using ``dialect`` (e.g. 'excel-tab' for TSV).  Returns the number of rows written."""
+    if ssf is None:
+        ssf = SSF(**kwargs)
+    writer = csv.writer(out, dialect=dialect)
+    compiled = _compile_columns(ssf, column_formats)
+    rows = iter(rows)
+    count = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return count
+        writer.writerows(_format_chunk(compiled, chunk, width, align))
+        count += len(chunk)
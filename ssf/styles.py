@@ -0,0 +1,68 @@
+"""Read the number formats and the cell styles of an xlsx workbook from its styles part (xl/styles.xml),
+parsing the XML as a stream"""
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+_STYLES_TYPE = '/relationships/styles'
+
+
+def _local(tag):
+    """The tag without its {namespace}"""
+    return tag.rpartition('}')[2]
+
+
+def _styles_name(z):
+    """The name of the styles part in the xlsx zip ``z``, from the workbook relationships if it has them"""
+    try:
+        with z.open('xl/_rels/workbook.xml.rels') as f:
+            for _, elem in iterparse(f):
+                if _local(elem.tag) == 'Relationship' and elem.get('Type', '').endswith(_STYLES_TYPE):
+                    return posixpath.normpath(posixpath.join('xl', elem.get('Target', ''))).lstrip('/')
+    except KeyError:
+        pass
+    return 'xl/styles.xml'
+
+
+def _parse_styles(f):
+    """Parse the styles.xml in the binary file ``f``.  See read_styles()."""
+    num_fmts = {}
+    cell_xfs = []
+    in_num_fmts = in_cell_xfs = False       # The dxfs (conditional formats) have numFmt elements too
+    for event, elem in iterparse(f, events=('start', 'end')):
+        tag = _local(elem.tag)
+        if event == 'start':
+            if tag == 'numFmts':
+                in_num_fmts = True
+            elif tag == 'cellXfs':
+                in_cell_xfs = True
+            continue
+        if tag == 'numFmt' and in_num_fmts:
+            num_fmts[int(elem.get('numFmtId'))] = elem.get('formatCode', '')
+        elif tag == 'xf' and in_cell_xfs:
+            cell_xfs.append(int(elem.get('numFmtId', 0)))
+        elif tag == 'numFmts':
+            in_num_fmts = False
+        elif tag == 'cellXfs':
+            in_cell_xfs = False
+        elem.clear()
+    return num_fmts, cell_xfs
+
+
+def read_styles(source):
+    """Read the styles of an xlsx workbook, where ``source`` is the path of the xlsx file or of its styles.xml,
+    or a binary file object of either.  Returns ``(num_fmts, cell_xfs)``: a dict of the custom number formats
+    from numFmtId to formatCode, and a list with the numFmtId of each cell style (the cellXfs entries, which
+    the ``s`` attribute of a cell indexes)."""
+    if hasattr(source, 'read'):
+        is_zip = zipfile.is_zipfile(source)
+        source.seek(0)
+    else:
+        is_zip = zipfile.is_zipfile(source)
+    if is_zip:
+        with zipfile.ZipFile(source) as z, z.open(_styles_name(z)) as f:
+            return _parse_styles(f)
+    if hasattr(source, 'read'):
+        return _parse_styles(source)
+    with open(source, 'rb') as f:
+        return _parse_styles(f)
@@ -0,0 +1,373 @@
+"""Format whole arrays of values with a `CompiledFormat`.  If NumPy is installed, the common number
+and date sections are formatted in bulk, and anything else is handed to `CompiledFormat.format()`
+one value at a time, so the results are always the same as formatting each value separately."""
+import re
+from types import SimpleNamespace
+from .ssf import SSF, _OP_DATE, _OP_AMPM, _OP_PCT
+
+try:
+    import numpy as np
+except ImportError:     # pragma nocover
+    np = None
+
+_num_re = re.compile(r'^((?:#,##)?)0(?:\.(0{1,4}))?$')
+_PAD2 = ['%02d' % i for i in range(100)]
+_INT_MAX = 2147483647           # Beyond this, _write_num uses the float path
+_FLT_MAX = 1e15                 # Rounded values below this have an exact str()
+_DATE_MAX = 2958465             # 12/31/9999
+
+
+def format_array(cf, values, width=None, align=None):
+    """Format each of the ``values`` with the `CompiledFormat` ``cf``.  Returns an object array with the
+    same shape as ``values``, or a list if NumPy is not installed."""
+    ssf = cf._ssf
+    if width is None:
+        width = ssf._default_width
+    if np is None:      # pragma nocover
+        return [cf.format(v, width=width, align=align) for v in values]
+
+    if isinstance(values, np.ndarray):
+        arr = values
+    else:
+        arr = np.asarray(values, dtype=object)      # So 1 stays a number next to 'abc' or True
+        if set(map(type, arr.ravel().tolist())) <= {int, float}:
+            arr = np.asarray(values)
+    result = np.empty(arr.shape, dtype=object)
+    out = result.reshape(-1)
+    kind = arr.dtype.kind
+    if kind == 'M':
+        items = arr.astype('datetime64[us]').ravel().tolist()
+    elif kind == 'm':
+        items = arr.astype('timedelta64[us]').ravel().tolist()
+    else:
+        items = arr.ravel().tolist()
+    todo = np.ones(len(items), dtype=bool)
+
+    v = None
+    if kind in 'iuf':
+        v = arr.ravel().astype(np.float64)
+    elif kind in 'Mm':
+        v = ssf.to_serial_many(arr).ravel()     # format() formats these as their serial numbers
+    if v is not None and len(items) and not cf._pounds and not ssf._pound_sand and \
+            (align is None or align.lower() == 'right'):
+        ok = np.isfinite(v)
+        if kind in 'iu':
+            ok &= np.abs(v) <= _INT_MAX
+        for (flen, sidx), idx in _choose_sections(cf._sections, v, ok):
+            fmt = cf._sections.fmt[sidx]
+            plan = _get_plan(cf, fmt, flen, width is not None)
+            if plan is None:
+                continue
+            strs, good = plan.kernel(plan, v[idx], flen, width, ssf._opts, kind in 'iu')
+            for i, s, g in zip(idx.tolist(), strs, good.tolist()):
+                if g:
+                    out[i] = s
+            todo[idx[good]] = False
+
+    for i in np.flatnonzero(todo).tolist():
+        out[i] = cf.format(items[i], width=width, align=align)
+    return result
+
+
+def _choose_sections(sections, v, ok):
+    """Vectorized version of SSF._choose_fmt.  Yields ((flen, section index), indexes of v) for each
+    section used by the values where ``ok`` is set.  Values that set the pound flag are left out."""
+    l, lf, m1, m2 = sections.l, sections.lf, sections.m1, sections.m2
+    pos = v > 0
+    neg = v < 0
+    flen = np.full(len(v), l)
+    sidx = np.where(pos, 0, np.where(neg, 1, 2))
+    if m1 or m2:
+        c1 = _chkcond(v, m1)
+        c2 = _chkcond(v, m2) & ~c1
+        if not m1:                  # The first section is used for all positive values
+            c2 &= ~pos
+        rest = ~c1 & ~c2
+        if not m1:
+            rest &= ~pos
+        if not m2:
+            nneg = rest & neg
+            flen[nneg] = l if lf >= 3 or SSF._allnonnegcond(m1) else 1
+            sidx[nneg] = 1
+            rest &= ~neg
+        if lf >= 3:
+            flen[rest] = 1
+            sidx[rest] = 2
+        else:
+            ok = ok & ~(rest & neg)     # These give pounds
+            sidx[rest] = 2 if m1 is not None and m2 is not None else 1
+        flen[c1 | c2] = 1
+        sidx[c1] = 0
+        sidx[c2] = 1
+    key = flen * 4 + sidx
+    for k in np.unique(key[ok]).tolist():
+        yield (k // 4, k % 4), np.flatnonzero(ok & (key == k))
+
+
+def _chkcond(v, rr):
+    """Vectorized version of SSF._chkcond"""
+    if rr is None:
+        return np.zeros(len(v), dtype=bool)
+    thresh = float(rr.group(2))
+    op = rr.group(1)
+    if op == '=':
+        return v == thresh
+    elif op == '>':
+        return v > thresh
+    elif op == '<':
+        return v < thresh
+    elif op == '<>':
+        return v != thresh
+    elif op == '>=':
+        return v >= thresh
+    return v <= thresh
+
+
+def _get_plan(cf, fmt, flen, has_wid):
+    """Returns the plan for formatting this section in bulk, or None if it has to be done one value at a time"""
+    ssf = cf._ssf
+    key = (fmt, flen, has_wid, ssf.color_pre, ssf.color_post)     # The plan has the colors in it
+    try:
+        return cf._plans[key]
+    except KeyError:
+        pass
+    plan = None
+    if not ssf._isgeneral(fmt):
+        section = cf._section(fmt, flen, has_wid)
+        if section is not None and not section.has_fill and not section.fmtl.dbnum and \
+                not section.tmpl.numbers_xx:
+            plan = _number_plan(section) or _date_plan(section)
+            if plan is not None and not _color_plan(plan, section, ssf.color_pre, ssf.color_post):
+                plan = None
+    cf._plans[key] = plan
+    return plan
+
+
+def _color_plan(plan, section, c_start, c_end):
+    plan.color_pre = plan.color_post = ''
+    if section.color_start and c_start is not None:
+        try:
+            if c_start:
+                plan.color_pre = c_start.format(section.color_start, rgb=section.color_start_rgb)
+            if c_end:
+                plan.color_post = c_end.format(section.color_start, rgb=section.color_start_rgb)
+        except Exception:
+            return False
+    return True
+
+
+def _finish(plan, strs, width):
+    """Apply the field width and colors, like the end of SSF._eval_section"""
+    if width is not None:
+        strs = [s.rjust(width) if len(s) <= width else '#' * width for s in strs]
+    if plan.color_pre or plan.color_post:
+        strs = [plan.color_pre + s + plan.color_post for s in strs]
+    return strs
+
+
+def _number_plan(section):
+    """Plan for sections like ``#,##0.00``, with optional literal text around the number"""
+    if section.bt or any(op[0] != _OP_PCT for op in section.ops):
+        return None
+    n = [i for i, tok in enumerate(section.tokens) if tok.t == 'n']
+    if len(n) != 1:
+        return None
+    n = n[0]
+    m = _num_re.match(section.tokens[n].v)
+    if not m:
+        return None
+    for i, tok in enumerate(section.tokens):
+        if i == n:
+            continue
+        if tok.t not in ('t', ' ', '(', ')') or (tok.t == '(' and i > n) or (tok.t != 't' and '.' in tok.v):
+            return None
+    fmtl = section.fmtl
+    dp = fmtl.decimal_point
+    chars = set('0123456789-') | set(dp) | set(fmtl.minus_sign)
+    grouping = None
+    if m.group(1):
+        grouping = _grouping(fmtl)
+        if grouping is None:
+            return None
+        chars |= set(grouping.sep)
+    if not dp or not fmtl.exponential or fmtl.exponential[0] in chars or dp in fmtl.minus_sign or \
+            (grouping and dp in grouping.sep):
+        return None
+    return SimpleNamespace(kernel=_number_kernel, fmtl=fmtl, pct=len(section.ops), grouping=grouping,
+            places=len(m.group(2) or ''), first_t=n > 0 and section.tokens[0].t == 't',
+            prefix=''.join(tok.v for tok in section.tokens[:n]),
+            suffix=''.join(tok.v for tok in section.tokens[n+1:]))
+
+
+def _grouping(fmtl):
+    """Find where commaify() puts the thousands separators for each length of digit string.  Returns
+    None if it does anything else."""
+    digits = '123456789012345678'
+    try:
+        if fmtl.commaify('0') != '0':
+            return None
+        slices = [None, [(0, 1)]]
+        seps = set()
+        for ln in range(2, len(digits)+1):
+            parts = re.split(r'([^0-9]+)', fmtl.commaify(digits[:ln]))
+            if ''.join(parts[::2]) != digits[:ln]:
+                return None
+            seps.update(parts[1::2])
+            pos = 0
+            sl = []
+            for p in parts[::2]:
+                sl.append((pos, pos+len(p)))
+                pos += len(p)
+            slices.append(sl)
+    except Exception:
+        return None
+    if len(seps) > 1:
+        return None
+    return SimpleNamespace(sep=seps.pop() if seps else '', slices=slices)
+
+
+def _commaify(grouping, strs):
+    slices = grouping.slices
+    sep = grouping.sep
+    return [sep.join([s[a:b] for a, b in slices[len(s)]]) for s in strs]
+
+
+def _number_kernel(plan, v, flen, width, opts, is_int):
+    """Format the values ``v`` like _write_num does for these simple formats.  Returns a list of strings
+    and a mask of which ones are good."""
+    for _ in range(plan.pct):
+        v = v * 100
+    myv = -v if flen > 1 else v
+    myv = np.where(v < 0, myv, v)
+    aval = np.abs(myv)
+    neg = myv < 0
+    places = plan.places
+    fmtl = plan.fmtl
+    dp = fmtl.decimal_point
+    ipath = (aval <= _INT_MAX) & (np.trunc(aval) == aval)
+    good = ipath.copy() if is_int else np.ones(len(v), dtype=bool)
+
+    scale = float(10**places)
+    q = np.floor(aval * scale + 0.5)
+    q = np.where(ipath, aval * scale, q)
+    good &= q < _FLT_MAX
+    q = np.where(good, q, 0).astype(np.int64)
+    ipart = (q // 10**places).tolist()
+    istrs = [str(i) for i in ipart]
+    if plan.grouping:
+        istrs = _commaify(plan.grouping, istrs)
+    if places:
+        fstrs = [dp + '%0*d' % (places, f) for f in (q % 10**places).tolist()]
+        if dp == '.':
+            istrs = [i + f for i, f in zip(istrs, fstrs)]
+        else:               # _write_num drops the leading zero of integers here
+            istrs = [f if ip and not i else s + f for s, f, i, ip in zip(istrs, fstrs, ipart, ipath.tolist())]
+    signs = np.where(neg & (ipath | (q != 0)), 1, 0).tolist()
+    sign = ('', '-')
+    msign = ('', fmtl.minus_sign)
+    ostrs = [(msign if ip else sign)[s] + o for s, ip, o in zip(signs, ipath.tolist(), istrs)]
+
+    prefix = plan.prefix
+    suffix = plan.suffix
+    if flen == 1 and not width and plan.first_t:        # The sign moves in front of the first literal
+        mprefix = fmtl.minus_sign + prefix
+        strs = [(mprefix + o[1:] if n else prefix + o) + suffix for o, n in zip(ostrs, neg.tolist())]
+    else:
+        strs = [prefix + o + suffix for o in ostrs]
+    return _finish(plan, strs, width), good
+
+
+def _date_plan(section):
+    """Plan for date/time sections like ``yyyy-mm-dd`` and ``h:mm AM/PM``"""
+    if section.ss0 or section.abstime or section.b2:
+        return None
+    tokens = section.tokens
+    ampm = {}
+    have_date = False
+    for op in section.ops:
+        if op[0] == _OP_DATE and not op[2] and not op[3]:
+            have_date = True
+        elif op[0] == _OP_AMPM and op[1] is not None:
+            ampm[op[1]] = (op[2], op[3])
+        else:
+            return None
+    if not have_date:
+        return None
+    for i, tok in enumerate(tokens):
+        if tok.t in ('h', 'H', 'M') and len(tok.v) > 2:
+            return None
+        if tok.t == 's' and tok.v not in ('s', 'ss'):
+            return None
+        if tok.t not in ('y', 'm', 'd', 'h', 'H', 'M', 's', 't', ' ', '/', 'T'):
+            return None
+    return SimpleNamespace(kernel=_date_kernel, tokens=tokens, ampm=ampm, tmpl=section.tmpl, bt=section.bt)
+
+
+def _date_kernel(plan, v, flen, width, opts, is_int):
+    """Format the values ``v`` like _parse_date_code and _write_date do.  Returns a list of strings
+    and a mask of which ones are good."""
+    good = (v >= 0) & (v <= _DATE_MAX)
+    v = np.where(good, v, 0)
+    D = np.trunc(v)
+    t = 86400 * (v - D)
+    time = np.trunc(t)
+    u = t - time
+    u[np.abs(u) < 1e-6] = 0
+    carry = u > 0.9999      # Float rounding just short of the next second
+    u[carry] = 0
+    time[carry] += 1
+    D[time == 86400] += 1
+    time[time == 86400] = 0
+    if plan.bt:
+        good &= np.floor(u + 0.5) < 1
+        u[:] = 0
+    dt = D.astype(np.int64)
+    if opts and opts.date1904:
+        dt += 1462
+    good &= dt <= _DATE_MAX
+    dt = np.where(good, dt, 1)
+    dt2 = np.where(dt > 60, dt - 1, dt)
+    days = np.datetime64('1900-01-01', 'D') + (dt2 - 1).astype('timedelta64[D]')
+    months = days.astype('datetime64[M]')
+    y = days.astype('datetime64[Y]').astype(np.int64) + 1970
+    m = months.astype(np.int64) % 12 + 1
+    d = (days - months).astype(np.int64) + 1
+    q = (days.astype(np.int64) + 4) % 7
+    q = np.where(dt2 < 60, (q + 6) % 7, q)
+    y = np.where(dt == 0, 1900, np.where(dt == 60, 1900, y))
+    m = np.where(dt == 0, 1, np.where(dt == 60, 2, m))
+    d = np.where(dt == 0, 0, np.where(dt == 60, 29, d))
+    q = np.where(dt == 0, 6, np.where(dt == 60, 3, q))
+
+    time = time.astype(np.int64)
+    S = time % 60
+    M = (time // 60) % 60
+    H = time // 3600
+    S = np.where(u == 0, S, np.floor(S + u + 0.5).astype(np.int64))
+    S[S >= 60] = 0
+
+    tmpl = plan.tmpl
+    cols = []
+    for i, tok in enumerate(plan.tokens):
+        t = tok.t
+        ln = len(tok.v)
+        if t == 'y':
+            cols.append([_PAD2[x] for x in (y % 100).tolist()] if ln <= 2 else
+                        ['%04d' % x for x in (y % 10000).tolist()])
+        elif t == 'm' and ln > 2:
+            k = 1 if ln == 3 else 0 if ln == 5 else 2
+            names = [mn[k] for mn in tmpl.months]
+            cols.append([names[x-1] for x in m.tolist()])
+        elif t == 'd' and ln > 2:
+            names = [dn[0 if ln == 3 else 1] for dn in tmpl.days]
+            cols.append([names[x] for x in q.tolist()])
+        elif t in ('m', 'd', 'h', 'H', 'M', 's'):
+            vals = {'m': m, 'd': d, 'h': 1 + (H + 11) % 12, 'H': H, 'M': M, 's': S}[t].tolist()
+            cols.append([_PAD2[x] for x in vals] if ln == 2 else [str(x) for x in vals])
+        elif i in plan.ampm:
+            am, pm = plan.ampm[i]
+            cols.append([pm if x else am for x in (H >= 12).tolist()])
+        else:
+            cols.append([tok.v] * len(v))
+    strs = [''.join(parts) for parts in zip(*cols)]
+    return _finish(plan, strs, width), good
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+from convertdate import hebrew, islamic
+from ssf.ssf import SSF_CALENDAR
+
+def days():
+    """Every 397th day from 1900 to 9999, plus the first and last day"""
+    for n in range(0, 2958465, 397):
+        d = date(1900, 1, 1) + timedelta(n)
+        yield (d.year, d.month, d.day)
+    yield (9999, 12, 31)
+
+def test_hebrew_table():
+    """to_jewish() from the table of years gives the same result as convertdate"""
+    cal = SSF_CALENDAR(SSF_CALENDAR.JEWISH)
+    for ymd in list(days()) + [(1800, 5, 1)]:       # 1800 isn't in the table
+        year, month, day = hebrew.from_gregorian(*ymd)
+        leap = hebrew.leap(year)
+        month = (SSF_CALENDAR.ecclesiastical_leap_to_civil if leap else SSF_CALENDAR.ecclesiastical_to_civil)[month]
+        r = cal.to_jewish(ymd)
+        assert (r.year, r.month, r.day, r.isleap) == (year, month, day, leap)
+
+def test_hijri_table():
+    """to_hijri() from the table of years gives the same result as convertdate"""
+    cal = SSF_CALENDAR(SSF_CALENDAR.HIJRI)
+    for ymd in list(days()) + [(1800, 5, 1)]:
+        year, month, day = islamic.from_gregorian(*ymd)
+        r = cal.to_hijri(ymd)
+        assert (r.year, r.month, r.day, r.isleap) == (year, month, day, islamic.leap(year))
@@ -68,4 +68,17 @@ def test_colors():
             actual = ssf.format(fmt, d)
             assert actual == expected
 
-
+def test_color_changes():
+    ssfc = SSF()
+    cf = ssfc.compile('[Red]0;[Blue]0')
+    assert ssfc.format('[Red]0', 1) == '1'
+    assert list(cf.format_array([1, -1])) == ['1', '1']
+    ssfc.color_pre, ssfc.color_post = '<{}>', '</>'
+    assert ssfc.format('[Red]0', 1) == '<Red>1</>'      # The colors are used as they are now
+    assert cf.format(-1) == '<Blue>1</>'
+    assert list(cf.format_array([1, -1])) == ['<Red>1</>', '<Blue>1</>']
+    ssfc.color_pre = None
+    assert ssfc.format('[Red]0', 1) == '1'              # No colors without a color_pre
+    assert list(cf.format_array([1, -1])) == ['1', '1']
+    ssfc.color_pre = ''
+    assert ssfc.format('[Red]0', 1) == '1</>'
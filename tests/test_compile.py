@@ -0,0 +1,194 @@
+from ssf import SSF, CompiledFormat
+ssf = SSF()
+from datetime import date, datetime, timedelta, timezone, time as tm
+import pytest
+
+def test_compile():
+    values = [0, 1, -1, 12.3456789, -12.3456789, 0.5, 1e10, True, False, 'abc', '', None,
+            date(2020, 1, 2), datetime(2021, 3, 4, 13, 14, 15)]
+    for fmt in ('General', '0.00', '#,##0;(#,##0);"zero";@', '0%', '# ?/?', '0.00E+00', 'm/d/yyyy h:mm AM/PM',
+            '[h]:mm:ss', 'mm:ss.00', '[>100][Red]0;[<-100][Blue]0;0', '[DBNum1][$-804]General', '*-0', '@',
+            'a.00', '0.0.0', 'Currency', 14, 22, 49):
+        cf = ssf.compile(fmt)
+        assert isinstance(cf, CompiledFormat)
+        for v in values:
+            for width in (None, 3, 15):
+                for align in (None, 'left', 'center'):
+                    assert cf.format(v, width=width, align=align) == ssf.format(fmt, v, width=width, align=align)
+
+def test_compile_locale():
+    cf = ssf.compile('#,##0.00', locale='de-DE')
+    assert cf.format(1234.5) == '1.234,50'
+    assert ssf.format('#,##0.00', 1234.5) == '1,234.50'
+    assert cf.format(1234.5) == '1.234,50'
+    cf = ssf.compile('Currency', locale='de-DE')
+    assert cf.fmt == ssf.get_format('Currency', locale='de-DE')
+    assert cf.format(1000.98) == '1.000,98 €'
+    cf = ssf.compile('#,##0.00', decimal_separator=',', thousands_separator=' ')
+    assert cf.format(1234.5) == '1 234,50'
+
+def test_compile_attributes():
+    cf = ssf.compile(14)
+    assert cf.fmt == 'm/d/yyyy'
+    assert cf.is_date
+    assert not ssf.compile('0.00').is_date
+    assert repr(ssf.compile('0')) == "CompiledFormat('0')"
+
+def test_compile_errors():
+    ssfp = SSF(errors='pounds')
+    cf = ssfp.compile('"unterminated')
+    assert cf.format(1) == '##########'
+    assert cf.format(1, width=4) == '####'
+    assert ssfp.format('0', 1) == '1'       # The error doesn't stick to the ssf object
+    cf = ssfp.compile('0;0;0;0;0')
+    assert cf.format(1, width=2) == '##'
+
+    ssfr = SSF(errors='raise')
+    cf = ssfr.compile('0;0;0;0;0')
+    try:
+        cf.format(1)
+        assert False        # Failed
+    except ValueError as e:
+        assert 'cannot find right format' in str(e)
+
+def test_format_cache():
+    ssfc = SSF(format_cache_size=2)
+    assert ssfc.format('0.00', 1) == '1.00'
+    assert ssfc.format('0.00', 2) == '2.00'
+    info = ssfc.format_cache_info()
+    assert (info.hits, info.misses, info.evictions, info.maxsize, info.currsize) == (1, 1, 0, 2, 1)
+    assert ssfc.format('0.00', 1, locale='de-DE') == '1,00'       # Different key
+    assert ssfc.format('0%', 1) == '100%'
+    info = ssfc.format_cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 3, 1, 2)
+    assert ssfc.format('0.00', 3) == '3.00'       # Was evicted
+    assert ssfc.format_cache_info().misses == 4
+
+    ssfc = SSF(dateNF='yyyy-mm-dd')
+    assert ssfc.format(14, date(2020, 1, 2)) == '2020-01-02'
+    assert ssfc.format('m/d/yyyy', date(2020, 1, 2)) == '2020-01-02'
+    assert SSF(dateNF='dd/mm/yyyy').format(14, date(2020, 1, 2)) == '02/01/2020'
+    idx = ssfc.load_entry('0.0', 200)
+    assert ssfc.format(idx, 1) == '1.0'
+    ssfc.load_entry('0.000', idx)
+    assert ssfc.format(idx, 1) == '1.000'
+    ssfc.get_table()[idx] = '0.0000'
+    assert ssfc.format(idx, 1) == '1.0000'
+    assert ssfc.format('mmm d', date(2020, 1, 2)) == 'Jan 2'
+    ssfc.set_month_names((None,) + tuple((m[0], m[1].upper(), m[2]) for m in ssfc.get_month_names()[1:]))
+    assert ssfc.format('mmm d', date(2020, 1, 2)) == 'JAN 2'
+    assert ssfc.format('[Red]0', 1) == '1'
+    ssfc.color_pre, ssfc.color_post = '<{}>', '</>'
+    assert ssfc.format('[Red]0', 1) == '<Red>1</>'
+    ssfc.clear_format_cache()
+    info = ssfc.format_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 0)
+
+    ssfc = SSF(format_cache_size=0)
+    assert ssfc.format('0.00', 1) == '1.00'
+    assert ssfc.format('0.00', 1) == '1.00'
+    assert ssfc.format_cache_info().currsize == 0
+
+    ssfp = SSF(errors='pounds')
+    assert ssfp.format('0', 1, locale='oops') == '##########'       # Bad locale only shows up the first time
+    assert ssfp.format('0', 1, locale='oops') == '1'
+    assert ssfp.format('0;0;0;0;0', 1) == '##########'
+    assert ssfp.format('0;0;0;0;0', 1) == '##########'
+
+def test_builtin_formats():
+    ssfb = SSF(format_cache_size=0)
+    for idx in range(82):
+        assert ssfb.format(idx, 43831.25) == ssfb.compile(idx).format(43831.25)
+        assert ssfb.format(idx, -1234.5, locale='ja-JP') == ssfb.compile(idx, locale='ja-JP').format(-1234.5)
+    cf = ssfb._builtin_format(14, None)
+    assert ssfb._builtin_format(14, None) is cf and ssfb._builtin_format(14, 'de-DE') is not cf
+    assert ssfb.format(4, 1234.5, decimal_separator=',', thousands_separator='.') == '1.234,50'
+    ssfb.load_entry('0.0', 5)
+    assert ssfb.format(5, 1) == '1.0'           # Loading an entry replaces the compiled one
+    ssfn = SSF(dateNF='yyyy-mm-dd', format_cache_size=0)
+    assert ssfn.format(14, 43831) == '2020-01-01'
+    assert ssfn.format_array(14, [43831, 43832]).tolist() == ['2020-01-01', '2020-01-02']
+    assert ssfb.format(14, 43831) == '1/1/2020'
+    assert ssfb.format(38, -1) == '(1)'
+    ssfb.color_pre, ssfb.color_post = '<{}>', '</>'
+    assert ssfb.format(38, -1) == '<Red>(1)</>'
+    assert ssfb.format(15, 43831) == '1-Jan-20'
+    ssfb.set_month_names((None,) + tuple((m[0], m[1].upper(), m[2]) for m in ssfb.get_month_names()[1:]))
+    assert ssfb.format(15, 43831) == '1-JAN-20'
+
+    ssft = SSF(result_cache_size=10)
+    assert ssft.format(14, 43831) == '1/1/2020'
+    assert ssft.format(170, 43831) == '43831'
+    t = ssft.get_table()
+    t[14] = 'yyyy'              # Writes through the table replace the compiled formats too
+    t[170] = 'dd'
+    assert ssft.format(14, 43831) == '2020'
+    assert ssft.format(170, 43831) == '01'
+    assert ssft.format(14, 43831, locale='de-DE') == '2020'
+    t.update({170: 'mm'})
+    assert ssft.format(170, 43831) == '01' and ssft.format(170, 43862) == '02'
+    del t[14]
+    assert ssft.format(14, 43831) == '1/1/2020'
+    t.pop(170)
+    assert ssft.format(170, 43831) == '43831'
+
+def test_result_cache():
+    ssfr = SSF(result_cache_size=4)
+    assert ssfr.format('0.00', 1) == '1.00'
+    assert ssfr.format('0.00', 1) == '1.00'
+    assert ssfr.format('0.00', True) == 'TRUE'        # Not the same key as 1
+    assert ssfr.format('0.00', 1.0) == '1.00'
+    assert ssfr.format('0.00', 1, width=6) == '  1.00'
+    info = ssfr.result_cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize, info.hit_ratio) == (1, 4, 0, 4, 0.2)
+    assert ssfr.format(14, date(2020, 1, 2)) == '1/2/2020'
+    assert ssfr.result_cache_info().evictions == 1
+    assert ssfr.format('0.00', [1]) == '[1]'          # Not cached
+    assert ssfr.result_cache_info().currsize == 4
+    ssfr.color_pre, ssfr.color_post = '<', '>'
+    assert ssfr.format('[Red]0.00', 1) == '<1.00>'
+    ssfr.color_pre = '['
+    assert ssfr.format('[Red]0.00', 1) == '[1.00>'
+    ssfr.clear_format_cache()
+    info = ssfr.result_cache_info()
+    assert (info.hits, info.misses, info.currsize, info.currbytes) == (0, 0, 0, 0)
+
+    ssfb = SSF(result_cache_size=1000, result_cache_bytes=200)
+    for i in range(20):
+        ssfb.format('0.00', i)
+    info = ssfb.result_cache_info()
+    assert info.currbytes <= 200 and info.evictions == 20 - info.currsize
+    assert SSF().result_cache_info().maxsize == 0
+
+    ssfz = SSF(result_cache_size=100)
+    noon_utc = datetime(2020, 1, 1, 12, tzinfo=timezone.utc)
+    assert ssfz.format('yyyy-mm-dd hh:mm', noon_utc) == '2020-01-01 12:00'
+    assert ssfz.format('yyyy-mm-dd hh:mm', noon_utc.astimezone(timezone(timedelta(hours=-5)))) == '2020-01-01 07:00'
+    assert ssfz.format('hh:mm', noon_utc.timetz()) == '12:00'
+    assert ssfz.format('hh:mm', tm(7, tzinfo=timezone(timedelta(hours=-5)))) == '07:00'
+
+def test_time_of_day():
+    ssft = SSF()
+    cf = ssft.compile('h:mm:ss.0 AM/PM')
+    assert cf.format(0.5) == '12:00:00.0 PM'
+    assert cf.format(1.5) == '12:00:00.0 PM'          # Same time of day, from the table
+    assert cf.format(12.25 / 86400) == '12:00:12.3 AM'
+    assert cf.format(59.96 / 86400) == '12:01:00.0 AM'  # Rounded up to the next minute
+    assert cf.format(0.5, width=15) == '  12:00:00.0 PM'
+    assert cf.format(-0.5) == '#' * 10
+    section = cf._section(cf.fmt, 1, False)
+    assert len(section.times) == 3
+    assert ssft.compile('h:mm AM/PM').format(0.99999999) == '12:00 PM'  # AM/PM is before rounding
+    ssf4 = SSF(date1904=True)           # Past 12/31/9999 with the 1904 offset, before and after using the table
+    with pytest.raises(OverflowError):
+        ssf4.format('h:mm:ss', 2957004.5)
+    assert ssf4.format('h:mm:ss', 0.5) == '12:00:00'
+    with pytest.raises(OverflowError):
+        ssf4.format('h:mm:ss', 2957004.5)
+    with pytest.raises(OverflowError):
+        ssf4.format('h:mm:ss', 2957003.99999999)      # Rounds up past the last day
+    assert ssf4.format('h:mm:ss', 2957003.5) == '12:00:00'
+    ssfc = SSF(color_pre='<{}>', color_post='</>')
+    assert ssfc.compile('[Red]h:mm')._section('[Red]h:mm', 1, False).times is None
+    assert ssfc.format('[Red]h:mm', 0.5) == '<Red>12:00</>'
+    assert ssft.compile('yyyy h:mm')._section('yyyy h:mm', 1, False).times is None
@@ -0,0 +1,73 @@
+from ssf import SSF
+from ssf.ssf import _compile_num, _fixed_digits, _significant_digits, _tiny_fraction
+from tests.test_valid import unescape
+
+values = [0, 1, -1, 2, -7, 10, 1000, -1234567, 123456789, 2147483647, -2147483648, 2147483648, 12345678901,
+          0.0, 5.0, -5.0, 0.5, -0.5, 0.05, 0.004, 1e-5, -2.5e-7, 3.45, -67.89, 12.3456789, -12.3456789,
+          0.999, 999.9999, 1234.5, -98765.4321, 123456.789, 1.5e16, 1.5e17, 1e23, -3.7e25, True, False]
+
+class RecordingSSF(SSF):
+    """Remembers the (type, fmt) of each number part written"""
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.seen = set()
+
+    def _write_num(self, type, fmt, val):
+        self.seen.add((type, fmt))
+        return super()._write_num(type, fmt, val)
+
+def formats():
+    with open('tests/ssf78.tsv', 'r') as t78:
+        data = t78.read().splitlines()
+    for c in data[0].split('\t')[2:]:
+        for row in data[1:]:
+            yield row.split('\t')[0].format(c)
+    with open('tests/valid2.tsv', 'r', encoding='utf-8') as d:
+        for row in d.read().split('\n')[1:]:
+            if row:
+                yield unescape(row.split('\t')[0])
+
+def result(func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        return type(e)
+
+def check_locale(locale):
+    ssf = RecordingSSF(locale=locale, errors='ignore')
+    for fmt in formats():
+        for v in values:
+            result(ssf.format, fmt, v)
+    assert len(ssf.seen) > 70
+    for type, fmt in sorted(ssf.seen):
+        for v in values:
+            assert result(ssf._write_num, type, fmt, v) == result(ssf._interpret_num, type, fmt, v), (fmt, v)
+
+def test_compiled_num_en():
+    """The compiled number writers give the same results as the interpreter"""
+    check_locale('en-US')
+
+def test_compiled_num_de():
+    check_locale('de-DE')
+
+def test_compiled_num_shapes():
+    ssf = SSF()
+    for fmt in ('0000', '#??', '# ?/8', '##00', '#,##0.0#', '0.00,', '#,###', '.##', '?/?', '0:# ??/16', ':0.0', '',
+                '0.00E+00', '#0.0E-0', '0E+0', '#,##0.0E+0', '0.E+00'):
+        for v in values:
+            assert result(ssf._write_num, 'n', fmt, v) == result(ssf._interpret_num, 'n', fmt, v), (fmt, v)
+    assert _compile_num('0.00') is _compile_num('0.00')
+
+def test_digit_engine():
+    assert _fixed_digits(2.675, 2) == ('2', '68')
+    assert _fixed_digits(3e-7, 7) == ('0', '0000003')
+    assert _tiny_fraction('0', '0000003') == '0000003' + '0' * 14
+    assert _fixed_digits(12, 3) == ('12', '000')
+    assert _fixed_digits(1e20, 2) is None
+    assert _significant_digits(0.000123456, 3, 6) == ('123', -4)
+    assert _significant_digits(99.96, 3, 1) is None         # Carries into another digit
+    assert SSF.toPrecision(99.96, 3) == '100'
+    assert _significant_digits(1.5, 16, 15) is None
+    assert SSF.toPrecision(3e-7, 4) == '3.000e-7'
+    assert SSF.toPrecision(-0.000123456, 3) == '-0.000123'
+    assert SSF.toPrecision(1.7976931348623157e308, 6) == '1.79769e+308'
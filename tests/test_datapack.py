@@ -0,0 +1,37 @@
+import json
+from ssf.ssf import _read_data_tables, SSF_LOCALE, SSF_CALENDAR
+from ssf.datapack import DataPack, build, PACK_FILE
+import pytest
+
+tables = _read_data_tables()
+
+def test_pack_is_current():
+    """ssfdata.bin matches the data files - if not, run create/create_pack.py"""
+    with open(PACK_FILE, 'rb') as pf:
+        assert pf.read() == build(tables)
+
+def test_pack_contents():
+    pack = DataPack()
+    for name, (value, keyed) in tables.items():
+        packed = pack.table(name)
+        if keyed:
+            assert set(packed) == set(value)
+            for key in value:
+                assert packed[key] == json.loads(json.dumps(value[key]))
+        else:
+            assert packed == json.loads(json.dumps(value))
+    assert 'daymonth08_leap' in pack and 'daymonth08' in pack and 'daymonth0D' not in pack
+
+def test_pack_decoding():
+    assert SSF_LOCALE.lc_all_map['de-DE']['mon_grouping'] == [3, 0]
+    assert SSF_LOCALE.am_pm_map['ja-JP'] == ('午前', '午後')
+    assert SSF_LOCALE.table_map['ja-JP'][27] == '[$-411]ge"."m"."d'
+    assert SSF_LOCALE.lcid_map[0x409] == 'en-US'
+    dmm = SSF_CALENDAR(SSF_CALENDAR.HIJRI).day_month_map[SSF_CALENDAR.HIJRI]['ar-SA']
+    assert dmm[0].dddd == 'الإثنين' and dmm[0].mmmm == 'محرم'
+
+def test_bad_pack(tmp_path):
+    bad = tmp_path / 'bad.bin'
+    bad.write_bytes(b'SSFDATA\0')
+    with pytest.raises(ValueError):
+        DataPack(str(bad))
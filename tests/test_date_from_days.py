@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+from ssf.ssf import _date_from_days
+import pytest
+
+def expected(dt):
+    """Date parts for a serial number the slow way, with Lotus 1-2-3's 1900-02-29
+    (which also makes 1900-01-01 a Sunday)"""
+    if dt == 60:
+        return (1900, 2, 29, 3)
+    d = date(1899, 12, 31) + timedelta(dt if dt < 60 else dt - 1)
+    return (d.year, d.month, d.day, d.weekday() if dt < 60 else (d.weekday() + 1) % 7)
+
+def test_date_from_days():
+    assert _date_from_days(0) == (1900, 1, 0, 6)
+    for dt in list(range(1, 400)) + list(range(400, 2958466, 1009)) + [2958465]:
+        assert _date_from_days(dt) == expected(dt)
+
+def test_date_from_days_range():
+    assert _date_from_days(-1)[:3] == (1899, 12, 30)
+    with pytest.raises(OverflowError):
+        _date_from_days(2958466)
@@ -25,3 +25,45 @@ def test_data_values():
         assert formatter.format("yyyy-mm-dd HH:MM:SS", dt) == d[1]
 #	}); });
 #});
+
+def test_datenum_local_offsets():
+    """The timezone offsets cached per day give the same serial numbers, including on days with a
+    daylight saving time transition"""
+    from datetime import datetime, timedelta
+    from dateutil.tz import gettz
+    ssfny = SSF(tzinfo=gettz('America/New_York'))
+    values = [datetime(2020, 3, 7) + timedelta(minutes=37*i) for i in range(200)] + \
+             [datetime(2020, 11, 1, 1, 30, fold=1), date(2020, 11, 1), datetime(1900, 3, 1),
+              datetime(2020, 3, 8, 12, tzinfo=gettz('Asia/Tokyo'))]
+    expected = []
+    for v in values:        # The uncached way, with getTime() and getTimezoneOffset() for each value
+        dt = datetime(v.year, v.month, v.day) if type(v) is date else v
+        dt = dt if dt.tzinfo else dt.replace(tzinfo=ssfny._tzinfo)
+        epoch = ssfny.getTime(dt) + (24*60*60*1000 if dt >= ssfny.base1904 else 0)
+        expected.append((epoch - (ssfny.dnthresh + (ssfny.getTimezoneOffset(dt) -
+                         ssfny.getTimezoneOffset(ssfny.basedate)) * 60000)) / (24*60*60*1000))
+    assert [ssfny._datenum_local(v, False) for v in values] == expected
+    assert ssfny._datenum_local_many(values, False) == expected
+    assert ssfny._datenum_local_many(values, True) == [ssfny._datenum_local(v, True) for v in values]
+    assert ssfny._day_offsets[(2020, 3, 8)] is None       # Transition day isn't cached
+    assert ssfny.format('yyyy-mm-dd hh:mm', datetime(2020, 3, 8, 12, 34)) == '2020-03-08 12:34'
+
+def test_to_serial_many():
+    from datetime import datetime, timedelta, time
+    import math
+    values = [datetime(1900, 2, 28), date(1900, 3, 1), datetime(2020, 1, 2, 6), time(18), timedelta(days=1.5), 42, None]
+    expected = [59.0, 61.0, 43832.25, 0.75, 1.5, 42.0]
+    assert ssf.to_serial_many(values)[:-1] == expected
+    assert math.isnan(ssf.to_serial_many(values)[-1])
+    assert ssf.to_serial_many([date(1904, 1, 2)], date1904=True) == [1.0]
+    assert ssf1904.to_serial_many([date(1904, 1, 2)]) == [1.0]
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    arr = np.array([['1900-02-28', '2020-01-02T06:00'], ['NaT', '1900-03-01']], dtype='datetime64[s]')
+    result = ssf.to_serial_many(arr)
+    assert result.shape == (2, 2) and math.isnan(result[1, 0])
+    assert result[0].tolist() == [59.0, 43832.25] and result[1, 1] == 61.0
+    assert ssf.to_serial_many(np.array([36, 'NaT'], dtype='timedelta64[h]')).tolist()[0] == 1.5
+    assert ssf.to_serial_many([np.datetime64('2020-01-02T06:00'), np.timedelta64(6, 'h')]) == [43832.25, 0.25]
@@ -0,0 +1,51 @@
+import pytest
+np = pytest.importorskip('numpy')
+from ssf import SSF
+ssf = SSF()
+from datetime import datetime
+
+def check(fmt, values, ssfo=ssf, **kwargs):
+    width = kwargs.pop('width', None)
+    result = ssfo.format_array(fmt, values, width=width, **kwargs)
+    assert result.shape == np.shape(values)
+    for v, r in zip(np.asarray(values, dtype=object).ravel().tolist(), result.ravel().tolist()):
+        assert r == ssfo.format(fmt, v, width=width, **kwargs)
+
+def test_format_array_numbers():
+    values = np.array([0, -0.0, 1, -1, 0.5, -0.001, 0.005, 1234.5, -1234.5, 999.995, 1e10, -1e14, 1e20, 2**31, 1/3])
+    for fmt in ('0', '0.00', '#,##0', '#,##0.00', '#,##0.00;(#,##0.00)', '"$"0.00', '0.0%', '[Red]#,##0_);[Blue](#,##0)',
+            '[>100]0.00;[<-100](0);0.0', '[=1]"one";0.00', '0.00E+00', '# ?/?', 'General'):
+        for width in (None, 0, 6, 15):
+            check(fmt, values, width=width)
+    for locale in ('de-DE', 'fr-FR', 'hi-IN'):
+        check('#,##0.00', values, locale=locale)
+        check('0.00', values, locale=locale)
+    check('#,##0', np.arange(-5000, 5000, 7))
+    ssfc = SSF(color_pre='<{rgb}>', color_post='</{}>')
+    check('[Red]0.00;[Blue]-0.00', values, ssfc)
+
+def test_format_array_dates():
+    values = np.array([0, 1, 59, 60, 61, 43831.25, 43831.25 - 1e-11, 0.99999999999, 43831.999994, 43831.5000058, 0.99999999, 2958465, 2958465.9999, 2958466, -1])
+    for fmt in ('yyyy-mm-dd', 'm/d/yyyy h:mm AM/PM', 'hh:mm:ss', 'dddd, mmmm d, yyyy', 'mmmmm yy', 'ddd d-mmm',
+            '[h]:mm', 'mm:ss.0', 14, 22):
+        for width in (None, 8, 30):
+            check(fmt, values, width=width)
+    check('yyyy-mm-dd', values, locale='fr-FR')
+    check('yyyy-mm-dd', values[values < 2957000], SSF(date1904=True))
+    check('yyyy-mm-dd hh:mm', np.array(['2020-01-02T03:04:05', 'NaT'], dtype='datetime64[s]'))
+    stamps = np.array(['1899-12-31', '1900-02-28T12:00', '1900-03-01', '2020-01-02T03:04:05.25', 'NaT', '9999-12-31T23:59'],
+                      dtype='datetime64[ms]')
+    for fmt in ('yyyy-mm-dd hh:mm:ss.00', 'dddd, mmmm d, yyyy', 'General', '0.000000'):
+        check(fmt, stamps)
+        check(fmt, stamps, SSF(date1904=True))
+    check('[h]:mm:ss.000', np.array([0, 90061001, -5000, 'NaT'], dtype='timedelta64[ms]'))
+
+def test_format_array_other():
+    check('0.00', np.arange(12).reshape(3, 4))
+    check('0.00;-0.00;0;@', ['abc', 1, None, True])
+    check('0.00', ['abc', 1, 2.5])
+    check('0.00', [[1, 2.5], [True, 3]])
+    check('0.00', np.array([True, False]))
+    check('0.00', np.array([], dtype=float))
+    assert ssf.compile('0.0').format_array([1, 2.5]).tolist() == ['1.0', '2.5']
+    assert ssf.format_array('yyyy', [datetime(2020, 1, 1)]).tolist() == ['2020']
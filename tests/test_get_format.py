@@ -1,3 +1,4 @@
+import pytest
 from ssf import SSF
 
 ssf = SSF(locale='en-US')
@@ -83,3 +84,19 @@ def test_get_format_scientific():
 def test_get_format_text():
     assert ssf.get_format('Text') == '@'
 
+
+def test_get_format_cache():
+    s = SSF()
+    assert s.get_format('Currency', locale='de-DE') == s.get_format('Currency', locale='de-DE') == SSF().get_format('Currency', locale='de-DE')
+    assert s.fmtl.locale_name == 'de-DE'
+    assert s.get_format('Currency') == '$#,##0.00' and s.fmtl is s.curl
+    assert s.get_format('Currency', locale='en-GB') == '[$£]#,##0.00'
+    assert s.fmtl.locale_name == 'en-GB'
+    assert len(s._get_format_cache) == 3
+    with pytest.warns(UserWarning):
+        s.get_format('Fraction', fraction_denominator=0)
+    assert len(s._get_format_cache) == 3                # The error isn't cached
+    sd = SSF(dateNF='yyyy-mm-dd')
+    assert sd.get_format('Short Date') == 'yyyy-mm-dd'
+    assert SSF(dateNF='dd/mm/yyyy').get_format('Short Date') == 'dd/mm/yyyy'
+    assert sd.get_format('Short Date') == 'yyyy-mm-dd' and SSF().get_format('Short Date') == 'm/dd/yyyy'
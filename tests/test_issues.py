@@ -136,3 +136,21 @@ def test_issue_14():
 
 
 
+
+def test_no_global_state(monkeypatch):
+    """Making locales doesn't call setlocale() or change the decimal context, even for locales
+    that aren't in the Windows locale data"""
+    import decimal
+    import locale
+
+    def mock_setlocale(typ, locale):
+        assert False        # Shouldn't come here!
+
+    monkeypatch.setattr(locale, 'setlocale', mock_setlocale)
+    context = decimal.getcontext()
+    rounding = context.rounding
+    ssfy = SSF(locale='yue', errors='raise')
+    assert ssfy.format('Currency', -1234.5) == '-HK$1,234.50'
+    assert ssfy.format('Currency', 5, locale='de-IT') == '5,00 €'
+    assert ssfy.format('0.0000000', 0.00000025) == '0.0000003'
+    assert decimal.getcontext() is context and context.rounding == rounding
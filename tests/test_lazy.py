@@ -0,0 +1,18 @@
+import subprocess
+import sys
+import os
+
+heavy = ('babel', 'dateutil', 'yaml', 'convertdate', 'ummalqura')
+
+def loaded_after(code):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = code + f'\nimport sys\nprint(sorted({{m.split(".")[0] for m in sys.modules}} & set({heavy!r})))'
+    out = subprocess.run([sys.executable, '-c', script], env=dict(os.environ, PYTHONPATH=root),
+            check=True, capture_output=True, text=True).stdout
+    return out.strip()
+
+def test_lazy_imports():
+    """Importing ssf doesn't import the heavy modules - they are imported when first needed"""
+    assert loaded_after('import ssf') == '[]'
+    assert loaded_after('import ssf; ssf.SSF(locale_support=False).format("0.00", 1)') == '[]'
+    assert loaded_after('import ssf; ssf.SSF().format("B2yyyy", 43831)') == "['babel']"
@@ -261,3 +261,58 @@ def test_bad_locale():
     assert ssf.format(14, '1/02/2020') == '1/2/2020'
 
 
+
+def test_commaify_grouping():
+    """commaify() groups the digits itself like babel does, without calling it for each value"""
+    from ssf.ssf import SSF_LOCALE
+    assert SSF_LOCALE('en-US').group_sizes == (3, 3)
+    assert SSF_LOCALE('hi-IN').group_sizes == (3, 2)
+    assert SSF_LOCALE('en-US').commaify('1234567') == '1,234,567'
+    assert SSF_LOCALE('en-US').commaify('0001234') == '0,001,234'
+    assert SSF_LOCALE('en-US').commaify('  123') == '  123'
+    assert SSF_LOCALE('hi-IN').commaify('123456789') == '12,34,56,789'
+    assert SSF_LOCALE('fr-FR').commaify('1234') == '1 234'
+    assert SSF_LOCALE('de-DE', thousands_separator="'").commaify('1234567') == "1'234'567"
+    assert SSF_LOCALE('en-US').commaify('1' * 30) == ','.join(['111'] * 10)
+    ssf = SSF(locale='hi-IN')
+    assert ssf.format('#,##0.00', -12345678.9) == '-1,23,45,678.90'
+
+def test_shared_locales():
+    """Locales are looked up once and shared by every SSF object, and copied before they are changed"""
+    ssf1 = SSF(locale='de-DE', color_pre='<{}>', color_post='</{}>')
+    ssf2 = SSF(locale='de-DE', dateNF='yyyy-mm-dd')
+    assert ssf1.curl is ssf2.curl
+    assert ssf1._get_locale('fr-FR') is ssf2._get_locale('fr-FR')
+    try:
+        ssf1.curl.decimal_point = '!'
+        assert False
+    except AttributeError:
+        pass
+    dbnum = ssf1.compile('[DBNum1][$-804]0')
+    assert dbnum.format(12) == ssf2.format('[DBNum1][$-804]0', 12)
+    assert ssf1.curl.dbnum is None
+    assert ssf1.curl.with_numerals(1, None) is ssf2.curl.with_numerals(1, None)
+
+    ssf1.set_day_names([('Mo', 'Montag!'), ('Di', 'Dienstag'), ('Mi', 'Mittwoch'), ('Do', 'Donnerstag'),
+                        ('Fr', 'Freitag'), ('Sa', 'Samstag'), ('So', 'Sonntag')])
+    assert ssf1.format('dddd', '10/19/2026') == 'Montag!'
+    assert ssf2.format('dddd', '10/19/2026') == 'Montag'
+    assert ssf1.curl is not ssf2.curl
+
+def test_locale_tables():
+    """Format ids use the table for the locale of each call, whatever was formatted before"""
+    s = SSF(locale='ja-JP', format_cache_size=0)
+    ja = s.format(27, 43831)
+    assert ja == 'R2.1.1'
+    assert s.format(27, 43831, locale='ko-KR') == '2020年 01月 01日'
+    assert s.format(27, 43831) == ja
+    assert s.format(27, 43831, locale='en-US') == '1/1/2020'
+    se = SSF(format_cache_size=0)
+    se.format(56, 0.5, locale='zh-TW')
+    assert se.format(56, 0.5) == '上午/下午 12時00分00秒 '
+    assert se.format(56, 0.5, locale='ko-KR') == '1900-01-00'
+    se.load_entry('0.0', 56)
+    assert se.format(56, 0.5, locale='ko-KR') == se.format(56, 0.5) == '0.5'
+    assert 56 in se.get_table() and 27 not in se.get_table()
+    assert SSF._locale_table('ja-JP') is SSF._locale_table('ja-JP')
+    assert SSF(locale_support=False).format(27, 43831, locale='ja-JP') == '1/1/2020'
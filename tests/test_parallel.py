@@ -0,0 +1,27 @@
+import pytest
+from ssf import SSF
+from ssf.parallel import format_columns
+ssf = SSF()
+
+def test_format_columns():
+    columns = [[i * 1.5 - 100 for i in range(300)], list(range(43831, 44131)), ['abc', None, True, 1.5] * 75]
+    formats = ['#,##0.00;(#,##0.00)', 'yyyy-mm-dd', '0.0;-0.0;0;"text: "@']
+    expected = [[ssf.format(fmt, v) for v in values] for fmt, values in zip(formats, columns)]
+    assert format_columns(columns, formats, workers=2, chunk_size=70) == expected
+    assert format_columns(columns, formats, workers=1) == expected
+
+    ssfd = SSF(locale='de-DE', date1904=True)
+    expected = [[ssfd.format(14, v, width=12) for v in values] for values in columns[:2]]
+    assert format_columns(columns[:2], 14, workers=2, chunk_size=100, width=12, locale='de-DE', date1904=True) == expected
+
+    try:
+        format_columns(columns, formats[:2])
+        assert False        # Failed
+    except ValueError as e:
+        assert 'one format for each column' in str(e)
+
+def test_format_columns_numpy():
+    np = pytest.importorskip('numpy')
+    columns = [np.linspace(-1000, 1000, 501), np.arange(43831, 44332).reshape(3, 167)]
+    expected = [[ssf.format('#,##0.00', v) for v in columns[0].tolist()], [ssf.format('#,##0.00', v) for v in columns[1].ravel().tolist()]]
+    assert format_columns(columns, '#,##0.00', workers=2, chunk_size=100) == expected
@@ -0,0 +1,39 @@
+import csv
+import io
+from ssf import SSF
+from ssf.stream import format_rows, write_rows
+ssf = SSF()
+
+formats = ['#,##0.00;(#,##0.00)', 'yyyy-mm-dd', None, '0.0;-0.0;0;"text: "@']
+
+def make_rows(count):
+    for i in range(count):
+        yield (i * 1.5 - 100, 43831 + i, f'id{i}', ['abc', None, True, 1.5][i % 4])
+
+def expected_rows(rows, ssfo=ssf):
+    return [[v if fmt is None else ssfo.format(fmt, v) for fmt, v in zip(formats, row)] for row in rows]
+
+def test_format_rows():
+    expected = expected_rows(make_rows(250))
+    assert list(format_rows(make_rows(250), formats, chunk_size=64)) == expected
+    assert list(format_rows(make_rows(250), formats)) == expected
+    assert list(format_rows([], formats)) == []
+
+    ssfd = SSF(locale='de-DE', date1904=True)
+    assert list(format_rows(make_rows(10), formats, locale='de-DE', date1904=True)) == expected_rows(make_rows(10), ssfd)
+    assert list(format_rows(make_rows(10), formats, ssf=ssfd, chunk_size=3)) == expected_rows(make_rows(10), ssfd)
+
+    ragged = [(1, 43831), (2.5,), (3, 43832, 'x', 4, 'extra'), ()]
+    assert list(format_rows(ragged, formats[:2] + [None, '0.00'], chunk_size=3)) == \
+        [['1.00', '2020-01-01'], ['2.50'], ['3.00', '2020-01-02', 'x', '4.00', 'extra'], []]
+
+def test_write_rows():
+    out = io.StringIO()
+    assert write_rows(out, make_rows(100), formats, chunk_size=30) == 100
+    assert list(csv.reader(io.StringIO(out.getvalue()))) == expected_rows(make_rows(100))
+
+    source = io.StringIO('1234.5,43831\n-2,"43832"\n')
+    out = io.StringIO()
+    assert write_rows(out, csv.reader(source, quoting=csv.QUOTE_NONNUMERIC), ['#,##0.00', 'yyyy-mm-dd'],
+                      dialect='excel-tab') == 2
+    assert out.getvalue() == '1,234.50\t2020-01-01\r\n-2.00\t43832\r\n'
@@ -0,0 +1,53 @@
+import io
+import zipfile
+from ssf import SSF
+from ssf.styles import read_styles
+
+STYLES = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="2"><numFmt numFmtId="164" formatCode="#,##0.000;[Red]\\-#,##0.000"/>
+<numFmt numFmtId="165" formatCode="yyyy\\-mm\\-dd\\ hh:mm"/></numFmts>
+<cellStyleXfs count="1"><xf numFmtId="10" fontId="0"/></cellStyleXfs>
+<cellXfs count="5"><xf numFmtId="0" fontId="0" xfId="0"/><xf numFmtId="164" applyNumberFormat="1"/>
+<xf numFmtId="14" applyNumberFormat="1"/><xf numFmtId="165"/><xf fontId="1"/></cellXfs>
+<dxfs count="2"><dxf><numFmt numFmtId="164" formatCode="0.0%"/></dxf>
+<dxf><numFmt numFmtId="166" formatCode="[Blue]0"/></dxf></dxfs>
+</styleSheet>'''
+
+def make_xlsx(styles_name='xl/styles.xml'):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('xl/_rels/workbook.xml.rels', '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   f'<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+                   f'Target="{styles_name[3:]}"/></Relationships>')
+        z.writestr(styles_name, STYLES)
+    buf.seek(0)
+    return buf
+
+def test_read_styles(tmp_path):
+    # The numFmt elements of the conditional formats (dxfs) aren't number formats of the cell styles
+    expected = ({164: '#,##0.000;[Red]\\-#,##0.000', 165: 'yyyy\\-mm\\-dd\\ hh:mm'}, [0, 164, 14, 165, 0])
+    assert read_styles(io.BytesIO(STYLES)) == expected
+    assert read_styles(make_xlsx()) == expected
+    assert read_styles(make_xlsx('xl/other/styles2.xml')) == expected
+    path = tmp_path / 'styles.xml'
+    path.write_bytes(STYLES)
+    assert read_styles(str(path)) == expected
+    assert read_styles('tests/ssf78.xlsx') == ({}, [0, 0])
+
+def test_format_by_style():
+    ssf = SSF()
+    assert ssf.load_styles(make_xlsx()) == 5
+    assert ssf.get_table()[164] == '#,##0.000;[Red]\\-#,##0.000'
+    assert ssf.format_by_style(0, 1234.5) == '1234.5'
+    assert ssf.format_by_style(1, -1234.5) == ssf.format(164, -1234.5) == '-1,234.500'
+    assert ssf.format_by_style(2, 43831) == '1/1/2020'
+    assert ssf.format_by_style(3, 43831.5, width=20) == ssf.format('yyyy\\-mm\\-dd\\ hh:mm', 43831.5, width=20)
+    assert ssf.format_by_style(4, 0.25) == '0.25'
+    assert ssf.format_by_style(99, 0.25) == '0.25'
+    assert ssf._style_formats[0] is ssf._style_formats[4]      # Compiled once for both
+    ssf.load_entry('0.0', 164)
+    assert ssf.format_by_style(1, -1234.5) == '-1234.5'
+    ssfd = SSF(dateNF='yyyy-mm-dd')
+    ssfd.load_styles(make_xlsx())
+    assert ssfd.format_by_style(2, 43831) == '2020-01-01'
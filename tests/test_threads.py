@@ -0,0 +1,28 @@
+from ssf import SSF
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+cases = [('#,##0.00', 1234.5, None), ('#,##0.00', 1234.5, 'de-DE'), ('Currency', -1000.98, 'fr-FR'),
+        ('[$-804]dddd mmmm', 43831, None), ('[DBNum1][$-804]General', 12.345, None), ('ggge"年"m"月"d"日"', 43831, 'ja-JP'),
+        ('B2yyyy/mm/dd', 43831, None), ('[$-ar-SA,6]yyyy/mm/dd', 43831, None), ('Long Date', datetime(2020, 1, 6), 'fr-FR'),
+        ('0.00%', 0.125, 'hi-IN'), ('# ?/?', 3.14159, None), (14, 43831.5, 'de-DE'), ('0;0;0;0;0', 1, None)]
+
+def test_threads():
+    """One SSF object formatting from many threads gives the same results as formatting in one thread"""
+    expected = []
+    for fmt, v, locale in cases:
+        expected.append(SSF(errors='pounds').format(fmt, v, locale=locale))
+
+    ssf = SSF(errors='pounds', format_cache_size=4)     # Small cache so threads also compile formats
+    def work(n):
+        results = []
+        for i in range(200):
+            j = (n + i) % len(cases)
+            fmt, v, locale = cases[j]
+            results.append((j, ssf.format(fmt, v, locale=locale)))
+        return results
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for results in executor.map(work, range(32)):
+            for j, r in results:
+                assert r == expected[j]